@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""Pre-rendered entry listings: month archive pages plus a bounded latest-N index.
+
+Instead of a Liquid loop over every entry, the pipeline writes static HTML:
+
+- archive/<YYYY-MM>.html              one month of entry cards (permalink /archive/<YYYY-MM>/)
+- _includes/latest_entries.html       the LATEST_N newest cards, included by index.md
+- _includes/archive_months.html       month links with counts (index.md, archive.md)
+- archive/entries/<YYYY-MM-DD>.html   a redirect stub per archived entry, keeping its published
+                                      /entries/<date>/ URL pointing at the month page
+
+Writers call render_changes() after appending to the changelog. It re-renders
+only the months of entries named in events past this stage's cursor (for
+daily_run, just the current month) plus the two includes, so earlier months
+are left alone. Files are only written when their content changes.
+
+Stubs are synced by render_all(), which entry_archive.py runs after packing
+or unpacking a year; unpacked days get their entry page back and lose the stub.
+
+Card text is HTML-escaped and braces are written as entities, so Jekyll's
+Liquid pass can never interpret entry text.
+
+Usage:
+  python scripts/archive_pages.py          # re-render everything
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import html
+from pathlib import Path
+
+import changelog
+from entry_archive import ARCHIVE_DIR, ENTRIES_DIR, archived_years, is_archived, load_index, parse_front, read_entry
+from wiki_config import SUFFIX, WIKI_PATH
+
+LATEST_N = 60
+PAGES_DIR = Path((WIKI_PATH or "").lstrip("/")) / "archive"
+REDIRECTS_DIR = PAGES_DIR / "entries"
+INCLUDES_DIR = Path("_includes")
+LATEST_INCLUDE = INCLUDES_DIR / f"latest_entries{SUFFIX}.html"
+MONTHS_INCLUDE = INCLUDES_DIR / f"archive_months{SUFFIX}.html"
+STAGE = "archive_pages"
+
+
+def _text(s) -> str:
+    return html.escape(str(s or ""), quote=True).replace("{", "&#123;").replace("}", "&#125;")
+
+
+def _url(path: str) -> str:
+    return "{{ '" + (WIKI_PATH or "") + path + "' | relative_url }}"
+
+
+def entry_names(entries_dir: Path = ENTRIES_DIR, archive_dir: Path = ARCHIVE_DIR) -> list[str]:
+    """Every entry file name, live or archived, sorted. Reads no entry bodies."""
+    names = {p.name for p in entries_dir.glob("*.md")}
+    for year in archived_years(archive_dir):
+        names.update(load_index(year, archive_dir)["records"])
+    return sorted(names)
+
+
+def card(name: str, fm: dict, linked: bool) -> str:
+    ct = fm.get("change_type") or ""
+    domain = fm.get("domain") or ""
+    entity = fm.get("entity_type") or ""
+    if ct == "first_seen":
+        pill = '<div class="pill pill--new">New</div>'
+    elif ct == "modified":
+        pill = '<div class="pill pill--hot">Changed</div>'
+    else:
+        pill = '<div class="pill pill--cool">Same</div>'
+    tag, href = ("a", f' href="{_url("/entries/" + name[:-3] + "/")}"') if linked else ("div", "")
+    return "\n".join([
+        f'<{tag} class="card{" card--link" if linked else ""}"{href}',
+        '  data-entry-card',
+        f'  data-title="{_text(fm.get("topic_title"))}"',
+        f'  data-sentence="{_text(fm.get("lead_sentence"))}"',
+        f'  data-domain="{_text((domain or "other").lower())}"',
+        f'  data-entity="{_text((entity or "other").lower())}"',
+        f'  data-change-type="{_text(ct)}"',
+        f'  data-changed="{"true" if ct == "modified" else "false"}">',
+        '  <div class="card__row">',
+        '    <div>',
+        f'      <div class="kicker">{_text(fm.get("date"))} · Rank {_text(fm.get("rank"))} · {_text(fm.get("pageviews"))} views</div>',
+        f'      <div class="card__title">{_text(fm.get("topic_title"))}</div>',
+        f'      <div class="kicker">{" · ".join(_text(x) for x in (domain, entity) if x)}</div>',
+        '    </div>',
+        f'    {pill}',
+        '  </div>',
+        f'  <div class="quote">{_text(fm.get("lead_sentence"))}</div>',
+        f'</{tag}>',
+    ])
+
+
+def _cards(names: list[str]) -> str:
+    out = []
+    for name in names:
+        text = read_entry(name, ENTRIES_DIR, ARCHIVE_DIR)
+        if text is None:
+            continue
+        # Archived days have no rendered entry page to link to.
+        out.append(card(name, parse_front(text), linked=not is_archived(name, ENTRIES_DIR, ARCHIVE_DIR)))
+    return "\n".join(out) if out else '<div class="card muted">No entries yet.</div>'
+
+
+def _write(path: Path, content: str) -> bool:
+    if path.exists() and path.read_text(encoding="utf-8") == content:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(content, encoding="utf-8")
+    tmp.replace(path)
+    return True
+
+
+def _months(names: list[str]) -> dict[str, int]:
+    counts: dict[str, int] = {}
+    for name in names:
+        counts[name[:7]] = counts.get(name[:7], 0) + 1
+    return counts
+
+
+def render_month(month: str, names: list[str], months: list[str]) -> bool:
+    i = months.index(month)
+    prev_m = months[i - 1] if i > 0 else None
+    next_m = months[i + 1] if i + 1 < len(months) else None
+    label = _dt.date.fromisoformat(month + "-01").strftime("%B %Y")
+    nav = []
+    if prev_m:
+        nav.append(f'<a class="chip" href="{_url("/archive/" + prev_m + "/")}">← {prev_m}</a>')
+    nav.append(f'<a class="chip" href="{_url("/archive/")}">All months</a>')
+    if next_m:
+        nav.append(f'<a class="chip" href="{_url("/archive/" + next_m + "/")}">{next_m} →</a>')
+    month_names = [n for n in names if n.startswith(month)]
+    page = "\n".join([
+        "---",
+        "layout: default",
+        f'title: "Daily log — {label}"',
+        "page_kind: daily",
+        f"permalink: {WIKI_PATH or ''}/archive/{month}/",
+        f'month: "{month}"',
+        f"entry_count: {len(month_names)}",
+        "---",
+        "",
+        '<section class="hero">',
+        f'  <h1 class="hero__title">{label}</h1>',
+        f'  <p class="hero__subtitle">{len(month_names)} entries.</p>',
+        f'  <div class="chips">{"".join(nav)}</div>',
+        "</section>",
+        "",
+        "{% include entry_filters.html %}",
+        "",
+        '<section class="stack">',
+        _cards(list(reversed(month_names))),
+        "</section>",
+        "",
+    ])
+    return _write(PAGES_DIR / f"{month}.html", page)
+
+
+def render_redirects(archive_dir: Path = ARCHIVE_DIR) -> int:
+    """One stub per archived entry at its old /entries/<date>/ permalink, pointing at the month page.
+
+    Stubs of entries that are live again are removed. Returns files written or removed.
+    """
+    archived = set()
+    for year in archived_years(archive_dir):
+        archived.update(n[:-3] for n in load_index(year, archive_dir)["records"]
+                        if not (ENTRIES_DIR / n).exists())
+    written = 0
+    for date in sorted(archived):
+        month_url = _url("/archive/" + date[:7] + "/")
+        page = "\n".join([
+            "---",
+            "layout: null",
+            f"permalink: {WIKI_PATH or ''}/entries/{date}/",
+            "sitemap: false",
+            "---",
+            "<!doctype html>",
+            '<html lang="en">',
+            '<meta charset="utf-8">',
+            f"<title>{date} · archived entry</title>",
+            "<link rel=\"canonical\" href=\"{{ '" + (WIKI_PATH or "") + "/archive/" + date[:7] + "/' | absolute_url }}\">",
+            f'<meta http-equiv="refresh" content="0; url={month_url}">',
+            '<meta name="robots" content="noindex">',
+            f'<p>The entry for {date} is in the <a href="{month_url}">{date[:7]} archive</a>.</p>',
+            "</html>",
+            "",
+        ])
+        written += _write(REDIRECTS_DIR / f"{date}.html", page)
+    for stale in REDIRECTS_DIR.glob("*.html"):
+        if stale.stem not in archived:
+            stale.unlink()
+            written += 1
+    return written
+
+
+def render_indexes(names: list[str]) -> int:
+    counts = _months(names)
+    links = [f'<a class="chip" href="{_url("/archive/" + m + "/")}">{m} ({counts[m]})</a>' for m in sorted(counts, reverse=True)]
+    written = _write(MONTHS_INCLUDE, '<div class="chips">' + "".join(links) + "</div>\n")
+    written += _write(LATEST_INCLUDE, _cards(list(reversed(names[-LATEST_N:]))) + "\n")
+    return written
+
+
+def render_changes() -> int:
+    """Re-render the months touched by changelog events since this stage's cursor, plus the includes.
+
+    A month page that is new also refreshes its neighbours' prev/next links.
+    Without a cursor (first run) everything is rendered.
+    """
+    cursor = changelog.get_cursor(STAGE)
+    if cursor is None:
+        return render_all()
+    events, offset = changelog.read_since(cursor)
+    touched = {e["name"][:7] for e in events if e["type"] != "topic_changed"}
+    written = 0
+    if touched:
+        names = entry_names()
+        months = sorted(_months(names))
+        targets = set()
+        for month in touched & set(months):
+            targets.add(month)
+            if not (PAGES_DIR / f"{month}.html").exists():
+                i = months.index(month)
+                targets.update(months[max(0, i - 1):i + 2])
+        for m in sorted(targets):
+            written += render_month(m, names, months)
+        written += render_indexes(names)
+    changelog.set_cursor(STAGE, offset)
+    return written
+
+
+def render_all() -> int:
+    offset = changelog.end_offset()
+    names = entry_names()
+    months = sorted(_months(names))
+    written = sum(render_month(m, names, months) for m in months)
+    for stale in PAGES_DIR.glob("*.html"):
+        if stale.stem not in months:
+            stale.unlink()
+            written += 1
+    written += render_indexes(names)
+    written += render_redirects()
+    changelog.set_cursor(STAGE, offset)
+    return written
+
+
+def main():
+    n = render_all()
+    print(f"OK archive pages written={n}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
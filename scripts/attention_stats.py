@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""Online attention statistics, maintained at ingest time.
+
+Every daily entry folds into small running aggregates instead of requiring a
+rescan of _entries/:
+
+- per topic (by topic_key): Welford mean/variance of pageviews, EWMA of
+  pageviews, min/max rank, last date, current/longest daily streak
+- global: the same pageview aggregates across all entries, plus a count-min
+  sketch of title frequency
+
+State lives in _state/attention_stats.json. Each update is O(1) and returns an
+anomaly score (pageview z-score vs the topic's own history, or vs the global
+history while the topic has fewer than two prior appearances) that daily_run
+writes into the entry front matter.
+
+Backfilled dates older than a topic's last date still update the moment/rank
+aggregates but leave EWMA and streaks alone, since those are order-dependent.
+
+Usage: python scripts/attention_stats.py   (rebuild state from _entries/)
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import hashlib
+import json
+import math
+from pathlib import Path
+
+from entry_archive import iter_fronts
+from topic_index import TopicIndex
+from wiki_config import STATE_DIR, collection_dir
+
+ENTRIES_DIR = collection_dir("_entries")
+STATS_PATH = STATE_DIR / "attention_stats.json"
+STATS_VERSION = 1
+
+EWMA_ALPHA = 0.3
+CMS_WIDTH = 1024
+CMS_DEPTH = 4
+MIN_HISTORY = 2
+
+
+def _moments() -> dict:
+    return {"n": 0, "mean": 0.0, "m2": 0.0, "ewma": None, "min_rank": None, "max_rank": None}
+
+
+def _fold(m: dict, pageviews: int, rank: int, ordered: bool) -> None:
+    # Welford's online update
+    m["n"] += 1
+    delta = pageviews - m["mean"]
+    m["mean"] += delta / m["n"]
+    m["m2"] += delta * (pageviews - m["mean"])
+    if ordered:
+        m["ewma"] = pageviews if m["ewma"] is None else EWMA_ALPHA * pageviews + (1 - EWMA_ALPHA) * m["ewma"]
+    if rank:
+        m["min_rank"] = rank if m["min_rank"] is None else min(m["min_rank"], rank)
+        m["max_rank"] = rank if m["max_rank"] is None else max(m["max_rank"], rank)
+
+
+def zscore(m: dict, pageviews: int) -> float | None:
+    if m["n"] < MIN_HISTORY:
+        return None
+    var = m["m2"] / (m["n"] - 1)
+    if var <= 0:
+        return 0.0
+    return (pageviews - m["mean"]) / math.sqrt(var)
+
+
+def _cms_cells(title: str):
+    key = (title or "").strip().lower().encode("utf-8")
+    for row in range(CMS_DEPTH):
+        h = hashlib.blake2b(key, digest_size=8, salt=row.to_bytes(16, "little")).digest()
+        yield row, int.from_bytes(h, "little") % CMS_WIDTH
+
+
+class AttentionStats:
+    def __init__(self, data: dict | None = None):
+        data = data or {}
+        self.topics: dict[str, dict] = data.get("topics", {})
+        self.global_: dict = data.get("global") or _moments()
+        self.cms: list[list[int]] = data.get("title_cms") or [[0] * CMS_WIDTH for _ in range(CMS_DEPTH)]
+        self.last_date: str | None = data.get("last_date")
+
+    @classmethod
+    def load(cls, path: Path = STATS_PATH, topic_index: TopicIndex | None = None) -> "AttentionStats":
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == STATS_VERSION:
+                return cls(data)
+        return cls.from_entries(ENTRIES_DIR, topic_index)
+
+    @classmethod
+    def from_entries(cls, entries_dir: Path = ENTRIES_DIR, topic_index: TopicIndex | None = None) -> "AttentionStats":
+        """One-time bootstrap: replay the existing ledger in date order."""
+        topic_index = topic_index or TopicIndex.load()
+        stats = cls()
+        for _name, fm in iter_fronts(entries_dir):
+            try:
+                d = _dt.date.fromisoformat(fm.get("date", ""))
+            except ValueError:
+                continue
+            key = fm.get("topic_key")
+            if not key:
+                key, _ = topic_index.register(
+                    language=fm.get("language"),
+                    page_id=fm.get("topic_page_id"),
+                    wikibase_item=fm.get("wikibase_item"),
+                    titles=[fm.get("normalized_title"), fm.get("canonical_title"), fm.get("topic_title")],
+                )
+            stats.update(
+                key,
+                d,
+                rank=int(fm.get("rank", "0") or 0),
+                pageviews=int(fm.get("pageviews", "0") or 0),
+                title=fm.get("normalized_title") or fm.get("topic_title") or "",
+            )
+        return stats
+
+    def save(self, path: Path = STATS_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": STATS_VERSION,
+            "global": self.global_,
+            "topics": self.topics,
+            "title_cms": self.cms,
+            "last_date": self.last_date,
+        }
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, sort_keys=True, separators=(",", ":")) + "\n", encoding="utf-8")
+        tmp.replace(path)
+
+    def update(self, key: str, d: _dt.date, *, rank: int, pageviews: int, title: str) -> dict:
+        """Fold one entry in; return its anomaly fields (scored against history before this entry)."""
+        t = self.topics.get(key)
+        if t is None:
+            t = _moments()
+            t.update({"last_date": None, "current_streak": 0, "longest_streak": 0})
+            self.topics[key] = t
+
+        z_topic = zscore(t, pageviews)
+        z_global = zscore(self.global_, pageviews)
+        if z_topic is not None:
+            score, basis = z_topic, "topic"
+        elif z_global is not None:
+            score, basis = z_global, "global"
+        else:
+            score, basis = None, None
+
+        iso = d.isoformat()
+        last = t["last_date"]
+        ordered = last is None or iso > last
+        _fold(t, pageviews, rank, ordered)
+        if ordered:
+            if last is not None and _dt.date.fromisoformat(last) == d - _dt.timedelta(days=1):
+                t["current_streak"] += 1
+            else:
+                t["current_streak"] = 1
+            t["longest_streak"] = max(t["longest_streak"], t["current_streak"])
+            t["last_date"] = iso
+
+        ordered = self.last_date is None or iso > self.last_date
+        _fold(self.global_, pageviews, rank, ordered)
+        if ordered:
+            self.last_date = iso
+        for row, col in _cms_cells(title):
+            self.cms[row][col] += 1
+
+        return {
+            "anomaly_score": None if score is None else round(score, 3),
+            "anomaly_basis": basis,
+        }
+
+    def title_count(self, title: str) -> int:
+        """Count-min estimate of how often a title has been logged (never under-counts)."""
+        return min(self.cms[row][col] for row, col in _cms_cells(title))
+
+    def topic(self, key: str) -> dict | None:
+        t = self.topics.get(key)
+        if t is None:
+            return None
+        out = dict(t)
+        out["stdev"] = math.sqrt(t["m2"] / (t["n"] - 1)) if t["n"] > 1 else None
+        return out
+
+
+def main():
+    stats = AttentionStats.from_entries(ENTRIES_DIR)
+    stats.save(STATS_PATH)
+    print(f"OK topics={len(stats.topics)} entries={stats.global_['n']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Startup and first-request benchmark for the fetch scripts.
+
+Reports, per script module, the import cost over a bare interpreter (best of
+RUNS fresh subprocesses), and per HTTP backend the time to import it, make a
+session, and complete the first and subsequent GETs against a local
+keep-alive server serving a gzip JSON payload shaped like a top list.
+
+Usage (from the repo root):
+  python scripts/bench_startup.py [runs]
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+SCRIPTS = Path(__file__).resolve().parent
+MODULES = ["daily_run", "generate_daily_brief", "rebuild_topics_and_entry_flags", "tag_entries", "build_api"]
+RUNS = 7
+FOLLOW_UPS = 20
+
+_PAYLOAD = gzip.compress(
+    json.dumps(
+        {"items": [{"articles": [{"article": f"Article_{i}", "rank": i, "views": 10_000_000 // i} for i in range(1, 1001)]}]}
+    ).encode("utf-8")
+)
+
+_IMPORT_PROBE = "import time,sys; t=time.perf_counter(); import {mod}; sys.stdout.write(str(time.perf_counter()-t))"
+
+_REQUEST_PROBE = """
+import time, sys
+t0 = time.perf_counter()
+from http_transport import make_session
+s = make_session("bench", "{backend}")
+t1 = time.perf_counter()
+r = s.get("{url}", timeout=5); r.json()
+t2 = time.perf_counter()
+for _ in range({n}):
+    s.get("{url}", timeout=5).json()
+t3 = time.perf_counter()
+sys.stdout.write(f"{{t1-t0}} {{t2-t1}} {{(t3-t2)/{n}}}")
+"""
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(_PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(_PAYLOAD)
+
+    def log_message(self, *args):
+        pass
+
+
+def _probe(code: str) -> str | None:
+    res = subprocess.run([sys.executable, "-c", code], cwd=SCRIPTS, capture_output=True, text=True)
+    return res.stdout if res.returncode == 0 else None
+
+
+def best_of(code: str, runs: int) -> list[float] | None:
+    best = None
+    for _ in range(runs):
+        out = _probe(code)
+        if out is None:
+            return None
+        vals = [float(x) for x in out.split()]
+        best = vals if best is None else [min(a, b) for a, b in zip(best, vals)]
+    return best
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    runs = int(argv[0]) if argv else RUNS
+
+    print(f"import cost (best of {runs}, ms)")
+    for mod in MODULES + ["requests"]:
+        res = best_of(_IMPORT_PROBE.format(mod=mod), runs)
+        print(f"  {mod:34s} " + (f"{res[0] * 1000:8.1f}" if res else "     n/a"))
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/top"
+    print(f"\nhttp backends (best of {runs}, ms): import+session  first GET  next GET (mean of {FOLLOW_UPS})")
+    try:
+        for backend in ("stdlib", "requests"):
+            res = best_of(_REQUEST_PROBE.format(backend=backend, url=url, n=FOLLOW_UPS), runs)
+            if res is None:
+                print(f"  {backend:10s} n/a (not installed)")
+                continue
+            print(f"  {backend:10s} {res[0] * 1000:14.1f} {res[1] * 1000:10.1f} {res[2] * 1000:10.2f}")
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
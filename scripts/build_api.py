@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""Build the static JSON API under api/v1/.
+
+Downstream consumers should read this instead of scraping rendered HTML or
+parsing markdown front matter themselves. Layout:
+
+- api/v1/manifest.json               version, months, counts, and an etag per file
+- api/v1/entries/<date>.json         one entry (typed front matter)
+- api/v1/entries/by-month/<YYYY-MM>.json
+                                     date-partitioned listing; `prev`/`next`
+                                     are cursors to the neighbouring months
+- api/v1/topics/<slug>.json          one topic summary incl. recent sentence_history
+- api/v1/topics/history/<slug>--p<n>.json
+                                     full history segments
+- api/v1/topics/index.json           topic listing
+
+Writes are incremental: a document is only rewritten when its hash differs from
+the one recorded in the previous manifest, and documents that disappeared are
+removed. Consumers can compare manifest etags and fetch just what changed.
+
+build_changes() does the same work only for what the changelog says changed
+since this stage's cursor: the entries named in entry events (plus their month
+listings, and a new month's neighbours for prev/next) and the topics named in
+topic_changed events (summary, history segments, and their row in the index).
+Without a cursor or a manifest it falls back to the full build().
+
+daily_run.py, tag_entries.py and migrations.py call build_changes() after
+render_changes(); the topic rebuild, which can delete topic pages without an
+event, calls build().
+
+Usage:
+  python scripts/build_api.py           # changes since the last run
+  python scripts/build_api.py --full    # rebuild and re-hash everything
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+import changelog
+from entry_archive import ARCHIVE_DIR, archived_years, iter_entry_texts, load_index, read_entry
+from wiki_config import WIKI_PATH, collection_dir
+
+ENTRIES_DIR = collection_dir("_entries")
+TOPICS_DIR = collection_dir("_topics")
+HISTORY_DIR = collection_dir("_topic_history")
+API_DIR = Path("api/v1" + (WIKI_PATH or ""))
+API_VERSION = 1
+STAGE = "build_api"
+
+# Fields that older entries stored as quoted strings; normalise for consumers.
+INT_FIELDS = {"topic_page_id", "source_revision_id", "rank", "pageviews", "namespace_id",
+              "times_seen_total", "sentence_changed_count", "sentence_length", "paragraph_length",
+              "thumbnail_width", "thumbnail_height", "original_image_width", "original_image_height",
+              "schema_version"}
+
+
+def _scalar(v: str):
+    v = v.strip()
+    if v.startswith('"') and v.endswith('"') and len(v) >= 2:
+        return v[1:-1].replace('\\"', '"').replace('\\\\', "\\")
+    if v in ("null", "~", ""):
+        return None
+    if v == "true":
+        return True
+    if v == "false":
+        return False
+    if v.startswith("[") and v.endswith("]"):
+        inner = v[1:-1].strip()
+        return [_scalar(x) for x in re.findall(r'"(?:[^"\\]|\\.)*"|[^,\s][^,]*', inner)] if inner else []
+    if re.fullmatch(r"-?\d+", v):
+        return int(v)
+    if re.fullmatch(r"-?\d+\.\d*(?:[eE][-+]?\d+)?", v):
+        return float(v)
+    return v
+
+
+def _typed(k: str, v):
+    if k in INT_FIELDS and isinstance(v, str) and v.lstrip("-").isdigit():
+        return int(v)
+    return v
+
+
+def parse_front(text: str) -> dict:
+    """Parse the subset of YAML our writers emit: scalars, inline lists, and lists of maps."""
+    lines = text.splitlines()
+    fm: dict = {}
+    if not lines or lines[0].strip() != "---":
+        return fm
+    cur_list = None
+    cur_item = None
+    for line in lines[1:]:
+        if line.strip() == "---":
+            break
+        if line.startswith("  - ") and cur_list is not None:
+            cur_item = {}
+            cur_list.append(cur_item)
+            line = "    " + line[4:]
+        if line.startswith("    ") and cur_item is not None:
+            k, sep, v = line.strip().partition(": ")
+            if sep:
+                cur_item[k] = _typed(k, _scalar(v))
+            continue
+        k, sep, v = line.partition(":")
+        if not sep:
+            continue
+        k = k.strip()
+        if v.strip() == "":
+            cur_list = fm[k] = []
+            cur_item = None
+            continue
+        cur_list = cur_item = None
+        fm[k] = _typed(k, _scalar(v))
+    return fm
+
+
+def _dump(doc) -> bytes:
+    return (json.dumps(doc, ensure_ascii=False, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def etag(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:20]
+
+
+class ApiWriter:
+    def __init__(self, root: Path, previous: dict):
+        self.root = root
+        self.previous = previous
+        self.files: dict[str, str] = {}
+        self.written = 0
+
+    def put(self, rel: str, doc) -> None:
+        data = _dump(doc)
+        tag = etag(data)
+        self.files[rel] = tag
+        path = self.root / rel
+        if self.previous.get(rel) == tag and path.exists():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(path)
+        self.written += 1
+
+    def drop(self, rel: str) -> None:
+        """Forget a document (incremental builds start from the previous file set); prune() removes it."""
+        self.files.pop(rel, None)
+
+    def prune(self) -> int:
+        removed = 0
+        for rel in self.previous:
+            if rel not in self.files:
+                (self.root / rel).unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def load_manifest(root: Path = API_DIR) -> dict:
+    path = root / "manifest.json"
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
+
+
+def _put_entry(w: ApiWriter, text: str) -> dict | None:
+    """Write one entry document; returns its month-listing row (None for text without a date)."""
+    fm = parse_front(text)
+    date = fm.get("date")
+    if not isinstance(date, str):
+        return None
+    fm.pop("layout", None)
+    w.put(f"entries/{date}.json", fm)
+    return {
+        "date": date,
+        "title": fm.get("topic_title") or fm.get("title"),
+        "topic_slug": fm.get("topic_slug"),
+        "rank": fm.get("rank"),
+        "pageviews": fm.get("pageviews"),
+        "change_type": fm.get("change_type"),
+        "domain": fm.get("domain"),
+        "entity_type": fm.get("entity_type"),
+        "href": f"entries/{date}.json",
+    }
+
+
+def _put_month(w: ApiWriter, order: list[str], i: int, rows: list[dict]) -> None:
+    w.put(
+        f"entries/by-month/{order[i]}.json",
+        {
+            "month": order[i],
+            "prev": order[i - 1] if i > 0 else None,
+            "next": order[i + 1] if i + 1 < len(order) else None,
+            "entries": rows,
+        },
+    )
+
+
+def _put_topic(w: ApiWriter, tp: Path) -> dict:
+    """Write one topic summary document; returns its index row."""
+    fm = parse_front(tp.read_text(encoding="utf-8"))
+    fm.pop("layout", None)
+    fm["slug"] = tp.stem
+    w.put(f"topics/{tp.stem}.json", fm)
+    return {
+        "slug": tp.stem,
+        "title": fm.get("topic_title") or fm.get("title"),
+        "topic_key": fm.get("topic_key"),
+        "times_seen_total": fm.get("times_seen_total"),
+        "sentence_changed_count": fm.get("sentence_changed_count"),
+        "href": f"topics/{tp.stem}.json",
+    }
+
+
+def _put_segment(w: ApiWriter, hp: Path) -> None:
+    fm = parse_front(hp.read_text(encoding="utf-8"))
+    fm.pop("layout", None)
+    w.put(f"topics/history/{hp.stem}.json", fm)
+
+
+def _finish(w: ApiWriter, root: Path, order: list[str], entry_count: int, topic_count: int) -> dict:
+    removed = w.prune()
+    manifest = {
+        "version": API_VERSION,
+        "latest_month": order[-1] if order else None,
+        "months": order,
+        "entry_count": entry_count,
+        "topic_count": topic_count,
+        "files": w.files,
+    }
+    data = _dump(manifest)
+    mpath = root / "manifest.json"
+    if not mpath.exists() or mpath.read_bytes() != data:
+        root.mkdir(parents=True, exist_ok=True)
+        mpath.write_bytes(data)
+        w.written += 1
+    return {"written": w.written, "removed": removed, "files": len(w.files)}
+
+
+def build(entries_dir: Path = ENTRIES_DIR, topics_dir: Path = TOPICS_DIR, root: Path = API_DIR,
+          history_dir: Path = HISTORY_DIR) -> dict:
+    offset = changelog.end_offset()
+    w = ApiWriter(root, load_manifest(root).get("files", {}))
+
+    months: dict[str, list[dict]] = {}
+    for _name, text in iter_entry_texts(entries_dir):
+        row = _put_entry(w, text)
+        if row:
+            months.setdefault(row["date"][:7], []).append(row)
+    order = sorted(months)
+    for i, month in enumerate(order):
+        _put_month(w, order, i, months[month])
+
+    topics = [_put_topic(w, tp) for tp in sorted(topics_dir.glob("*.md"))]
+    w.put("topics/index.json", {"topics": topics})
+    for hp in sorted(history_dir.glob("*.md")):
+        _put_segment(w, hp)
+
+    res = _finish(w, root, order, sum(len(v) for v in months.values()), len(topics))
+    changelog.set_cursor(STAGE, offset)
+    return res
+
+
+def _month_names(month: str, entries_dir: Path, archive_dir: Path) -> list[str]:
+    """Entry file names of one month, live or archived. Reads no entry bodies."""
+    names = {p.name for p in entries_dir.glob(f"{month}-*.md")}
+    if int(month[:4]) in archived_years(archive_dir):
+        names.update(n for n in load_index(int(month[:4]), archive_dir)["records"] if n.startswith(month))
+    return sorted(names)
+
+
+def build_changes(entries_dir: Path = ENTRIES_DIR, topics_dir: Path = TOPICS_DIR, root: Path = API_DIR,
+                  history_dir: Path = HISTORY_DIR, archive_dir: Path = ARCHIVE_DIR) -> dict:
+    """Rewrite the documents of entries and topics named in changelog events since this stage's cursor.
+
+    Month listings, the topic index and the manifest are patched from their
+    previous versions, so the work is proportional to the events, not to the
+    ledger. Without a cursor or a previous manifest this is build().
+    """
+    cursor = changelog.get_cursor(STAGE)
+    previous = load_manifest(root)
+    index_path = root / "topics" / "index.json"
+    if cursor is None or not previous or not index_path.exists():
+        return build(entries_dir, topics_dir, root, history_dir)
+    events, offset = changelog.read_since(cursor)
+    w = ApiWriter(root, previous.get("files", {}))
+    w.files = dict(w.previous)
+
+    touched = {e["name"][:7] for e in events if e["type"] != "topic_changed"}
+    order = list(previous.get("months", []))
+    entry_count = previous.get("entry_count", 0)
+    months: dict[str, list[dict]] = {}
+    for month in sorted(touched):
+        rows = []
+        for name in _month_names(month, entries_dir, archive_dir):
+            text = read_entry(name, entries_dir, archive_dir)
+            row = _put_entry(w, text) if text is not None else None
+            if row:
+                rows.append(row)
+        old = root / f"entries/by-month/{month}.json"
+        if old.exists():
+            entry_count -= len(json.loads(old.read_text(encoding="utf-8"))["entries"])
+        entry_count += len(rows)
+        months[month] = rows
+    new = {m for m, rows in months.items() if rows} - set(order)
+    order = sorted(set(order) | new)
+    for month in new:
+        # A new month changes its neighbours' prev/next cursors.
+        i = order.index(month)
+        for m in order[max(0, i - 1):i + 2]:
+            if m not in months:
+                months[m] = json.loads((root / f"entries/by-month/{m}.json").read_text(encoding="utf-8"))["entries"]
+    for month, rows in months.items():
+        _put_month(w, order, order.index(month), rows)
+
+    slugs = {e["name"] for e in events if e["type"] == "topic_changed"}
+    topics = {row["slug"]: row for row in json.loads(index_path.read_text(encoding="utf-8"))["topics"]}
+    for slug in sorted(slugs):
+        tp = topics_dir / f"{slug}.md"
+        segments = set()
+        if tp.exists():
+            topics[slug] = _put_topic(w, tp)
+            for seg in parse_front(tp.read_text(encoding="utf-8")).get("history_segments") or []:
+                hp = history_dir / f"{seg}.md"
+                if hp.exists():
+                    _put_segment(w, hp)
+                    segments.add(f"topics/history/{seg}.json")
+        else:
+            topics.pop(slug, None)
+            w.drop(f"topics/{slug}.json")
+        prefix = f"topics/history/{slug}--p"
+        for rel in [r for r in w.files if r.startswith(prefix) and r not in segments]:
+            w.drop(rel)
+    if slugs:
+        # Same order as build(), which lists _topics/*.md sorted by file name.
+        w.put("topics/index.json", {"topics": [topics[s] for s in sorted(topics, key=lambda s: f"{s}.md")]})
+
+    res = _finish(w, root, order, entry_count, len(topics))
+    changelog.set_cursor(STAGE, offset)
+    return res
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    res = build() if "--full" in argv else build_changes()
+    print(f"OK api files={res['files']} written={res['written']} removed={res['removed']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
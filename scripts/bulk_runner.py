@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Shared runner for bulk read-modify-write passes over _entries/*.md.
+
+A transform is a module-level function `fn(text, arg) -> text`. The runner
+shards (path, arg) jobs across a process pool, writes changed files via a
+temp file + rename (an interrupted run never leaves half-written front
+matter), and reports per-worker throughput.
+
+BULK_WORKERS=<n> overrides the worker count (default: all cores; 1 runs
+in-process).
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import sys
+import time
+from functools import partial
+from pathlib import Path
+
+
+def atomic_write_text(path: Path, text: str) -> None:
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as fh:
+            fh.write(text)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+@contextlib.contextmanager
+def file_lock(path: Path):
+    """Exclusive advisory lock for a file several processes update (held on a hidden `.<name>.lock`)."""
+    import fcntl
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.with_name(f".{path.name}.lock").open("a") as fh:
+        fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fh, fcntl.LOCK_UN)
+
+
+def worker_count(n_jobs: int) -> int:
+    env = os.environ.get("BULK_WORKERS")
+    n = int(env) if env else (os.cpu_count() or 1)
+    return max(1, min(n, n_jobs))
+
+
+def _apply(fn, job) -> tuple[int, bool, float, Path]:
+    path, arg = job
+    t0 = time.perf_counter()
+    txt = path.read_text(encoding="utf-8")
+    new = fn(txt, arg)
+    changed = new != txt
+    if changed:
+        atomic_write_text(path, new)
+    return os.getpid(), changed, time.perf_counter() - t0, path
+
+
+def run_bulk(fn, jobs, *, label: str = "bulk", workers: int | None = None, changed_paths: list | None = None) -> int:
+    """Apply fn to every (path, arg) job; return the number of files changed.
+
+    Paths of changed files are appended to `changed_paths` when given.
+    """
+    jobs = [(Path(p), arg) for p, arg in jobs]
+    if not jobs:
+        return 0
+    workers = workers or worker_count(len(jobs))
+    t0 = time.perf_counter()
+
+    if workers == 1:
+        results = [_apply(fn, job) for job in jobs]
+    else:
+        # Large chunks keep IPC overhead small; each worker still gets several shards.
+        chunksize = max(1, len(jobs) // (workers * 4))
+        from concurrent.futures import ProcessPoolExecutor  # deferred: ~15 ms import, unused in-process
+
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(partial(_apply, fn), jobs, chunksize=chunksize))
+
+    wall = time.perf_counter() - t0
+    per_worker: dict[int, list] = {}
+    changed = 0
+    for pid, ch, dt, path in results:
+        w = per_worker.setdefault(pid, [0, 0.0])
+        w[0] += 1
+        w[1] += dt
+        changed += ch
+        if ch and changed_paths is not None:
+            changed_paths.append(path)
+
+    print(f"{label}: files={len(jobs)} changed={changed} workers={workers} wall={wall:.2f}s "
+          f"({len(jobs) / wall if wall else 0:.0f} files/s)", file=sys.stderr)
+    for pid, (n, busy) in sorted(per_worker.items()):
+        print(f"  worker {pid}: files={n} busy={busy:.2f}s ({n / busy if busy else 0:.0f} files/s)", file=sys.stderr)
+    return changed
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Append-only log of ledger changes, with per-stage cursors.
+
+Every script that writes ledger files appends one JSON line per changed file
+to _state/changelog.jsonl:
+
+  {"type": "entry_added", "name": "2026-03-02.md", "hash": "...", "source": "daily_run", "ts": "..."}
+
+Types:
+- entry_added    daily_run wrote a new entry
+- entry_patched  the rebuild rewrote derived fields of an entry (live or archived)
+- tags_changed   tag_entries rewrote an entry's tags
+- topic_changed  a topic summary page was written with different content (`name` is the slug)
+
+`hash` is the sha256 (first 16 hex digits) of the file content after the
+change, so a consumer can skip work it has already done for that content.
+
+Downstream stages (archive_pages, ...) keep a cursor, the byte offset
+they have consumed up to, in _state/changelog_cursors.json. They read only
+the events after it, so their work is proportional to what changed, not to
+ledger size. A stage without a cursor does a full build and then starts
+from the end of the log.
+
+Usage:
+  python scripts/changelog.py [tail [N] | cursors]
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from wiki_config import STATE_DIR
+
+LOG_PATH = STATE_DIR / "changelog.jsonl"
+CURSORS_PATH = STATE_DIR / "changelog_cursors.json"
+EVENT_TYPES = ("entry_added", "entry_patched", "tags_changed", "topic_changed")
+
+
+def content_hash(text: str | bytes) -> str:
+    data = text.encode("utf-8") if isinstance(text, str) else text
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def event(kind: str, name: str, text: str | bytes, source: str) -> dict:
+    if kind not in EVENT_TYPES:
+        raise ValueError(f"unknown changelog event type {kind!r}")
+    return {"type": kind, "name": name, "hash": content_hash(text), "source": source}
+
+
+def append(events: list[dict], path: Path = LOG_PATH) -> int:
+    """Durably append events (one write + fsync per batch). Returns the number appended."""
+    if not events:
+        return 0
+    ts = _dt.datetime.now(_dt.timezone.utc).replace(microsecond=0).isoformat().replace("+00:00", "Z")
+    data = "".join(json.dumps(dict(e, ts=ts), ensure_ascii=False, separators=(",", ":")) + "\n" for e in events)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+    return len(events)
+
+
+def end_offset(path: Path = LOG_PATH) -> int:
+    return path.stat().st_size if path.exists() else 0
+
+
+def read_since(offset: int, path: Path = LOG_PATH) -> tuple[list[dict], int]:
+    """Events after byte `offset`, and the offset to store once they are processed.
+
+    A trailing partial line (a writer that died mid-append) is left for later.
+    """
+    if not path.exists():
+        return [], 0
+    with path.open("rb") as fh:
+        fh.seek(offset)
+        data = fh.read()
+    complete = data.rfind(b"\n") + 1
+    events = [json.loads(line) for line in data[:complete].splitlines() if line.strip()]
+    return events, offset + complete
+
+
+def load_cursors(path: Path = CURSORS_PATH) -> dict[str, int]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def get_cursor(stage: str, path: Path = CURSORS_PATH) -> int | None:
+    return load_cursors(path).get(stage)
+
+
+def set_cursor(stage: str, offset: int, path: Path = CURSORS_PATH) -> None:
+    cursors = load_cursors(path)
+    cursors[stage] = offset
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(cursors, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    tmp.replace(path)
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["cursors"]:
+        end = end_offset()
+        for stage, off in sorted(load_cursors().items()):
+            pending, _ = read_since(off)
+            print(f"{stage}: offset={off} pending={len(pending)}")
+        print(f"OK changelog bytes={end}")
+        return 0
+    if argv[:1] in (["tail"], []):
+        n = int(argv[1]) if len(argv) > 1 else 20
+        events, _ = read_since(0)
+        for e in events[-n:]:
+            print(f"{e['ts']}  {e['type']:<14} {e['name']}  {e['hash']}  ({e['source']})")
+        print(f"OK changelog events={len(events)}")
+        return 0
+    print("usage: changelog.py [tail [N] | cursors]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Read-only ledger consistency check.
+
+Streams every entry once (live and archived, in date order), folds each
+topic's appearances into a compact state table with the same rules as
+rebuild_topics_and_entry_flags.py, and compares the result with:
+
+- each entry's times_seen_total, first_seen, days_since_last_seen,
+  sentence_changed, change_type, topic_key and topic_slug
+- each topic summary page's times_seen_total, sentence_changed_count,
+  first_seen, topic_key and history_pages, plus missing and orphaned pages
+
+Nothing is written (the topic identity index is only consulted in memory).
+Every offending file is listed with expected vs. found values; the exit status
+is 1 when there is drift, so CI can run this on every commit and only run the
+destructive rebuild when it fails.
+
+Usage:
+  python scripts/check_ledger.py [--rebuild]   # --rebuild: rebuild only if drift
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+
+from entry_archive import is_archived
+from rebuild_topics_and_entry_flags import ENTRIES_DIR, TOPICS_DIR, advance, change_hash, iter_entries, read_front, register_topic
+from topic_index import TopicIndex
+from topic_pages import segment_count
+
+# Compact per-topic state: (first_seen, times, changed_count, last_hash, last_date).
+_FIRST, _TIMES, _CHANGED, _HASH, _LAST = range(5)
+
+
+def _expand(row) -> dict | None:
+    if row is None:
+        return None
+    return {"first_seen": row[_FIRST], "times": row[_TIMES], "changed_count": row[_CHANGED],
+            "last_hash": row[_HASH], "last_date": row[_LAST]}
+
+
+def expected_entry_fields(st: dict, key: str, slug: str) -> dict[str, str]:
+    """Front-matter values (unquoted, as read_front returns them) the rebuild would write."""
+    return {
+        "times_seen_total": str(st["times"]),
+        "first_seen": st["first_seen"].isoformat(),
+        "days_since_last_seen": "null" if st["days_since"] is None else str(st["days_since"]),
+        "sentence_changed": "true" if st["sentence_changed"] else "false",
+        "change_type": st["change_type"],
+        "topic_key": key,
+        "topic_slug": slug,
+    }
+
+
+def check(topic_index: TopicIndex | None = None) -> tuple[list[tuple[str, str, str, str]], dict]:
+    """Return ([(file, field, expected, found)], stats)."""
+    topic_index = topic_index or TopicIndex.load(topics_dir=TOPICS_DIR)
+    table: dict[str, tuple] = {}
+    problems = []
+    n_entries = 0
+
+    for d, name, fm in iter_entries():
+        n_entries += 1
+        key, slug = register_topic(topic_index, fm)
+        st = advance(_expand(table.get(key)), d, change_hash(fm))
+        table[key] = (st["first_seen"], st["times"], st["changed_count"], st["last_hash"], st["last_date"])
+        where = f"_archive:{name}" if is_archived(name, ENTRIES_DIR) else str(ENTRIES_DIR / name)
+        for field, want in expected_entry_fields(st, key, slug).items():
+            got = fm.get(field)
+            if got != want:
+                problems.append((where, field, want, "<missing>" if got is None else got))
+
+    seen_pages = set()
+    for key, row in table.items():
+        slug = topic_index.slug_for(key)
+        path = TOPICS_DIR / f"{slug}.md"
+        seen_pages.add(path.name)
+        if not path.exists():
+            problems.append((str(path), "<page>", "present", "<missing>"))
+            continue
+        tfm = read_front(path)
+        want = {
+            "times_seen_total": str(row[_TIMES]),
+            "sentence_changed_count": str(row[_CHANGED]),
+            "first_seen": row[_FIRST].isoformat(),
+            "topic_key": key,
+            "history_pages": str(segment_count(row[_TIMES])),
+        }
+        for field, w in want.items():
+            got = tfm.get(field)
+            if got != w:
+                problems.append((str(path), field, w, "<missing>" if got is None else got))
+
+    for tp in sorted(TOPICS_DIR.glob("*.md")):
+        if tp.name not in seen_pages:
+            problems.append((str(tp), "<page>", "<absent>", "orphan"))
+
+    return problems, {"entries": n_entries, "topics": len(table)}
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    t0 = time.perf_counter()
+    problems, stats = check()
+    elapsed = time.perf_counter() - t0
+    for path, field, want, got in problems:
+        print(f"{path}: {field}: expected {want!r}, found {got!r}")
+    files = len({p[0] for p in problems})
+    status = "DRIFT" if problems else "OK"
+    print(f"{status} entries={stats['entries']} topics={stats['topics']} problems={len(problems)} files={files} "
+          f"({elapsed:.2f}s)", file=sys.stderr)
+    if problems and "--rebuild" in argv:
+        from rebuild_topics_and_entry_flags import main as rebuild
+
+        rebuild()
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
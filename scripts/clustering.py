@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""Similarity clustering for the daily brief.
+
+Documents (title, plus description and lead paragraph where we have them) are
+turned into TF-IDF vectors and MinHash signatures. LSH banding proposes
+candidate pairs, which are kept when their TF-IDF cosine clears a threshold;
+documents sharing a `wikibase_item` are linked outright. Connected pairs are
+merged with union-find.
+
+Everything is sparse and pure Python (LSH instead of a dense similarity
+matrix), so clustering the whole top-100 or top-1000 candidate pool each day
+stays in the millisecond-to-sub-second range.
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import re
+from collections import Counter, defaultdict
+
+NUM_PERM = 64
+BANDS = 32  # rows per band = NUM_PERM // BANDS; low rows -> high recall on short texts
+SIM_THRESHOLD = 0.18
+_MERSENNE = (1 << 61) - 1
+
+STOPWORDS = frozenset(
+    """
+    the and for are was were with from that this which who whom whose into onto over under than then
+    its his her their they them has have had not but also been being can could would should may might
+    one two three first second new old about after before during between while where when what
+    american british english united states known best most more other such only some many both each
+    film series season list born died year years game team
+    """.split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9'\-]+")
+
+# Fixed permutation coefficients so signatures are stable across runs.
+_PERMS = [
+    (
+        int.from_bytes(hashlib.blake2b(f"a{i}".encode(), digest_size=8).digest(), "little") % _MERSENNE | 1,
+        int.from_bytes(hashlib.blake2b(f"b{i}".encode(), digest_size=8).digest(), "little") % _MERSENNE,
+    )
+    for i in range(NUM_PERM)
+]
+
+
+def tokens(text: str) -> list[str]:
+    return [t.strip("'-") for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS and len(t) > 2]
+
+
+def _token_hash(tok: str) -> int:
+    return int.from_bytes(hashlib.blake2b(tok.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash(token_hashes: list[int]) -> tuple[int, ...]:
+    if not token_hashes:
+        return tuple([_MERSENNE] * NUM_PERM)
+    return tuple(min((a * h + b) % _MERSENNE for h in token_hashes) for a, b in _PERMS)
+
+
+def tfidf(docs_tokens: list[list[str]]) -> list[dict[str, float]]:
+    n = len(docs_tokens)
+    df = Counter()
+    for toks in docs_tokens:
+        df.update(set(toks))
+    vecs = []
+    for toks in docs_tokens:
+        tf = Counter(toks)
+        v = {t: (1 + math.log(c)) * math.log((1 + n) / (1 + df[t])) for t, c in tf.items()}
+        norm = math.sqrt(sum(x * x for x in v.values())) or 1.0
+        vecs.append({t: x / norm for t, x in v.items()})
+    return vecs
+
+
+def cosine(a: dict[str, float], b: dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(x * b.get(t, 0.0) for t, x in a.items())
+
+
+def lsh_pairs(sigs: list[tuple[int, ...]]) -> set[tuple[int, int]]:
+    rows = NUM_PERM // BANDS
+    pairs = set()
+    for band in range(BANDS):
+        buckets = defaultdict(list)
+        for i, sig in enumerate(sigs):
+            if sig[0] == _MERSENNE:
+                continue
+            buckets[sig[band * rows:(band + 1) * rows]].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def cluster_documents(texts: list[str], qids: list[str | None] | None = None, threshold: float = SIM_THRESHOLD):
+    """Return (cluster id per document, top terms per cluster id).
+
+    Cluster ids are the index of each cluster's first member, so they are stable
+    for a given input order.
+    """
+    n = len(texts)
+    qids = qids or [None] * n
+    toks = [tokens(t) for t in texts]
+    vecs = tfidf(toks)
+    sigs = [minhash([_token_hash(t) for t in set(tk)]) for tk in toks]
+
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i, j):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    for i, j in lsh_pairs(sigs):
+        if cosine(vecs[i], vecs[j]) >= threshold:
+            union(i, j)
+    by_qid = {}
+    for i, q in enumerate(qids):
+        if q:
+            if q in by_qid:
+                union(i, by_qid[q])
+            else:
+                by_qid[q] = i
+
+    labels = [find(i) for i in range(n)]
+    weights: dict[int, Counter] = defaultdict(Counter)
+    for i, cid in enumerate(labels):
+        for t, x in vecs[i].items():
+            weights[cid][t] += x
+    terms = {cid: [t for t, _ in w.most_common(3)] for cid, w in weights.items()}
+    return labels, terms
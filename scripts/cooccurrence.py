@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""Same-day co-occurrence graph of articles in the daily top lists.
+
+Nodes are article titles (as they appear in the pageviews top list); an edge
+between two articles accumulates 1 for every day both were in the day's top
+GRAPH_TOP_N normal articles, decayed with a HALF_LIFE_DAYS half-life.
+
+Storage (_state/cooccurrence/) is a compact CSR adjacency:
+
+- nodes.jsonl         article titles, one JSON string per line; node id = line number
+- indptr.bin          int64, CSR rows + 1
+- indices.bin         int32 neighbour ids, each row sorted
+- weights.bin         float64 stored weights
+- pending.bin         (u, v, w) triples not yet merged into the CSR arrays
+- meta.json           scale, last_date, applied days, and how many nodes and
+                      pending triples of the append-only files are valid
+
+Decay is lazy: true weight = stored weight * scale, and moving to a new day
+only shrinks `scale`, so nothing is touched per edge. A day's pairs go to the
+pending buffer, which is merged once it grows past a fraction of the CSR.
+Between merges save() only appends the day's triples and new titles (files
+are first cut back to the lengths meta.json vouches for, so a crashed save
+leaves no trace) and rewrites meta.json: the per-day cost is proportional to
+the day's pairs, not to the graph. A merge (compact()) drops faded edges and
+the nodes left without any, renumbers, and rewrites every file.
+
+The graph is derived state and is not tracked in git; load() replays the
+stored top lists when it is missing.
+
+Usage:
+  python scripts/cooccurrence.py neighbors "Some_Article" [k]
+  python scripts/cooccurrence.py components [min_weight]
+  python scripts/cooccurrence.py rebuild      # replay _state/toplists/
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import heapq
+import json
+import os
+import sys
+from array import array
+from pathlib import Path
+
+from toplist_store import load_top, stored_days
+from wiki_config import STATE_DIR
+
+GRAPH_DIR = STATE_DIR / "cooccurrence"
+GRAPH_TOP_N = 100
+HALF_LIFE_DAYS = 14
+DAY_FACTOR = 0.5 ** (1 / HALF_LIFE_DAYS)
+PRUNE_BELOW = 0.05
+COMPACT_MIN = 20000
+COMPACT_RATIO = 0.25
+MIN_SCALE = 1e-200
+
+
+def is_normal(title: str) -> bool:
+    if title == "Main_Page":
+        return False
+    if title.startswith(("Special:", "File:", "Talk:", "User:", "Wikipedia:")):
+        return False
+    return True
+
+
+def _read_array(path: Path, typecode: str, byteorder: str) -> array:
+    arr = array(typecode)
+    if path.exists():
+        arr.frombytes(path.read_bytes())
+        if byteorder != sys.byteorder:
+            arr.byteswap()
+    return arr
+
+
+def _write_array(path: Path, arr: array) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(arr.tobytes())
+    tmp.replace(path)
+
+
+def _append(path: Path, valid_bytes: int, data: bytes) -> None:
+    """Append `data` after the first `valid_bytes` of `path` (dropping anything a crashed save left)."""
+    with path.open("ab") as fh:
+        fh.truncate(valid_bytes)
+        fh.write(data)
+
+
+class CooccurrenceGraph:
+    def __init__(self, root: Path = GRAPH_DIR):
+        self.root = root
+        self.nodes: list[str] = []
+        self.node_id: dict[str, int] = {}
+        self.indptr = array("q", [0])
+        self.indices = array("i")
+        self.weights = array("d")
+        # (min id, max id) -> stored weight, not yet in the CSR arrays
+        self.pending: dict[tuple[int, int], float] = {}
+        self.scale = 1.0
+        self.last_date: _dt.date | None = None
+        self.days: set[str] = set()
+        # What is on disk: node and pending-triple counts, the triples added since, and whether
+        # save() must rewrite everything (after compact(), a rescale, or on first save).
+        self._saved_nodes = 0
+        self._saved_pending = 0
+        self._fresh: list[tuple[int, int, float]] = []
+        self._rewrite = True
+
+    @classmethod
+    def load(cls, root: Path = GRAPH_DIR, replay: bool = True) -> "CooccurrenceGraph":
+        """The saved graph. With none on disk (a fresh checkout: only _state/toplists/ is
+        tracked) and `replay` set, it is first rebuilt from the stored top lists."""
+        g = cls(root)
+        meta_p = root / "meta.json"
+        if not meta_p.exists():
+            return rebuild(root) if replay and stored_days() else g
+        meta = json.loads(meta_p.read_text(encoding="utf-8"))
+        bo = meta.get("byteorder", sys.byteorder)
+        if meta.get("version", 1) < 2:
+            g.nodes = json.loads((root / "nodes.json").read_text(encoding="utf-8"))
+            n_pend = None
+        else:
+            with (root / "nodes.jsonl").open(encoding="utf-8") as fh:
+                g.nodes = [json.loads(line) for _, line in zip(range(meta["nodes"]), fh)]
+            n_pend = meta["pending"]
+        g.node_id = {t: i for i, t in enumerate(g.nodes)}
+        g.indptr = _read_array(root / "indptr.bin", "q", bo) or array("q", [0])
+        g.indices = _read_array(root / "indices.bin", "i", bo)
+        g.weights = _read_array(root / "weights.bin", "d", bo)
+        pend = _read_array(root / "pending.bin", "d", bo)
+        if n_pend is not None:
+            del pend[3 * n_pend:]
+        for i in range(0, len(pend), 3):
+            k = (int(pend[i]), int(pend[i + 1]))
+            g.pending[k] = g.pending.get(k, 0.0) + pend[i + 2]
+        g.scale = meta["scale"]
+        g.last_date = _dt.date.fromisoformat(meta["last_date"]) if meta.get("last_date") else None
+        g.days = set(meta.get("days", []))
+        g._saved_nodes = len(g.nodes)
+        g._saved_pending = len(pend) // 3
+        g._rewrite = n_pend is None or bo != sys.byteorder
+        return g
+
+    def save(self) -> None:
+        if len(self.pending) > max(COMPACT_MIN, COMPACT_RATIO * len(self.indices)):
+            self.compact()
+        self.root.mkdir(parents=True, exist_ok=True)
+        if self._rewrite:
+            _write_array(self.root / "indptr.bin", self.indptr)
+            _write_array(self.root / "indices.bin", self.indices)
+            _write_array(self.root / "weights.bin", self.weights)
+            pend = array("d")
+            for (u, v), w in sorted(self.pending.items()):
+                pend.extend((u, v, w))
+            _write_array(self.root / "pending.bin", pend)
+            tmp = self.root / "nodes.jsonl.tmp"
+            tmp.write_text("".join(json.dumps(t, ensure_ascii=False) + "\n" for t in self.nodes), encoding="utf-8")
+            tmp.replace(self.root / "nodes.jsonl")
+            (self.root / "nodes.json").unlink(missing_ok=True)
+            n_pend = len(pend) // 3
+        else:
+            nodes_p = self.root / "nodes.jsonl"
+            with nodes_p.open("rb") as fh:
+                valid = sum(len(line) for _, line in zip(range(self._saved_nodes), fh))
+            new = "".join(json.dumps(t, ensure_ascii=False) + "\n" for t in self.nodes[self._saved_nodes:])
+            _append(nodes_p, valid, new.encode("utf-8"))
+            pend = array("d")
+            for u, v, w in self._fresh:
+                pend.extend((u, v, w))
+            _append(self.root / "pending.bin", self._saved_pending * 3 * pend.itemsize, pend.tobytes())
+            n_pend = self._saved_pending + len(self._fresh)
+        meta = {
+            "version": 2,
+            "byteorder": sys.byteorder,
+            "half_life_days": HALF_LIFE_DAYS,
+            "top_n": GRAPH_TOP_N,
+            "scale": self.scale,
+            "last_date": self.last_date.isoformat() if self.last_date else None,
+            "days": sorted(self.days),
+            "nodes": len(self.nodes),
+            "pending": n_pend,
+        }
+        tmp = self.root / "meta.json.tmp"
+        tmp.write_text(json.dumps(meta, indent=2) + "\n", encoding="utf-8")
+        tmp.replace(self.root / "meta.json")
+        self._saved_nodes, self._saved_pending, self._fresh, self._rewrite = len(self.nodes), n_pend, [], False
+
+    # --- updates ---------------------------------------------------------
+
+    def _id(self, title: str) -> int:
+        i = self.node_id.get(title)
+        if i is None:
+            i = self.node_id[title] = len(self.nodes)
+            self.nodes.append(title)
+        return i
+
+    def _rescale(self) -> None:
+        for i in range(len(self.weights)):
+            self.weights[i] *= self.scale
+        for k in self.pending:
+            self.pending[k] *= self.scale
+        self.scale = 1.0
+        self._rewrite = True
+
+    def add_day(self, day: _dt.date, titles: list[str]) -> bool:
+        """Record one day's top list (already filtered to normal articles). Idempotent per day."""
+        if day.isoformat() in self.days:
+            return False
+        if self.last_date is None or day > self.last_date:
+            if self.last_date is not None:
+                self.scale *= DAY_FACTOR ** (day - self.last_date).days
+                if self.scale < MIN_SCALE:
+                    self._rescale()
+            self.last_date = day
+            inc = 1.0 / self.scale
+        else:
+            # Backfilled day: enters already faded relative to last_date.
+            inc = DAY_FACTOR ** (self.last_date - day).days / self.scale
+        ids = sorted({self._id(t) for t in titles[:GRAPH_TOP_N]})
+        pending = self.pending
+        fresh = self._fresh
+        for x in range(len(ids)):
+            u = ids[x]
+            for v in ids[x + 1:]:
+                pending[(u, v)] = pending.get((u, v), 0.0) + inc
+                fresh.append((u, v, inc))
+        self.days.add(day.isoformat())
+        return True
+
+    def compact(self) -> None:
+        """Merge the pending buffer into the CSR arrays, dropping faded edges and the nodes left without any."""
+        n = len(self.nodes)
+        extra: list[dict[int, float]] = [{} for _ in range(n)]
+        for (u, v), w in self.pending.items():
+            extra[u][v] = extra[u].get(v, 0.0) + w
+            extra[v][u] = extra[v].get(u, 0.0) + w
+        floor = PRUNE_BELOW / self.scale
+        indptr = array("q", [0])
+        indices = array("i")
+        weights = array("d")
+        old_rows = len(self.indptr) - 1
+        for u in range(n):
+            row = extra[u]
+            if u < old_rows:
+                for p in range(self.indptr[u], self.indptr[u + 1]):
+                    v = self.indices[p]
+                    row[v] = row.get(v, 0.0) + self.weights[p]
+            for v in sorted(row):
+                if row[v] >= floor:
+                    indices.append(v)
+                    weights.append(row[v])
+            indptr.append(len(indices))
+        # Renumber without orphans (ids keep their order, so rows stay sorted).
+        keep = [u for u in range(n) if indptr[u + 1] > indptr[u]]
+        new_id = {u: i for i, u in enumerate(keep)}
+        self.indptr = array("q", [0])
+        for u in keep:
+            self.indptr.append(self.indptr[-1] + indptr[u + 1] - indptr[u])
+        self.indices = array("i", (new_id[v] for v in indices))
+        self.weights = weights
+        self.nodes = [self.nodes[u] for u in keep]
+        self.node_id = {t: i for i, t in enumerate(self.nodes)}
+        self.pending = {}
+        self._fresh = []
+        self._rewrite = True
+
+    # --- queries ---------------------------------------------------------
+
+    def _row(self, u: int) -> dict[int, float]:
+        row = {}
+        if u + 1 < len(self.indptr):
+            for p in range(self.indptr[u], self.indptr[u + 1]):
+                row[self.indices[p]] = self.weights[p]
+        if self.pending:
+            for (a, b), w in self.pending.items():
+                if a == u:
+                    row[b] = row.get(b, 0.0) + w
+                elif b == u:
+                    row[a] = row.get(a, 0.0) + w
+        return row
+
+    def weight(self, a: str, b: str) -> float:
+        u, v = self.node_id.get(a), self.node_id.get(b)
+        if u is None or v is None:
+            return 0.0
+        return self._row(u).get(v, 0.0) * self.scale
+
+    def neighbors(self, title: str, k: int = 10) -> list[tuple[str, float]]:
+        """What trends alongside `title`: the k heaviest co-occurring articles."""
+        u = self.node_id.get(title)
+        if u is None:
+            return []
+        best = heapq.nlargest(k, self._row(u).items(), key=lambda kv: kv[1])
+        return [(self.nodes[v], round(w * self.scale, 4)) for v, w in best if w * self.scale >= PRUNE_BELOW]
+
+    def components(self, min_weight: float = 1.0) -> list[list[str]]:
+        """Connected components over edges weighing at least min_weight, largest first.
+
+        Isolated articles are left out.
+        """
+        n = len(self.nodes)
+        parent = list(range(n))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        floor = min_weight / self.scale
+        rows = len(self.indptr) - 1
+        for u in range(rows):
+            for p in range(self.indptr[u], self.indptr[u + 1]):
+                v = self.indices[p]
+                if v > u and self.weights[p] + self.pending.get((u, v), 0.0) >= floor:
+                    ru, rv = find(u), find(v)
+                    if ru != rv:
+                        parent[max(ru, rv)] = min(ru, rv)
+        for (u, v), w in self.pending.items():
+            if w >= floor:
+                ru, rv = find(u), find(v)
+                if ru != rv:
+                    parent[max(ru, rv)] = min(ru, rv)
+        groups: dict[int, list[str]] = {}
+        for i in range(n):
+            groups.setdefault(find(i), []).append(self.nodes[i])
+        comps = [g for g in groups.values() if len(g) > 1]
+        comps.sort(key=lambda g: (-len(g), g[0]))
+        return comps
+
+
+def rebuild(root: Path = GRAPH_DIR) -> CooccurrenceGraph:
+    g = CooccurrenceGraph(root)
+    for day in stored_days():
+        arts = load_top(day) or []
+        g.add_day(day, [a["article"] for a in arts if is_normal(a["article"])])
+    g.compact()
+    g.save()
+    return g
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    cmd = argv[0] if argv else ""
+    if cmd == "rebuild":
+        g = rebuild()
+        print(f"OK cooccurrence days={len(g.days)} nodes={len(g.nodes)} edges={len(g.indices) // 2}")
+        return 0
+    if cmd == "neighbors" and len(argv) in (2, 3):
+        g = CooccurrenceGraph.load()
+        for title, w in g.neighbors(argv[1], int(argv[2]) if len(argv) == 3 else 10):
+            print(f"{w:8.3f}  {title}")
+        return 0
+    if cmd == "components" and len(argv) in (1, 2):
+        g = CooccurrenceGraph.load()
+        for comp in g.components(float(argv[1]) if len(argv) == 2 else 1.0):
+            print(f"{len(comp):4d}  " + ", ".join(comp[:8]) + (" ..." if len(comp) > 8 else ""))
+        return 0
+    print("usage: cooccurrence.py neighbors <title> [k] | components [min_weight] | rebuild", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
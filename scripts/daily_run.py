@@ -5,7 +5,9 @@ Fetch yesterday's Wikimedia Top Articles list and create 3 entries (weighted ran
 no replacement) using Wikipedia REST Summary.
 
 Designed for GitHub Pages/Jekyll: writes markdown files into _entries/ and updates
-or creates topic pages in _topics/.
+or creates topic summary pages in _topics/ plus history segments in
+_topic_history/, then refreshes the archive pages and the JSON API
+(build_api.py) for what changed.
 
 No external dependencies.
 """
@@ -14,26 +16,31 @@ from __future__ import annotations
 
 import datetime as _dt
 import hashlib
+import os
 import random
 import re
-import sys
-import time
 import urllib.parse
 from dataclasses import dataclass
 from pathlib import Path
 
-import requests
+import changelog
+from entry_archive import entry_exists
+from schema import SCHEMA_VERSION
+from sentences import first_declarative, first_paragraph
+from topic_index import TopicIndex
+from topic_pages import append_segment, parse_history, write_segments, write_summary
+from wiki_config import ACCESS, LANG, PROJECT, WIKI_PATH, collection_dir
 
-LANG = "en"
-PROJECT = "wikipedia"
-ACCESS = "all-access"
 AGENT_NAME = "wikiledger"
 AGENT_VERSION = "1.0.0"
 
-ENTRIES_DIR = Path("_entries")
-TOPICS_DIR = Path("_topics")
+ENTRIES_DIR = collection_dir("_entries")
+TOPICS_DIR = collection_dir("_topics")
 
 USER_AGENT = "WikiLedgerBot/1.0"
+# Overridable so the fetch path can run against scripts/wikimedia_standin.py.
+METRICS_API = os.environ.get("WIKIMEDIA_METRICS_API", "https://wikimedia.org/api/rest_v1")
+SUMMARY_API = os.environ.get("WIKIPEDIA_REST_API", f"https://{LANG}.{PROJECT}.org/api/rest_v1")
 
 
 def yq(s):
@@ -65,46 +72,19 @@ def is_normal(title: str) -> bool:
     return True
 
 
-def first_paragraph(extract: str) -> str:
-    raw = (extract or "").strip()
-    if not raw:
-        return ""
-    parts = re.split(r"\n\s*\n", raw)
-    para = parts[0] if parts else raw
-    para = para.split("\n", 1)[0]
-    return re.sub(r"\s+", " ", para).strip()
+def get_json(session, url: str, *, tries: int = 6, timeout=None):
+    from http_transport import fetch  # deferred with the rest of the transport
 
+    doc, r = fetch(session, url, tries=tries, timeout=timeout)
+    return doc, r.headers.get("x-request-id", ""), r.status_code
 
-def first_declarative(paragraph: str) -> str | None:
-    text = re.sub(r"\s+", " ", (paragraph or "").strip())
-    for m in re.finditer(r"\.(?:\s|$)", text):
-        sent = text[: m.end()].strip()
-        if len(sent) < 20:
-            continue
-        if not re.search(r"[A-Za-z]", sent):
-            continue
-        return sent
-    return None
 
+def get_raw(session, url: str, *, tries: int = 6, timeout=None):
+    """Like get_json, but the 200 body comes back as bytes."""
+    from http_transport import fetch
 
-def get_json(session: requests.Session, url: str, *, tries: int = 6, timeout: int = 30):
-    last = None
-    for i in range(tries):
-        try:
-            r = session.get(url, timeout=timeout)
-            if r.status_code == 200:
-                return r.json(), r.headers.get("x-request-id", ""), 200
-            if r.status_code == 404:
-                return None, r.headers.get("x-request-id", ""), 404
-            if r.status_code in (429, 500, 502, 503, 504):
-                last = r.status_code
-                time.sleep(1.2 * (i + 1))
-                continue
-            r.raise_for_status()
-        except Exception as e:
-            last = e
-            time.sleep(1.2 * (i + 1))
-    raise RuntimeError(f"GET failed {url}: {last}")
+    body, r = fetch(session, url, tries=tries, timeout=timeout, decode=False)
+    return body, r.headers.get("x-request-id", ""), r.status_code
 
 
 def read_front(path: Path) -> dict:
@@ -132,70 +112,67 @@ class Picked:
     top_articles_date: _dt.date
 
 
-def fetch_top_for(entry_date: _dt.date, session: requests.Session) -> tuple[list[dict], str, _dt.date]:
-    """Return top articles json list for a day near (entry_date-1).
+def fetch_top_for(entry_date: _dt.date, session) -> tuple[bytes, str, _dt.date]:
+    """Return the raw top articles response body for a day near (entry_date-1).
 
-    API often lags; we fall back up to 7 days.
+    API often lags; we fall back up to 7 days. Callers decode only the part
+    they need (toplist_store.top_candidates).
     """
     top_day = entry_date - _dt.timedelta(days=1)
     for back in range(0, 8):
         day_try = top_day - _dt.timedelta(days=back)
         url = (
-            f"https://wikimedia.org/api/rest_v1/metrics/pageviews/top/"
+            f"{METRICS_API}/metrics/pageviews/top/"
             f"{LANG}.{PROJECT}/{ACCESS}/{day_try.year:04d}/{day_try.month:02d}/{day_try.day:02d}"
         )
-        js, trace, code = get_json(session, url)
+        body, trace, code = get_raw(session, url)
         if code == 200:
-            return js["items"][0]["articles"], trace, day_try
+            return body, trace, day_try
     raise RuntimeError(f"No top list found for {entry_date} (tried back 7d)")
 
 
-def weighted_sample_without_replacement(pop, weights, k, rng: random.Random):
-    chosen = []
-    pool = list(pop)
-    w = list(weights)
-    for _ in range(min(k, len(pool))):
-        total = sum(w)
-        r = rng.random() * total
-        acc = 0.0
-        idx = 0
-        for i, wi in enumerate(w):
-            acc += wi
-            if acc >= r:
-                idx = i
-                break
-        chosen.append(pool.pop(idx))
-        w.pop(idx)
-    return chosen
-
-
 def main():
     ENTRIES_DIR.mkdir(exist_ok=True)
     TOPICS_DIR.mkdir(exist_ok=True)
 
     run_date = _dt.date.today()  # host local date
     # Allow backfills: set ENTRY_DATE=YYYY-MM-DD to force the entry date
-    import os
     entry_date_env = os.environ.get('ENTRY_DATE')
     entry_date = _dt.date.fromisoformat(entry_date_env) if entry_date_env else (run_date - _dt.timedelta(days=1))
 
-    # Abort if we already have an entry for the target date
-    for ep in ENTRIES_DIR.glob("*.md"):
-        fm = read_front(ep)
-        if fm.get("date") == entry_date.isoformat():
-            print("ABORT: entry date already exists")
-            return 0
+    # Abort if we already have an entry for the target date (live or archived)
+    if entry_exists(entry_date, ENTRIES_DIR):
+        print("ABORT: entry date already exists")
+        return 0
+
+    # Deferred past the early exit (and off `import daily_run`): http.client/ssl are most
+    # of our import time, and the rest is only needed once there is an entry to write.
+    import image_manifest
+    import wikidata_enrich
+    from archive_pages import render_changes
+    from attention_stats import AttentionStats
+    from build_api import build_changes
+    from cooccurrence import GRAPH_TOP_N, CooccurrenceGraph, is_normal as graph_normal
+    from http_transport import make_session
+    from toplist_store import save_raw, top_candidates
 
-    session = requests.Session()
-    session.headers["User-Agent"] = USER_AGENT
+    session = make_session(USER_AGENT)
 
     # Top articles list corresponds to the entry_date
-    arts, trace_top, top_day_used = fetch_top_for(entry_date + _dt.timedelta(days=1), session)
+    raw_top, trace_top, top_day_used = fetch_top_for(entry_date + _dt.timedelta(days=1), session)
+    save_raw(top_day_used, raw_top)
 
-    cand = [a for a in arts if is_normal(a.get("article", ""))][:100]
+    cand = top_candidates(raw_top, is_normal, 100)
     if len(cand) < 3:
         raise RuntimeError("Not enough candidates in top 100")
 
+    # The graph's day must be what cooccurrence.rebuild() derives from the stored list,
+    # so it takes the graph's own filter (which also drops Wikipedia: pages) and top N.
+    graph = CooccurrenceGraph.load()
+    graph_titles = [a["article"] for a in top_candidates(raw_top, graph_normal, GRAPH_TOP_N)]
+    if graph.add_day(top_day_used, graph_titles):
+        graph.save()
+
     weights = [1.0 / max(1, int(a["rank"])) for a in cand]
 
     rng = random.Random(int(entry_date.strftime("%Y%m%d")))
@@ -211,7 +188,7 @@ def main():
             raise RuntimeError("Too many attempts to build entry")
 
         article = pick["article"]
-        url_sum = f"https://{LANG}.wikipedia.org/api/rest_v1/page/summary/{urllib.parse.quote(article, safe='')}"
+        url_sum = f"{SUMMARY_API}/page/summary/{urllib.parse.quote(article, safe='')}"
         sumj, trace_sum, code = get_json(session, url_sum)
         if code == 200:
             lead_paragraph = first_paragraph(sumj.get("extract"))
@@ -224,6 +201,11 @@ def main():
         pick = rng2.choices(cand, weights=weights, k=1)[0]
 
     picks = [(pick, sumj, trace_sum, lead_sentence, lead_paragraph)]
+    events = []
+    images = image_manifest.load()
+
+    topic_index = TopicIndex.load()
+    attention = AttentionStats.load(topic_index=topic_index)
 
     # Create entries and update topics incrementally
     # NOTE: topic pages are append-only; sentence_changed compares to last occurrence in that topic.
@@ -236,7 +218,6 @@ def main():
 
         canonical_title = sumj.get("title") or pick["article"].replace("_", " ")
         normalized_title = (sumj.get("titles", {}) or {}).get("normalized") or canonical_title
-        topic_slug = slugify(normalized_title)
 
         page_id = sumj.get("pageid")
         rev_id = sumj.get("revision")
@@ -251,6 +232,7 @@ def main():
         topic_url = content_urls.get("page") or ((sumj.get("content_urls", {}) or {}).get("mobile", {}) or {}).get("page")
         thumb = sumj.get("thumbnail") or {}
         orig = sumj.get("originalimage") or {}
+        image_manifest.add(images, *image_manifest.from_summary(sumj))
 
         sentence_hash = hashlib.sha256(lead_sentence.encode("utf-8")).hexdigest()
         sentence_length = len(lead_sentence)
@@ -291,6 +273,15 @@ def main():
         else:
             domain = "news"
 
+        # Wikidata classes beat the regexes where we map them (a request only for a QID not yet cached).
+        try:
+            wd_cache, _ = wikidata_enrich.ensure(session, [wikibase])
+            wd_entity, wd_domain = wikidata_enrich.tags_for(wd_cache.get(wikibase))
+        except RuntimeError:
+            wd_entity = wd_domain = None
+        entity_type = wd_entity or entity_type
+        domain = wd_domain or domain
+
         extra = []
         if _has(r"\b(court|trial|judge|lawsuit|indictment|doj|fbi)\b"):
             extra.append("legal")
@@ -308,9 +299,20 @@ def main():
             if len(tags) >= 4:
                 break
 
+        # Resolve the topic by page id / Wikidata item / title aliases so renames and
+        # slug collisions never split or merge histories.
+        topic_key, topic_slug = topic_index.register(
+            language=LANG,
+            page_id=page_id,
+            wikibase_item=wikibase,
+            titles=[normalized_title, canonical_title, pick["article"].replace("_", " ")],
+        )
         topic_path = TOPICS_DIR / f"{topic_slug}.md"
 
-        # Read topic history (minimal)
+        # O(1) running stats; the score compares today's views with prior history only.
+        anomaly = attention.update(topic_key, entry_date, rank=rank, pageviews=pageviews, title=normalized_title)
+
+        # Read topic summary (counters + recent history tail)
         times_seen_total = 1
         first_seen = entry_date
         days_since_last_seen = None
@@ -318,43 +320,23 @@ def main():
         change_type = "first_seen"
         sentence_changed_count = 1
         hist = []
+        total_before = 0
+        legacy_hist = None
 
         if topic_path.exists():
             tfm = read_front(topic_path)
             times_seen_total = int(tfm.get("times_seen_total", "1")) + 1
             sentence_changed_count = int(tfm.get("sentence_changed_count", "0"))
-
-            # parse existing sentence_history dates + hashes
-            raw = topic_path.read_text(encoding="utf-8").splitlines()
-            in_hist = False
-            current = None
-            for line in raw:
-                if line.strip() == "sentence_history:":
-                    in_hist = True
-                    continue
-                if not in_hist:
-                    continue
-                if line.strip() == "---":
-                    break
-                if line.startswith("  - "):
-                    if current:
-                        hist.append(current)
-                    current = {}
-                    line2 = line[4:]
-                    if ": " in line2:
-                        k, v = line2.split(": ", 1)
-                        hist[-1:]  # noop
-                        current[k] = v.strip().strip('"')
-                elif line.startswith("    ") and current is not None:
-                    l = line.strip()
-                    if ": " in l:
-                        k, v = l.split(": ", 1)
-                        current[k] = v.strip().strip('"')
-            if current:
-                hist.append(current)
+            hist = parse_history(topic_path)
+            if tfm.get("history_pages") is None:
+                # Pre-segmentation page: it holds the full history; split it on this write.
+                legacy_hist = hist
+                total_before = len(hist)
+            else:
+                total_before = int(tfm.get("times_seen_total", "0"))
 
             if hist:
-                first_seen = _dt.date.fromisoformat(hist[0]["date"])
+                first_seen = _dt.date.fromisoformat(tfm.get("first_seen") or hist[0]["date"])
                 last_date = _dt.date.fromisoformat(hist[-1]["date"])
                 days_since_last_seen = (entry_date - last_date).days
                 if hist[-1].get("sentence_hash") == sentence_hash:
@@ -389,8 +371,12 @@ def main():
             yaml_kv("description_source", desc_src),
             yaml_kv("canonical_title", canonical_title),
             yaml_kv("normalized_title", normalized_title),
+            yaml_kv("topic_key", topic_key),
+            yaml_kv("topic_slug", topic_slug),
             yaml_kv("rank", rank),
             yaml_kv("pageviews", pageviews),
+            yaml_kv("anomaly_score", anomaly["anomaly_score"]),
+            yaml_kv("anomaly_basis", anomaly["anomaly_basis"]),
             yaml_kv("times_seen_total", times_seen_total),
             yaml_kv("first_seen", first_seen.isoformat()),
             yaml_kv("days_since_last_seen", days_since_last_seen),
@@ -410,6 +396,8 @@ def main():
             yaml_kv("thumbnail_width", thumb.get("width")),
             yaml_kv("thumbnail_height", thumb.get("height")),
             yaml_kv("original_image_url", orig.get("source")),
+            yaml_kv("original_image_width", orig.get("width")),
+            yaml_kv("original_image_height", orig.get("height")),
             yaml_kv("agent_name", AGENT_NAME),
             yaml_kv("agent_version", AGENT_VERSION),
             yaml_kv("entity_type", entity_type),
@@ -417,27 +405,34 @@ def main():
             yaml_kv("tags_version", "v1"),
             "tags: [" + ", ".join('"' + t + '"' for t in tags) + "]",
             yaml_kv("top_articles_date", top_day_used.isoformat()),
+            yaml_kv("schema_version", SCHEMA_VERSION),
             "---",
             "",
         ]
+        if WIKI_PATH:
+            fm[-2:-2] = [yaml_kv("wiki_path", WIKI_PATH)]
+
+        entry_text = "\n".join(fm)
+        entry_path.write_text(entry_text, encoding="utf-8")
+        events.append(changelog.event("entry_added", entry_path.name, entry_text, "daily_run"))
+
+        # Append to topic history: only the summary page and the last segment are rewritten
+        item = {
+            "date": entry_date.isoformat(),
+            "rank": rank,
+            "pageviews": pageviews,
+            "lead_sentence": lead_sentence,
+            "sentence_hash": sentence_hash,
+            "change_type": change_type,
+            "source_revision_id": int(rev_id or 0),
+        }
+        seg_meta = {"topic_title": canonical_title}
+        if legacy_hist is not None:
+            write_segments(topic_slug, seg_meta, legacy_hist + [item])
+        else:
+            append_segment(topic_slug, seg_meta, item, total_before)
 
-        entry_path.write_text("\n".join(fm), encoding="utf-8")
-
-        # Rewrite topic page with appended history
-        hist.append(
-            {
-                "date": entry_date.isoformat(),
-                "rank": rank,
-                "pageviews": pageviews,
-                "lead_sentence": lead_sentence,
-                "sentence_hash": sentence_hash,
-                "change_type": change_type,
-                "source_revision_id": int(rev_id or 0),
-            }
-        )
-
-        out = [
-            "---",
+        meta = [
             yaml_kv("layout", "topic"),
             yaml_kv("title", canonical_title),
             yaml_kv("topic_title", canonical_title),
@@ -451,21 +446,27 @@ def main():
             yaml_kv("description_source", desc_src),
             yaml_kv("canonical_title", canonical_title),
             yaml_kv("normalized_title", normalized_title),
-            yaml_kv("times_seen_total", len(hist)),
+            yaml_kv("topic_key", topic_key),
+            yaml_kv("times_seen_total", total_before + 1),
             yaml_kv("sentence_changed_count", sentence_changed_count),
-            "sentence_history:",
         ]
-        for item in hist:
-            out.append(f"  - date: {yq(item['date'])}")
-            out.append(f"    rank: {int(item['rank'])}")
-            out.append(f"    pageviews: {int(item['pageviews'])}")
-            out.append(f"    lead_sentence: {yq(item['lead_sentence'])}")
-            out.append(f"    sentence_hash: {yq(item['sentence_hash'])}")
-            out.append(f"    change_type: {yq(item['change_type'])}")
-            out.append(f"    source_revision_id: {int(item['source_revision_id'])}")
-        out += ["---", ""]
-
-        topic_path.write_text("\n".join(out), encoding="utf-8")
+        write_summary(
+            topic_path,
+            meta,
+            slug=topic_slug,
+            first_seen=first_seen.isoformat(),
+            hist_tail=hist + [item],
+            total=total_before + 1,
+        )
+        events.append(changelog.event("topic_changed", topic_slug, topic_path.read_bytes(), "daily_run"))
+
+    if topic_index.dirty:
+        topic_index.save()
+    attention.save()
+    image_manifest.save(images)
+    changelog.append(events)
+    render_changes()
+    build_changes()
 
     print("OK: wrote 1 entry")
     return 0
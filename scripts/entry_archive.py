@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Year-partitioned compressed archive for cold entries, plus the shared reader.
+
+`compact` packs every closed year (before the current one) of _entries/*.md
+into _archive/entries-<year>.jsonl.gz and removes the live files. Each record
+is its own gzip member holding one JSON line `{"name": ..., "text": ...}`, so
+the file as a whole is plain gzipped JSONL while the offset index in
+_archive/entries-<year>.idx.json (name -> [offset, length]) still allows O(1)
+random access to a single entry.
+
+Readers never care where an entry lives: `iter_entry_texts()` yields
+(name, text) from archives and live files together in name (= date) order, and
+`read_entry()` / `entry_exists()` are O(1). Writers use `transform_archives()`
+/ `rewrite_year()` to apply the same text transform to archived records.
+
+Note: Jekyll only renders live files, so archived days no longer get their own
+/entries/<date>/ page; `unpack <year>` restores them. Both commands re-render
+the archive pages, which keep a redirect stub at each archived day's URL
+(archive_pages.render_redirects).
+
+Usage:
+  python scripts/entry_archive.py compact       # pack all closed years
+  python scripts/entry_archive.py unpack 2025   # restore a year to _entries/
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import gzip
+import heapq
+import json
+import sys
+from pathlib import Path
+
+from wiki_config import collection_dir
+
+ENTRIES_DIR = collection_dir("_entries")
+ARCHIVE_DIR = collection_dir("_archive")
+ARCHIVE_VERSION = 1
+
+
+def archive_path(year: int, archive_dir: Path = ARCHIVE_DIR) -> Path:
+    return archive_dir / f"entries-{year}.jsonl.gz"
+
+
+def index_path(year: int, archive_dir: Path = ARCHIVE_DIR) -> Path:
+    return archive_dir / f"entries-{year}.idx.json"
+
+
+_index_cache: dict[Path, dict] = {}
+
+
+def load_index(year: int, archive_dir: Path = ARCHIVE_DIR) -> dict:
+    p = index_path(year, archive_dir)
+    idx = _index_cache.get(p)
+    if idx is None:
+        idx = json.loads(p.read_text(encoding="utf-8")) if p.exists() else {"records": {}}
+        _index_cache[p] = idx
+    return idx
+
+
+def archived_years(archive_dir: Path = ARCHIVE_DIR) -> list[int]:
+    years = []
+    for p in archive_dir.glob("entries-*.idx.json"):
+        y = p.name[len("entries-"):-len(".idx.json")]
+        if y.isdigit():
+            years.append(int(y))
+    return sorted(years)
+
+
+def parse_front(text: str) -> dict:
+    """Same semantics as the scripts' read_front(), but from text."""
+    lines = text.splitlines()
+    fm = {}
+    if not lines or lines[0].strip() != "---":
+        return fm
+    for line in lines[1:]:
+        if line.strip() == "---":
+            break
+        if ": " in line:
+            k, v = line.split(": ", 1)
+            v = v.strip()
+            if v.startswith('"') and v.endswith('"'):
+                v = v[1:-1].replace('\\"', '"').replace('\\\\', "\\")
+            fm[k.strip()] = v
+    return fm
+
+
+def _read_records(year: int, archive_dir: Path = ARCHIVE_DIR):
+    p = archive_path(year, archive_dir)
+    if not p.exists():
+        return
+    with gzip.open(p, "rt", encoding="utf-8") as fh:
+        for line in fh:
+            rec = json.loads(line)
+            yield rec["name"], rec["text"]
+
+
+def _write_year(year: int, records: dict[str, str], archive_dir: Path = ARCHIVE_DIR) -> None:
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    arc = archive_path(year, archive_dir)
+    idx_p = index_path(year, archive_dir)
+    offsets = {}
+    tmp = arc.with_name(arc.name + ".tmp")
+    with tmp.open("wb") as fh:
+        for name in sorted(records):
+            line = json.dumps({"name": name, "text": records[name]}, ensure_ascii=False) + "\n"
+            blob = gzip.compress(line.encode("utf-8"), mtime=0)
+            offsets[name] = [fh.tell(), len(blob)]
+            fh.write(blob)
+    idx = {"version": ARCHIVE_VERSION, "year": year, "records": offsets}
+    idx_tmp = idx_p.with_name(idx_p.name + ".tmp")
+    idx_tmp.write_text(json.dumps(idx, sort_keys=True) + "\n", encoding="utf-8")
+    tmp.replace(arc)
+    idx_tmp.replace(idx_p)
+    _index_cache[idx_p] = idx
+
+
+def read_entry(name: str, entries_dir: Path = ENTRIES_DIR, archive_dir: Path = ARCHIVE_DIR) -> str | None:
+    live = entries_dir / name
+    if live.exists():
+        return live.read_text(encoding="utf-8")
+    year = name[:4]
+    if not year.isdigit():
+        return None
+    rec = load_index(int(year), archive_dir)["records"].get(name)
+    if rec is None:
+        return None
+    offset, length = rec
+    with archive_path(int(year), archive_dir).open("rb") as fh:
+        fh.seek(offset)
+        line = gzip.decompress(fh.read(length)).decode("utf-8")
+    return json.loads(line)["text"]
+
+
+def entry_exists(date: _dt.date, entries_dir: Path = ENTRIES_DIR, archive_dir: Path = ARCHIVE_DIR) -> bool:
+    name = f"{date.isoformat()}.md"
+    if (entries_dir / name).exists():
+        return True
+    return name in load_index(date.year, archive_dir)["records"]
+
+
+def iter_entry_texts(entries_dir: Path = ENTRIES_DIR, archive_dir: Path = ARCHIVE_DIR):
+    """Yield (name, text) for every entry, archived or live, in name order.
+
+    A live file shadows an archived record of the same name (e.g. a backfill
+    into a closed year before the next compaction).
+    """
+    live = {p.name: p for p in entries_dir.glob("*.md")}
+
+    def archived():
+        for year in archived_years(archive_dir):
+            for name, text in _read_records(year, archive_dir):
+                if name not in live:
+                    yield name, text
+
+    def current():
+        for name in sorted(live):
+            yield name, live[name].read_text(encoding="utf-8")
+
+    # Both streams are already in name order (records are packed sorted).
+    yield from heapq.merge(archived(), current(), key=lambda rec: rec[0])
+
+
+def iter_fronts(entries_dir: Path = ENTRIES_DIR, archive_dir: Path = ARCHIVE_DIR):
+    for name, text in iter_entry_texts(entries_dir, archive_dir):
+        yield name, parse_front(text)
+
+
+def is_archived(name: str, entries_dir: Path = ENTRIES_DIR, archive_dir: Path = ARCHIVE_DIR) -> bool:
+    if (entries_dir / name).exists() or not name[:4].isdigit():
+        return False
+    return name in load_index(int(name[:4]), archive_dir)["records"]
+
+
+def rewrite_year(year: int, fn, archive_dir: Path = ARCHIVE_DIR, changed_records: list | None = None) -> int:
+    """Apply fn(name, text) -> text to every record of a year; repack only if something changed.
+
+    (name, new_text) of changed records are appended to `changed_records` when given.
+    """
+    records = {}
+    changed = 0
+    for name, text in _read_records(year, archive_dir):
+        new = fn(name, text)
+        if new != text:
+            changed += 1
+            if changed_records is not None:
+                changed_records.append((name, new))
+        records[name] = new
+    if changed:
+        _write_year(year, records, archive_dir)
+    return changed
+
+
+def transform_archives(fn, args: dict | None = None, archive_dir: Path = ARCHIVE_DIR,
+                       changed_records: list | None = None) -> int:
+    """Archive counterpart of bulk_runner.run_bulk: fn(text, arg), arg looked up by name.
+
+    With `args`, only records named in it are transformed.
+    """
+    changed = 0
+    for year in archived_years(archive_dir):
+        if args is None:
+            changed += rewrite_year(year, lambda name, text: fn(text, None), archive_dir, changed_records)
+        else:
+            changed += rewrite_year(year, lambda name, text: fn(text, args[name]) if name in args else text,
+                                    archive_dir, changed_records)
+    return changed
+
+
+def pack_year(year: int, entries_dir: Path = ENTRIES_DIR, archive_dir: Path = ARCHIVE_DIR) -> int:
+    live = sorted(entries_dir.glob(f"{year}-*.md"))
+    if not live:
+        return 0
+    records = dict(_read_records(year, archive_dir))
+    for p in live:
+        records[p.name] = p.read_text(encoding="utf-8")
+    _write_year(year, records, archive_dir)
+    for p in live:
+        p.unlink()
+    return len(live)
+
+
+def unpack_year(year: int, entries_dir: Path = ENTRIES_DIR, archive_dir: Path = ARCHIVE_DIR) -> int:
+    n = 0
+    for name, text in _read_records(year, archive_dir):
+        dest = entries_dir / name
+        if not dest.exists():
+            dest.write_text(text, encoding="utf-8")
+            n += 1
+    archive_path(year, archive_dir).unlink(missing_ok=True)
+    index_path(year, archive_dir).unlink(missing_ok=True)
+    _index_cache.pop(index_path(year, archive_dir), None)
+    return n
+
+
+def _render_pages() -> None:
+    from archive_pages import render_all  # archive_pages imports this module
+
+    print(f"archive pages written={render_all()}")
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    cmd = argv[0] if argv else "compact"
+    if cmd == "compact":
+        this_year = _dt.date.today().year
+        years = sorted({int(p.name[:4]) for p in ENTRIES_DIR.glob("*.md") if p.name[:4].isdigit()})
+        for year in years:
+            if year >= this_year:
+                continue
+            n = pack_year(year)
+            print(f"packed {year}: {n} entries -> {archive_path(year)}")
+        _render_pages()
+        return 0
+    if cmd == "unpack" and len(argv) == 2 and argv[1].isdigit():
+        n = unpack_year(int(argv[1]))
+        print(f"unpacked {argv[1]}: {n} entries")
+        _render_pages()
+        return 0
+    print("usage: entry_archive.py compact | unpack <year>", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
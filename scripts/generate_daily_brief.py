@@ -15,19 +15,27 @@ No external dependencies.
 from __future__ import annotations
 
 import datetime as _dt
+import os
 import random
-import re
-import time
 import urllib.parse
-from pathlib import Path
+from collections import Counter
 
-import requests
+import image_manifest
+from clustering import cluster_documents
+from cooccurrence import GRAPH_TOP_N, CooccurrenceGraph, is_normal as graph_normal
+from pageview_series import ensure_series, series, sparkline
+from sampling import weighted_sample_without_replacement
+from sentences import first_declarative, first_paragraph
+from toplist_store import save_raw, top_candidates
+from wiki_config import ACCESS, LANG, PROJECT, collection_dir
 
-LANG = 'en'
-PROJECT = 'wikipedia'
-ACCESS = 'all-access'
 USER_AGENT = 'WikiLedgerBot/1.0'
-BRIEFS_DIR = Path('_briefs')
+# Overridable so the fetch path can run against scripts/wikimedia_standin.py.
+METRICS_API = os.environ.get('WIKIMEDIA_METRICS_API', 'https://wikimedia.org/api/rest_v1')
+SUMMARY_API = os.environ.get('WIKIPEDIA_REST_API', f'https://{LANG}.{PROJECT}.org/api/rest_v1')
+BRIEFS_DIR = collection_dir('_briefs')
+# "compat" keeps the picks every earlier brief made for its date seed; see scripts/sampling.py.
+SAMPLE_METHOD = os.environ.get('BRIEF_SAMPLE_METHOD') or 'compat'
 
 
 def yq(s):
@@ -37,25 +45,6 @@ def yq(s):
     return '"' + s + '"'
 
 
-def first_paragraph(extract: str) -> str:
-    raw = (extract or '').strip()
-    if not raw:
-        return ''
-    parts = re.split(r'\n\s*\n', raw)
-    para = parts[0] if parts else raw
-    para = para.split('\n', 1)[0]
-    return re.sub(r'\s+', ' ', para).strip()
-
-
-def first_declarative(paragraph: str) -> str:
-    text = re.sub(r'\s+', ' ', (paragraph or '').strip())
-    for m in re.finditer(r'\.(?:\s|$)', text):
-        sent = text[: m.end()].strip()
-        if len(sent) >= 20 and re.search(r'[A-Za-z]', sent):
-            return sent
-    return text
-
-
 def is_normal(title: str) -> bool:
     if title == 'Main_Page':
         return False
@@ -64,43 +53,36 @@ def is_normal(title: str) -> bool:
     return True
 
 
-def get_json(session: requests.Session, url: str, tries: int = 6, timeout: int = 30):
-    last = None
-    for i in range(tries):
-        try:
-            r = session.get(url, timeout=timeout)
-            if r.status_code == 200:
-                return r.json(), 200
-            if r.status_code == 404:
-                return None, 404
-            if r.status_code in (429, 500, 502, 503, 504):
-                last = r.status_code
-                time.sleep(1.2 * (i + 1))
-                continue
-            r.raise_for_status()
-        except Exception as e:
-            last = e
-            time.sleep(1.2 * (i + 1))
-    raise RuntimeError(f'GET failed {url}: {last}')
-
-
-def weighted_sample_without_replacement(pop, weights, k, rng: random.Random):
-    chosen = []
-    pool = list(pop)
-    w = list(weights)
-    for _ in range(min(k, len(pool))):
-        total = sum(w)
-        r = rng.random() * total
-        acc = 0.0
-        idx = 0
-        for i, wi in enumerate(w):
-            acc += wi
-            if acc >= r:
-                idx = i
-                break
-        chosen.append(pool.pop(idx))
-        w.pop(idx)
-    return chosen
+def get_json(session, url: str, tries: int = 6, timeout=None):
+    from http_transport import fetch  # deferred with the rest of the transport
+
+    doc, r = fetch(session, url, tries=tries, timeout=timeout)
+    return doc, r.status_code
+
+
+def get_raw(session, url: str, tries: int = 6, timeout=None):
+    from http_transport import fetch
+
+    body, r = fetch(session, url, tries=tries, timeout=timeout, decode=False)
+    return body, r.status_code
+
+
+def is_candidate(title: str) -> bool:
+    return is_normal(title) and not title.startswith('Wikipedia:')
+
+
+def theme_of(text: str, top_terms: list[str]) -> str:
+    """Name a cluster: known recurring themes first, otherwise its top TF-IDF terms."""
+    t = text.lower()
+    if any(k in t for k in ['super bowl', 'halftime']):
+        return 'superbowl'
+    if any(k in t for k in ['seahawks', 'nfl', 'quarterback', 'placekicker']):
+        return 'nfl'
+    if any(k in t for k in ['epstein', 'maxwell']):
+        return 'epstein'
+    if 'winter olympics' in t or 'olympic' in t:
+        return 'olympics'
+    return ' / '.join(top_terms) or 'other'
 
 
 def main():
@@ -108,7 +90,6 @@ def main():
 
     run_date = _dt.date.today()
     # Allow backfills: set BRIEF_DATE=YYYY-MM-DD to force the brief date
-    import os
     brief_date_env = os.environ.get('BRIEF_DATE')
     brief_date = _dt.date.fromisoformat(brief_date_env) if brief_date_env else (run_date - _dt.timedelta(days=1))
 
@@ -117,43 +98,55 @@ def main():
         print('ABORT: brief already exists')
         return 0
 
-    session = requests.Session()
-    session.headers['User-Agent'] = USER_AGENT
+    from http_transport import make_session  # deferred: http.client/ssl are most of our import time
+
+    session = make_session(USER_AGENT)
 
     # top list: brief_date
     top_day = brief_date
-    top_json = None
+    raw_top = None
     for back in range(0, 8):
         d = top_day - _dt.timedelta(days=back)
-        url = f'https://wikimedia.org/api/rest_v1/metrics/pageviews/top/{LANG}.{PROJECT}/{ACCESS}/{d.year:04d}/{d.month:02d}/{d.day:02d}'
-        js, code = get_json(session, url)
+        url = f'{METRICS_API}/metrics/pageviews/top/{LANG}.{PROJECT}/{ACCESS}/{d.year:04d}/{d.month:02d}/{d.day:02d}'
+        body, code = get_raw(session, url)
         if code == 200:
-            top_json = js
+            raw_top = body
             top_list_date = d
             break
-    if top_json is None:
+    if raw_top is None:
         raise RuntimeError('No top list available')
 
-    arts = top_json['items'][0]['articles']
-    cand = [a for a in arts if is_normal(a.get('article', '')) and not a.get('article','').startswith('Wikipedia:')][:100]
+    save_raw(top_list_date, raw_top)
+    cand = top_candidates(raw_top, is_candidate, 100)
+
+    # Same selection as cooccurrence.rebuild() makes from the stored list (see daily_run.py).
+    graph = CooccurrenceGraph.load()
+    if graph.add_day(top_list_date, [a['article'] for a in top_candidates(raw_top, graph_normal, GRAPH_TOP_N)]):
+        graph.save()
     weights = [1.0 / max(1, int(a['rank'])) for a in cand]
 
     rng = random.Random(int(brief_date.strftime('%Y%m%d')))
-    picks = weighted_sample_without_replacement(cand, weights, 10, rng)
+    picks = weighted_sample_without_replacement(cand, weights, 10, rng, SAMPLE_METHOD)
 
     items = []
     domain_counts = {}
+    images = image_manifest.load()
     for a in picks:
         title = a['article']
         rank = int(a['rank']); views = int(a['views'])
-        url_sum = f'https://{LANG}.wikipedia.org/api/rest_v1/page/summary/{urllib.parse.quote(title, safe="")}'
+        url_sum = f'{SUMMARY_API}/page/summary/{urllib.parse.quote(title, safe="")}'
         sumj, _ = get_json(session, url_sum)
         para = first_paragraph(sumj.get('extract'))
-        sent = first_declarative(para)
+        sent = first_declarative(para) or para
         topic_url = ((sumj.get('content_urls', {}) or {}).get('desktop', {}) or {}).get('page')
-        thumb = (sumj.get('thumbnail') or {}).get('source')
+        thumb, image = image_manifest.from_summary(sumj)
+        image_manifest.add(images, thumb, image)
         items.append({
+            'article': title,
             'topic_title': sumj.get('title') or title.replace('_',' '),
+            'description': sumj.get('description') or '',
+            'lead_paragraph': para,
+            'wikibase_item': sumj.get('wikibase_item'),
             'rank': rank,
             'pageviews': views,
             'lead_sentence': sent,
@@ -171,30 +164,51 @@ def main():
     top3 = items_by_views[:3]
 
     body.append(f"- **Dominant:** {top3[0]['topic_title']} (rank {top3[0]['rank']}, {top3[0]['pageviews']:,} views) leads the day.\n")
+    alongside = [t.replace('_', ' ') for t, w in graph.neighbors(top3[0]['article'], 4) if w >= 2.0]
+    if alongside:
+        body.append(f"- **Usual company:** over recent weeks {top3[0]['topic_title']} has tended to chart alongside {', '.join(alongside)}.\n")
+    try:
+        start = brief_date - _dt.timedelta(days=29)
+        ensure_series(session, top3[0]['article'], start, brief_date)
+        curve = [v for _, v in series(top3[0]['article'], start, brief_date)]
+    except RuntimeError:
+        curve = []
+    if any(curve):
+        body.append(f"- **30-day curve:** `{sparkline(curve)}` (peak {max(v or 0 for v in curve):,} views/day).\n")
     body.append(f"- **Scale:** ~{total_views:,} total views across today’s 10-pick snapshot (top-100 weighted sample).\n")
 
-    # cluster heuristics
-    has_superbowl = any('super bowl' in (i['topic_title'] + ' ' + i.get('lead_sentence','')).lower() or 'halftime' in (i['topic_title'] + ' ' + i.get('lead_sentence','')).lower() for i in items)
-
-    def bucket(it):
-        t = (it['topic_title'] + ' ' + it.get('lead_sentence','')).lower()
-        if any(k in t for k in ['super bowl', 'halftime']):
-            return 'superbowl'
-        # If the day includes Super Bowl/halftime, treat performers as part of that attention engine.
-        if has_superbowl and any(k in t for k in ['singer', 'songwriter', 'rapper', 'record producer', 'actor', 'actress', 'concert']):
-            return 'superbowl'
-        if any(k in t for k in ['seahawks', 'nfl', 'quarterback', 'placekicker']):
-            return 'nfl'
-        if any(k in t for k in ['epstein', 'maxwell']):
-            return 'epstein'
-        if 'winter olympics' in t or 'olympic' in t:
-            return 'olympics'
-        return 'other'
+    # Similarity clusters over the whole candidate pool: picks carry title +
+    # description + lead paragraph, the rest of the pool just its title.
+    pick_by_article = {it['article']: it for it in items}
+    pool_texts = []
+    pool_qids = []
+    for a in cand:
+        it = pick_by_article.get(a['article'])
+        if it:
+            pool_texts.append(' '.join([it['topic_title'], it['description'], it['lead_paragraph']]))
+            pool_qids.append(it['wikibase_item'])
+        else:
+            pool_texts.append(a['article'].replace('_', ' '))
+            pool_qids.append(None)
+    labels, terms = cluster_documents(pool_texts, pool_qids)
+    cand_pos = {a['article']: i for i, a in enumerate(cand)}
+    cluster_of = {a['article']: labels[i] for i, a in enumerate(cand)}
+    pool_size = Counter(labels)
+
+    groups = {}
+    for it in items:
+        groups.setdefault(cluster_of[it['article']], []).append(it)
 
     buckets = {}
-    for it in items:
-        b = bucket(it)
-        buckets.setdefault(b, []).append(it)
+    pool_counts = {}
+    for cid, its in groups.items():
+        if len(its) == 1 and pool_size[cid] == 1:
+            # Picks that cluster with nothing else are background noise unless they hit a known theme.
+            b = theme_of(pool_texts[cand_pos[its[0]['article']]], [])
+        else:
+            b = theme_of(' '.join(pool_texts[i] for i, c in enumerate(labels) if c == cid), terms[cid])
+        buckets.setdefault(b, []).extend(its)
+        pool_counts[b] = pool_counts.get(b, 0) + (pool_size[cid] if b != 'other' else 0)
 
     # Summarize top clusters by total views
     cluster_order = sorted(buckets.items(), key=lambda kv: sum(x['pageviews'] for x in kv[1]), reverse=True)
@@ -230,12 +244,18 @@ def main():
         elif b == 'olympics':
             label = 'Scheduled-event gravity'
             expl = ("A live, calendar-fixed event can pull attention even without a single viral trigger; Wikipedia becomes a standings/venues reference layer.")
+        elif b != 'other':
+            label = f'Shared thread ({b})'
+            expl = ("These pages share vocabulary or a Wikidata item with each other and with other pages in today’s top list, "
+                    "which is consistent with one story being read from several angles.")
         else:
             label = 'Background curiosity'
             expl = ("These look like one-off curiosity spikes that hitch a ride on the day’s larger attention currents.")
 
         body.append(f"**Thread {idx}: {label}**\n\n")
         body.append(f"Topics: {topics}\n\n")
+        if pool_counts.get(b, 0) > len(its):
+            body.append(f"Pool signal: {pool_counts[b]} of today’s top {len(cand)} pages fall in this cluster.\n\n")
         body.append(f"Why they may connect: {expl}\n\n")
 
     body.append('## Competing Explanations\n')
@@ -258,7 +278,7 @@ def main():
     body.append('\n## The 10 Picks\n')
     body.append('<div class="grid">')
     for it in sorted(items, key=lambda x: x['pageviews'], reverse=True):
-        img = f"<img src=\"{it['thumbnail_url']}\" alt=\"\" loading=\"lazy\" />" if it.get('thumbnail_url') else ''
+        img = image_manifest.img_tag(it.get('thumbnail_url'), images)
         body.append('\n'.join([
             '<div class="card">',
             f"  <div class=\"kicker\">Rank {it['rank']} · {it['pageviews']} views</div>",
@@ -282,6 +302,7 @@ def main():
         ''
     ]
 
+    image_manifest.save(images)
     out_path.write_text('\n'.join(front) + '\n'.join(body) + '\n', encoding='utf-8')
     print('OK', out_path)
     return 0
@@ -10,11 +10,17 @@ from __future__ import annotations
 import calendar
 import datetime as _dt
 import re
+import urllib.parse
 from collections import Counter, defaultdict
 from pathlib import Path
 
-REPORTS_DIR = Path("_reports")
-ENTRIES_DIR = Path("_entries")
+import image_manifest
+from entry_archive import is_archived, iter_fronts
+from period_toplists import aggregate
+from wiki_config import WIKI, WIKI_PATH, collection_dir
+
+REPORTS_DIR = collection_dir("_reports")
+ENTRIES_DIR = collection_dir("_entries")
 
 
 def yq(s):
@@ -45,17 +51,27 @@ def slugify(s: str) -> str:
     return re.sub(r"[^a-z0-9]+", "-", s.lower()).strip("-") or "report"
 
 
-def load_entries():
+def card_tags(e: dict) -> tuple[str, str]:
+    """Opening and closing tag of an entry card: a link, or a plain card for archived days (no entry page)."""
+    if e.get("archived"):
+        return "<div class=\"card\">", "</div>"
+    href = f"{{{{ '{WIKI_PATH or ''}/entries/{e['entry_name']}/' | relative_url }}}}"
+    return f"<a class=\"card card--link\" href=\"{href}\">", "</a>"
+
+
+def load_entries(images: dict | None = None):
+    """Entries sorted by date; card images missing from `images` are added from front matter."""
     entries = []
-    for ep in ENTRIES_DIR.glob("*.md"):
-        fm = read_front(ep)
+    for name, fm in iter_fronts(ENTRIES_DIR):
         if not fm.get("date"):
             continue
+        if images is not None and fm.get("thumbnail_url") not in images:
+            image_manifest.add(images, *image_manifest.from_front(fm))
         d = _dt.date.fromisoformat(fm["date"])
         entries.append(
             {
                 "date": d,
-                "entry_name": ep.stem,
+                "entry_name": Path(name).stem,
                 "topic_title": fm.get("topic_title"),
                 "normalized_title": fm.get("normalized_title"),
                 "rank": int(fm.get("rank", "0") or 0),
@@ -65,6 +81,7 @@ def load_entries():
                 "topic_url": fm.get("topic_url"),
                 "sentence_changed": fm.get("sentence_changed") == "true",
                 "change_type": fm.get("change_type"),
+                "archived": is_archived(name, ENTRIES_DIR),
             }
         )
     return sorted(entries, key=lambda e: e["date"])
@@ -109,9 +126,27 @@ def summarize(entries):
     return top_topics, total_views, changed, top_by_views
 
 
+def attention_section(kind: str, start: _dt.date, end: _dt.date, k: int = 10) -> list[str]:
+    """Markdown for the period's aggregate top list (summed over stored daily top lists)."""
+    agg = aggregate(kind, start, k)
+    if not agg["days"]:
+        return []
+    lines = [
+        "\n## What Wikipedia read\n",
+        f"Summed over {len(agg['days'])} of {(end - start).days + 1} daily top lists.\n",
+    ]
+    for a in agg["articles"]:
+        url = f"https://{WIKI}.org/wiki/{urllib.parse.quote(a['article'])}"
+        lines.append(
+            f"- [{a['article'].replace('_', ' ')}]({url}) — {a['views']:,} views over {a['days']} day(s), best rank #{a['best_rank']}"
+        )
+    return lines
+
+
 def main():
     ensure_dir()
-    all_entries = load_entries()
+    images = image_manifest.load()
+    all_entries = load_entries(images)
     if not all_entries:
         print("No entries")
         return 0
@@ -147,24 +182,19 @@ def main():
         "<div class=\"grid\">",
     ]
     for e in top_by_views:
-        href = f"{{{{ '/entries/{e['entry_name']}/' | relative_url }}}}"
-        thumb_url = (e.get("thumbnail_url") or "").strip()
-        img = (
-            f"<img src=\"{thumb_url}\" alt=\"\" loading=\"lazy\" />"
-            if thumb_url and thumb_url.lower() != "null"
-            else ""
-        )
+        open_tag, close_tag = card_tags(e)
+        img = image_manifest.img_tag((e.get("thumbnail_url") or "").strip(), images)
         title = (e.get("topic_title") or "").replace("\"", "&quot;")
         kicker = f"{e['date'].isoformat()} · Rank {e['rank']} · {e['pageviews']} views"
         cards.append(
             "\n".join(
                 [
-                    f"<a class=\"card card--link\" href=\"{href}\">",
+                    open_tag,
                     f"  <div class=\"kicker\">{kicker}</div>",
                     f"  <div class=\"card__title\">{title}</div>",
                     f"  <div class=\"thumb\">{img}</div>" if img else "",
                     f"  <div class=\"quote\">{(e.get('lead_sentence') or '')}</div>",
-                    "</a>",
+                    close_tag,
                 ]
             )
         )
@@ -179,6 +209,7 @@ def main():
             "\n## Most frequent topics\n",
         ]
         + [f"- {t} — {c} day(s)" for t, c in top_topics]
+        + attention_section("weekly", ws, we)
         + ["\n" + "\n".join(cards) + "\n"]
         + [
             "## Narrative\n",
@@ -220,24 +251,19 @@ def main():
         "<div class=\"grid\">",
     ]
     for e in top_by_views_m:
-        href = f"{{{{ '/entries/{e['entry_name']}/' | relative_url }}}}"
-        thumb_url = (e.get("thumbnail_url") or "").strip()
-        img = (
-            f"<img src=\"{thumb_url}\" alt=\"\" loading=\"lazy\" />"
-            if thumb_url and thumb_url.lower() != "null"
-            else ""
-        )
+        open_tag, close_tag = card_tags(e)
+        img = image_manifest.img_tag((e.get("thumbnail_url") or "").strip(), images)
         title = (e.get("topic_title") or "").replace("\"", "&quot;")
         kicker = f"{e['date'].isoformat()} · Rank {e['rank']} · {e['pageviews']} views"
         cards_m.append(
             "\n".join(
                 [
-                    f"<a class=\"card card--link\" href=\"{href}\">",
+                    open_tag,
                     f"  <div class=\"kicker\">{kicker}</div>",
                     f"  <div class=\"card__title\">{title}</div>",
                     f"  <div class=\"thumb\">{img}</div>" if img else "",
                     f"  <div class=\"quote\">{(e.get('lead_sentence') or '')}</div>",
-                    "</a>",
+                    close_tag,
                 ]
             )
         )
@@ -252,6 +278,7 @@ def main():
             "\n## Most frequent topics\n",
         ]
         + [f"- {t} — {c} day(s)" for t, c in top_topics_m]
+        + attention_section("monthly", ms, me)
         + ["\n" + "\n".join(cards_m) + "\n"]
         + [
             "## Narrative\n",
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+"""HTTP transports for the fetch scripts' get_json().
+
+The default transport is stdlib `http.client`: one persistent keep-alive
+connection per (scheme, host, port), gzip responses decoded transparently,
+and a per-request timeout. `requests` remains available as an optional
+backend (HTTP_BACKEND=requests); it is only imported when selected.
+
+Both backends return objects with the small surface get_json() uses:
+`status_code`, `headers` (case-insensitive `.get`), `json()` and
+`raise_for_status()`. PooledSession is the thread-safe variant used by the
+multi-wiki fetch gateway (per-host connection pools plus a shared rate limit).
+
+Tail-latency controls (make_session() returns a ResilientSession):
+
+- separate connect and read timeouts (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+- hedging: if a GET has not answered within the host's observed p95 latency,
+  an identical GET is sent on another connection and the first answer wins
+  (HTTP_HEDGE=0 disables); the duplicate carries `X-Hedge: 1` so a server's
+  logs can tell it from a retry
+- a per-host circuit breaker: after BREAKER_THRESHOLD consecutive transport
+  errors or 5xx responses the host fails fast for BREAKER_RESET seconds, then
+  one probe request decides whether it closes again. Behind multi_wiki.py's
+  fetch gateway (FETCH_GATEWAY=http://127.0.0.1:<port>, URLs of the form
+  <gateway>/<upstream host>/<path>) the upstream host is the key, not the
+  gateway's address.
+- fetch(): the scripts' retry loop, with jittered exponential backoff that
+  honours Retry-After, and no retries for non-transient failures
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import collections
+import gzip
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from urllib.parse import urlsplit
+
+DEFAULT_BACKEND = "stdlib"
+CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT") or 5)
+READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT") or 20)
+HEDGE = os.environ.get("HTTP_HEDGE", "1") != "0"
+HEDGE_MIN = 0.25  # never hedge sooner than this (seconds)
+HEDGE_DEFAULT = 2.0  # hedge delay until a host has HEDGE_SAMPLES latencies
+HEDGE_SAMPLES = 20
+HEDGE_HEADER = "X-Hedge"
+BREAKER_THRESHOLD = 5
+BREAKER_RESET = 30.0
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 20.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+GATEWAY = (os.environ.get("FETCH_GATEWAY") or "").rstrip("/")
+# Failures worth retrying: network/timeout errors (requests' exceptions are OSErrors too),
+# protocol errors (including truncated gzip/deflate bodies) and truncated JSON bodies.
+TRANSIENT_ERRORS = (OSError, http.client.HTTPException, ValueError)
+
+# Errors meaning a pooled keep-alive connection went stale between requests.
+_STALE = (http.client.RemoteDisconnected, http.client.CannotSendRequest, BrokenPipeError, ConnectionResetError)
+
+
+class HTTPError(RuntimeError):
+    pass
+
+
+class CircuitOpenError(HTTPError):
+    pass
+
+
+class Response:
+    def __init__(self, url: str, status: int, headers: dict[str, str], content: bytes):
+        self.url = url
+        self.status_code = status
+        self.headers = headers
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise HTTPError(f"HTTP {self.status_code} for {self.url}")
+
+
+class StdlibSession:
+    """Minimal requests.Session stand-in with per-host connection reuse."""
+
+    def __init__(self):
+        self.headers: dict[str, str] = {"Accept-Encoding": "gzip", "Accept": "application/json"}
+        self._conns: dict[tuple[str, str, int], http.client.HTTPConnection] = {}
+
+    def _conn(self, scheme: str, host: str, port: int, timeout) -> http.client.HTTPConnection:
+        """`timeout` is seconds or a (connect, read) pair, as in requests."""
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        key = (scheme, host, port)
+        conn = self._conns.get(key)
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = self._conns[key] = cls(host, port, timeout=connect)
+        if conn.sock is None:
+            conn.timeout = connect
+            conn.connect()
+        conn.sock.settimeout(read)
+        return conn
+
+    def _drop(self, key: tuple[str, str, int]) -> None:
+        conn = self._conns.pop(key, None)
+        if conn is not None:
+            conn.close()
+
+    def get(self, url: str, timeout=30) -> Response:
+        parts = urlsplit(url)
+        scheme = parts.scheme or "https"
+        port = parts.port or (443 if scheme == "https" else 80)
+        key = (scheme, parts.hostname or "", port)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        for attempt in (1, 2):
+            try:
+                conn = self._conn(scheme, key[1], port, timeout)
+                conn.request("GET", path, headers=self.headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                break
+            except _STALE:
+                self._drop(key)
+                if attempt == 2:
+                    raise
+            except Exception:
+                self._drop(key)
+                raise
+        headers = _Headers((k.lower(), v) for k, v in resp.getheaders())
+        enc = headers.get("content-encoding", "").lower()
+        try:
+            if enc == "gzip":
+                body = gzip.decompress(body)
+            elif enc == "deflate":
+                body = zlib.decompress(body)
+        except (EOFError, OSError, zlib.error) as e:
+            # A truncated or corrupt compressed body is a protocol error, retried like any other.
+            self._drop(key)
+            raise http.client.HTTPException(f"bad {enc} body from {url}: {e}") from e
+        if resp.will_close:
+            self._drop(key)
+        return Response(url, resp.status, headers, body)
+
+    def close(self) -> None:
+        for key in list(self._conns):
+            self._drop(key)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Headers(dict):
+    def get(self, key, default=None):
+        return super().get(key.lower(), default)
+
+
+class RateLimiter:
+    """Token bucket shared by every thread fetching from one host."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.stamp = time.monotonic()
+        self.waited = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+                self.waited += wait
+            time.sleep(wait)
+
+
+class PooledSession:
+    """Thread-safe session: per host, up to `per_host` keep-alive connections and a shared rate limit.
+
+    Each pooled connection is a single-host StdlibSession that is checked out
+    for one request at a time.
+    """
+
+    def __init__(self, *, per_host: int = 4, rate_per_host: float | None = None):
+        self.headers: dict[str, str] = {}
+        self.per_host = per_host
+        self.rate_per_host = rate_per_host
+        self._pools: dict[str, queue.LifoQueue] = {}
+        self._opened: dict[str, int] = {}
+        self.limiters: dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def _checkout(self, host: str) -> StdlibSession:
+        with self._lock:
+            pool = self._pools.setdefault(host, queue.LifoQueue())
+            if self.rate_per_host and host not in self.limiters:
+                self.limiters[host] = RateLimiter(self.rate_per_host)
+            if pool.empty() and self._opened.get(host, 0) < self.per_host:
+                self._opened[host] = self._opened.get(host, 0) + 1
+                s = StdlibSession()
+                s.headers.update(self.headers)
+                return s
+        return pool.get()
+
+    def get(self, url: str, timeout: float = 30) -> Response:
+        host = urlsplit(url).netloc
+        s = self._checkout(host)
+        try:
+            limiter = self.limiters.get(host)
+            if limiter:
+                limiter.acquire()
+            return s.get(url, timeout=timeout)
+        finally:
+            self._pools[host].put(s)
+
+    def close(self) -> None:
+        for pool in self._pools.values():
+            while not pool.empty():
+                pool.get().close()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open (fail fast) -> half-open (one probe) -> closed."""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, reset_after: float = BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.reset_after:
+                return False
+            self.probing = True
+            return True
+
+    def record(self, ok: bool) -> None:
+        with self.lock:
+            self.probing = False
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Recent response times for one host; p95 sets the hedge delay."""
+
+    def __init__(self, size: int = 200):
+        self.samples: collections.deque[float] = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self.lock:
+            self.samples.append(seconds)
+
+    def hedge_delay(self, read_timeout: float) -> float:
+        with self.lock:
+            if len(self.samples) < HEDGE_SAMPLES:
+                return min(HEDGE_DEFAULT, read_timeout)
+            ordered = sorted(self.samples)
+        p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return min(max(p95, HEDGE_MIN), read_timeout)
+
+
+def host_key(url: str, gateway: str = GATEWAY) -> str:
+    """The host a breaker/latency tracker is kept for: the upstream host for gateway URLs."""
+    if gateway and url.startswith(gateway + "/"):
+        return url[len(gateway) + 1:].split("/", 1)[0]
+    return urlsplit(url).netloc
+
+
+class ResilientSession:
+    """Session wrapper adding connect/read timeouts, hedged GETs and per-host circuit breakers.
+
+    Each attempt checks a backend session out of a small idle pool, so a
+    hedge (or a straggling loser) never shares a connection with another
+    request.
+    """
+
+    def __init__(self, factory, *, connect_timeout: float = CONNECT_TIMEOUT, read_timeout: float = READ_TIMEOUT,
+                 hedge: bool = HEDGE):
+        self.factory = factory
+        self.headers: dict[str, str] = {}
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.hedge = hedge
+        self.hedges = 0
+        self.breakers: dict[str, CircuitBreaker] = {}
+        self.latency: dict[str, LatencyTracker] = {}
+        self._idle: list = []
+        self._lock = threading.Lock()
+
+    def _checkout(self, hedge: bool = False):
+        with self._lock:
+            s = self._idle.pop() if self._idle else self.factory()
+        s.headers.update(self.headers)
+        if hedge:
+            s.headers[HEDGE_HEADER] = "1"
+        else:
+            s.headers.pop(HEDGE_HEADER, None)  # pooled sessions may have sent a hedge before
+        return s
+
+    def _attempt(self, url: str, host: str, timeout, hedge: bool = False) -> Response:
+        s = self._checkout(hedge)
+        t0 = time.monotonic()
+        try:
+            r = s.get(url, timeout=timeout)
+        except BaseException:
+            s.close()  # the connection state is unknown; don't pool it
+            raise
+        self.latency[host].add(time.monotonic() - t0)
+        with self._lock:
+            self._idle.append(s)
+        return r
+
+    def _spawn(self, url: str, host: str, timeout, hedge: bool = False) -> Future:
+        fut: Future = Future()
+
+        def run():
+            try:
+                fut.set_result(self._attempt(url, host, timeout, hedge))
+            except BaseException as e:
+                fut.set_exception(e)
+
+        # Daemon threads: a straggling loser never delays interpreter exit.
+        threading.Thread(target=run, daemon=True).start()
+        return fut
+
+    def _hedged(self, url: str, host: str, timeout) -> Response:
+        if not self.hedge:
+            return self._attempt(url, host, timeout)
+        first = self._spawn(url, host, timeout)
+        done, _ = wait([first], timeout=self.latency[host].hedge_delay(timeout[1]))
+        if done:
+            return first.result()
+        self.hedges += 1
+        pending = {first, self._spawn(url, host, timeout, hedge=True)}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                if f.exception() is None or not pending:
+                    return f.result()
+
+    def get(self, url: str, timeout=None) -> Response:
+        host = host_key(url)
+        with self._lock:
+            breaker = self.breakers.setdefault(host, CircuitBreaker())
+            self.latency.setdefault(host, LatencyTracker())
+        if not breaker.allow():
+            raise CircuitOpenError(f"circuit open for {host}")
+        if isinstance(timeout, tuple):
+            pair = timeout
+        else:
+            read = min(self.read_timeout, timeout) if timeout else self.read_timeout
+            pair = (min(self.connect_timeout, read), read)
+        try:
+            r = self._hedged(url, host, pair)
+        except BaseException:
+            # Any failure counts, and always ends a half-open probe.
+            breaker.record(False)
+            raise
+        breaker.record(r.status_code < 500)
+        return r
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for s in idle:
+            s.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def backoff_delay(attempt: int, retry_after: str | None = None, rng=random) -> float:
+    """Full-jitter exponential backoff; a Retry-After (seconds) header is a floor."""
+    delay = rng.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+    if retry_after:
+        try:
+            delay = max(delay, min(float(retry_after), BACKOFF_CAP))
+        except ValueError:
+            pass
+    return delay
+
+
+def fetch(session, url: str, *, tries: int = 6, timeout=None, decode: bool = True):
+    """GET with retries. Returns (parsed JSON or None, response) for a 200 or 404.
+
+    With decode=False the body bytes are returned undecoded in place of the
+    JSON, for callers that parse only part of a large payload (a body shorter
+    than its Content-Length, or a cut gzip stream, is still retried).
+
+    Transient failures (network errors, timeouts, 429/5xx, truncated JSON) are
+    retried with jittered exponential backoff; an open circuit or any other
+    HTTP status raises RuntimeError at once.
+    """
+    last = retry_after = None
+    for i in range(tries):
+        if i:
+            time.sleep(backoff_delay(i - 1, retry_after))
+            retry_after = None
+        try:
+            r = session.get(url, timeout=timeout) if timeout else session.get(url)
+            if r.status_code == 200:
+                return (r.json() if decode else r.content), r
+            if r.status_code == 404:
+                return None, r
+        except CircuitOpenError as e:
+            raise RuntimeError(f"GET failed {url}: {e}") from e
+        except TRANSIENT_ERRORS as e:
+            last = e
+            continue
+        if r.status_code not in RETRY_STATUSES:
+            raise RuntimeError(f"GET failed {url}: HTTP {r.status_code}")
+        last = r.status_code
+        retry_after = r.headers.get("retry-after")
+    raise RuntimeError(f"GET failed {url}: {last}")
+
+
+def make_session(user_agent: str, backend: str | None = None):
+    """Return a ResilientSession over `backend` ("stdlib" or "requests"; default HTTP_BACKEND or stdlib)."""
+    backend = backend or os.environ.get("HTTP_BACKEND") or DEFAULT_BACKEND
+    if backend == "requests":
+        import requests
+
+        factory = requests.Session
+    elif backend == "stdlib":
+        factory = StdlibSession
+    else:
+        raise ValueError(f"unknown HTTP_BACKEND {backend!r}")
+    session = ResilientSession(factory)
+    session.headers["User-Agent"] = user_agent
+    return session
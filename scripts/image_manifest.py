@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Responsive thumbnail variants and intrinsic sizes for card images.
+
+Cards used to emit `<img src=thumbnail_url>` at whatever size the REST
+summary returned (up to 330px), and briefs recorded no dimensions at all, so
+images shifted the layout as they loaded and narrow screens downloaded the
+full card image.
+
+The manifest, _data/images.json, is keyed by the thumbnail URL we already
+store and holds what the generators and the entry layout need:
+
+  {"<thumbnail_url>": {"width": 330, "height": 220,
+                       "original_width": 1200, "original_height": 800,
+                       "srcset": "<120px url> 120w, <250px url> 250w, <330px url> 330w",
+                       "sizes": "(max-width: 406px) calc(100vw - 76px), 330px"}}
+
+Variants are Wikimedia thumb URLs (`.../thumb/<h>/<hh>/<file>/<N>px-<file>`)
+at the standard STEPS widths. They never go wider than the card image we
+serve today, or than the original, so no viewport downloads more than before.
+Images whose URL is not an upload.wikimedia.org file keep a plain src, with
+width/height where known.
+
+Usage:
+  python scripts/image_manifest.py      # (re)build entries' records from front matter
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import html
+import json
+import re
+from pathlib import Path
+
+MANIFEST_PATH = Path("_data/images.json")
+# Standard Wikimedia thumbnail buckets (cached at the edge), up to the card image size.
+STEPS = (120, 250, 330)
+DISPLAY_WIDTH = 330
+# Horizontal space around a card image on one-column layouts: container margin + card padding.
+CARD_GUTTER = 76
+
+_THUMB = re.compile(r"^(?P<base>https://upload\.wikimedia\.org/[^?#]+/thumb/[^?#]+/)(?P<prefix>(?:lossy-)?(?:page\d+-)?)\d+px-(?P<name>[^/?#]+)$")
+_ORIGINAL = re.compile(r"^(?P<root>https://upload\.wikimedia\.org/[^/]+/[^/]+)/(?P<hash>[0-9a-f]/[0-9a-f]{2})/(?P<file>[^/?#]+)$")
+# Files the thumbnailer renders without a page prefix or format change (SVG renders to PNG).
+_PLAIN = (".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg")
+
+
+def _int(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def variants(url: str, width: int, original_width: int | None = None) -> list[tuple[int, str]]:
+    """[(width, url)] from smallest to `url` itself (`width` px wide); empty for non-Wikimedia URLs."""
+    widest = min(width, original_width or width, DISPLAY_WIDTH)
+    m = _THUMB.match(url)
+    if m:
+        head, tail = m["base"] + m["prefix"], m["name"]
+    else:
+        m = _ORIGINAL.match(url)
+        if not m or not m["file"].lower().endswith(_PLAIN):
+            return []
+        head = f"{m['root']}/thumb/{m['hash']}/{m['file']}/"
+        tail = m["file"] + (".png" if m["file"].lower().endswith(".svg") else "")
+    out = [(w, f"{head}{w}px-{tail}") for w in STEPS if w < widest]
+    out.append((width, url) if widest == width else (widest, f"{head}{widest}px-{tail}"))
+    return out
+
+
+def record(url: str | None, width, height, original_width=None, original_height=None) -> dict | None:
+    """Manifest record for one card image, or None without a usable URL and size."""
+    width, height = _int(width), _int(height)
+    if not url or not url.startswith(("http://", "https://")) or not width or not height:
+        return None
+    ow, oh = _int(original_width), _int(original_height)
+    vs = variants(url, width, ow)
+    shown = vs[-1][0] if vs else min(width, DISPLAY_WIDTH)
+    rec = {
+        "width": shown,
+        "height": round(height * shown / width),
+        "original_width": ow,
+        "original_height": oh,
+        "srcset": ", ".join(f"{u} {w}w" for w, u in vs) if len(vs) > 1 else None,
+        "sizes": f"(max-width: {shown + CARD_GUTTER}px) calc(100vw - {CARD_GUTTER}px), {shown}px",
+    }
+    if vs:
+        rec["src"] = vs[-1][1]
+    return rec
+
+
+def from_summary(summary: dict) -> tuple[str | None, dict | None]:
+    """(thumbnail URL, record) from a REST summary's thumbnail/originalimage fields."""
+    thumb = summary.get("thumbnail") or {}
+    orig = summary.get("originalimage") or {}
+    url = thumb.get("source")
+    return url, record(url, thumb.get("width"), thumb.get("height"), orig.get("width"), orig.get("height"))
+
+
+def from_front(fm: dict) -> tuple[str | None, dict | None]:
+    """(thumbnail URL, record) from an entry's front matter."""
+    url = fm.get("thumbnail_url")
+    return url, record(url, fm.get("thumbnail_width"), fm.get("thumbnail_height"),
+                       fm.get("original_image_width"), fm.get("original_image_height"))
+
+
+def load(path: Path = MANIFEST_PATH) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save(manifest: dict, path: Path = MANIFEST_PATH, merge: bool = True) -> bool:
+    """Write the manifest if it changed. Returns True when written.
+
+    Every wiki's daily_run shares this file (multi_wiki.py runs them
+    concurrently), so the save holds a file lock and, with merge=True, adds
+    `manifest` on top of what is on disk now instead of overwriting records
+    another process saved since our load().
+    """
+    from bulk_runner import atomic_write_text, file_lock
+
+    with file_lock(path):
+        if merge:
+            manifest = {**load(path), **manifest}
+        data = json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True) + "\n"
+        if path.exists() and path.read_text(encoding="utf-8") == data:
+            return False
+        atomic_write_text(path, data)
+    return True
+
+
+def add(manifest: dict, url: str | None, rec: dict | None) -> None:
+    """Store `rec`, keeping original dimensions an older record already knew."""
+    if not url or rec is None:
+        return
+    old = manifest.get(url) or {}
+    if rec.get("original_width") is None and old.get("original_width"):
+        rec = record(url, old["width"], old["height"], old["original_width"], old["original_height"]) or rec
+    manifest[url] = rec
+
+
+def img_tag(url: str | None, manifest: dict, *, alt: str = "") -> str:
+    """`<img>` for a card: srcset/sizes/width/height from the manifest, plain src otherwise."""
+    if not url or not url.startswith(("http://", "https://")):
+        return ""
+    rec = manifest.get(url)
+    attrs = [f'src="{html.escape((rec or {}).get("src") or url)}"']
+    if rec:
+        if rec.get("srcset"):
+            attrs += [f'srcset="{html.escape(rec["srcset"])}"', f'sizes="{rec["sizes"]}"']
+        attrs += [f'width="{rec["width"]}"', f'height="{rec["height"]}"']
+    attrs += [f'alt="{html.escape(alt)}"', 'loading="lazy"', 'decoding="async"']
+    return f"<img {' '.join(attrs)} />"
+
+
+def main(argv=None):
+    from entry_archive import iter_fronts
+    from wiki_config import collection_dir
+
+    # Keys record() would no longer accept (e.g. truncated URLs from old entries) never get replaced; drop them.
+    manifest = {url: rec for url, rec in load().items() if url.startswith(("http://", "https://"))}
+    n = 0
+    for _name, fm in iter_fronts(collection_dir("_entries")):
+        url, rec = from_front(fm)
+        if rec:
+            add(manifest, url, rec)
+            n += 1
+    written = save(manifest, merge=False)  # the pruned keys must not come back
+    with_srcset = sum(1 for r in manifest.values() if r.get("srcset"))
+    print(f"OK image manifest images={len(manifest)} from_entries={n} srcset={with_srcset} "
+          f"{'written' if written else 'unchanged'}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
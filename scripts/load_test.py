@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Load/chaos harness for the fetch path, run against wikimedia_standin.py.
+
+Starts a stand-in server in-process, then runs the real scripts as
+subprocesses in a scratch copy of the ledger (so the working tree is never
+touched):
+
+- daily      daily_run.py + generate_daily_brief.py for "yesterday"
+- backfill   the same with ENTRY_DATE / BRIEF_DATE for --days past dates
+
+and reports, per scenario: runs and requests per second, client-visible run
+time and server-side latency percentiles, status counts, the time lost to
+retries (for every URL fetched more than once in a run, the time from its
+first attempt to its final one, i.e. failed attempts plus back-off sleeps),
+and hedges. Hedged duplicates carry `X-Hedge: 1` (http_transport.py), so they
+are counted apart from retries: how many were sent and how many answered
+before the request they duplicated.
+
+Usage:
+  python scripts/load_test.py [--scenarios daily,backfill] [--days 7]
+      [--seed-ledger] [server options, see wikimedia_standin.py --help]
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from wikimedia_standin import add_server_args, percentiles, server_from_args
+
+SCRIPTS = Path(__file__).resolve().parent
+LEDGER_DIRS = ("_entries", "_topics", "_topic_history", "_briefs", "_archive", "_state")
+
+
+def scenario_runs(name: str, days: int, today: _dt.date) -> list[tuple[str, dict]]:
+    if name == "daily":
+        return [("daily_run.py", {}), ("generate_daily_brief.py", {})]
+    if name == "backfill":
+        runs = []
+        for back in range(days, 0, -1):
+            d = (today - _dt.timedelta(days=back)).isoformat()
+            runs += [("daily_run.py", {"ENTRY_DATE": d}), ("generate_daily_brief.py", {"BRIEF_DATE": d})]
+        return runs
+    raise ValueError(f"unknown scenario {name!r}")
+
+
+def retry_loss(log: list[tuple[float, float, str, int, bool]]) -> tuple[float, int, int, int]:
+    """(seconds lost, retried requests, hedges sent, hedges won) for one run's slice of the server log."""
+    by_path: dict[str, list[tuple[float, float, str, int, bool]]] = {}
+    for rec in sorted(log):
+        by_path.setdefault(rec[2], []).append(rec)
+    lost = 0.0
+    retried = hedged = won = 0
+    for recs in by_path.values():
+        attempts = [r for r in recs if not r[4]]
+        if len(attempts) > 1:
+            lost += attempts[-1][0] - attempts[0][0]
+            retried += len(attempts) - 1
+        for h in recs:
+            if h[4]:
+                # The attempt it duplicated is the last one started before it.
+                primary = [r for r in attempts if r[0] <= h[0]]
+                hedged += 1
+                won += bool(primary) and h[1] < primary[-1][1]
+    return lost, retried, hedged, won
+
+
+def run_scenario(srv, name: str, runs: list[tuple[str, dict]], workdir: Path) -> dict:
+    env = dict(os.environ, WIKIMEDIA_METRICS_API=srv.base_url, WIKIPEDIA_REST_API=srv.base_url,
+               WIKIDATA_API=srv.base_url.replace("/api/rest_v1", "/w/api.php"))
+    walls = []
+    lost = 0.0
+    retried = hedged = won = 0
+    failures = 0
+    first = len(srv.log)
+    t_start = time.monotonic()
+    for script, extra in runs:
+        mark = len(srv.log)
+        t0 = time.monotonic()
+        res = subprocess.run([sys.executable, str(SCRIPTS / script)], cwd=workdir, env=dict(env, **extra),
+                             capture_output=True, text=True)
+        walls.append(time.monotonic() - t0)
+        if res.returncode != 0:
+            failures += 1
+            tail = (res.stderr.strip().splitlines() or ["?"])[-1]
+            print(f"  FAIL {script} {extra}: {tail}", file=sys.stderr)
+        l, r, h, w = retry_loss(srv.log[mark:])
+        lost += l
+        retried += r
+        hedged += h
+        won += w
+    elapsed = time.monotonic() - t_start
+    log = srv.log[first:]
+    codes: dict[int, int] = {}
+    for _, _, _, status, _ in log:
+        codes[status] = codes.get(status, 0) + 1
+    return {
+        "scenario": name,
+        "runs": len(runs),
+        "failures": failures,
+        "elapsed": elapsed,
+        "requests": len(log),
+        "status": dict(sorted(codes.items())),
+        "run_s": percentiles(sorted(walls)),
+        "latency_ms": percentiles(sorted(t1 - t0 for t0, t1, *_ in log)),
+        "retried": retried,
+        "retry_lost_s": lost,
+        "hedged": hedged,
+        "hedges_won": won,
+    }
+
+
+def report(res: dict) -> None:
+    el = res["elapsed"] or 1e-9
+    print(f"{res['scenario']}: runs={res['runs']} failures={res['failures']} elapsed={res['elapsed']:.2f}s "
+          f"({res['runs'] / el:.2f} runs/s, {res['requests'] / el:.1f} req/s)")
+    rs = res["run_s"]
+    print(f"  run time ms    p50={rs['p50']} p95={rs['p95']} p99={rs['p99']} max={rs['max']}")
+    lat = res["latency_ms"]
+    print(f"  server ms      p50={lat['p50']} p95={lat['p95']} p99={lat['p99']} max={lat['max']}")
+    print(f"  status         " + " ".join(f"{k}={v}" for k, v in res["status"].items()))
+    share = res["retry_lost_s"] / el * 100
+    print(f"  retries        {res['retried']} re-sent, {res['retry_lost_s']:.2f}s lost ({share:.0f}% of elapsed)")
+    print(f"  hedges         {res['hedged']} sent, {res['hedges_won']} answered first")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Drive the fetch scripts against a local Wikimedia stand-in")
+    ap.add_argument("--scenarios", default="daily,backfill")
+    ap.add_argument("--days", type=int, default=7, help="dates per backfill scenario")
+    ap.add_argument("--seed-ledger", action="store_true", help="start from a copy of the current ledger")
+    add_server_args(ap)
+    args = ap.parse_args(argv)
+
+    srv = server_from_args(args)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    today = args.today or _dt.date.today()
+    try:
+        with tempfile.TemporaryDirectory(prefix="loadtest-") as tmp:
+            workdir = Path(tmp)
+            if args.seed_ledger:
+                for d in LEDGER_DIRS:
+                    if Path(d).is_dir():
+                        shutil.copytree(d, workdir / d)
+            for name in args.scenarios.split(","):
+                report(run_scenario(srv, name, scenario_runs(name, args.days, today), workdir))
+    finally:
+        srv.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
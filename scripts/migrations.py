@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""Versioned front-matter migrations for entries.
+
+Every entry records the schema it has reached in `schema_version` (missing
+means 0). A migration is a transform `fn(text, arg) -> text` registered
+under the next version number; SCHEMA_VERSION (schema.py) is the last one,
+and daily_run.py writes new entries at that version.
+
+The runner reads every front matter once (live and archived), picks the
+entries below SCHEMA_VERSION and, for each, applies only the migrations it
+has not reached, in order, inside a single read-modify-write (bulk_runner
+for live files, transform_archives for archived years). Entries already at
+SCHEMA_VERSION are never rewritten, so a schema change costs one pass over
+the stale files.
+
+A migration that needs context (e.g. Wikidata tags) registers a
+`prepare(names) -> {name: arg}` hook; it only runs when some entry still
+needs that migration. Migrations must be idempotent: the paragraph and
+tags steps check the fields themselves before touching anything.
+
+To change the schema, append a migration with the next version and bump
+schema.SCHEMA_VERSION to it (importing this module fails until both agree). Bumping
+tag_entries.TAGS_VERSION, for instance, is registered again as
+`migration(N, "tags vX", prepare=_wikidata_args)(tags)`.
+
+Usage:
+  python scripts/migrations.py [status | --dry-run]
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+import changelog
+from bulk_runner import run_bulk
+from entry_archive import ARCHIVE_DIR, iter_fronts, parse_front, transform_archives
+from schema import SCHEMA_VERSION
+from wiki_config import collection_dir
+
+ENTRIES_DIR = collection_dir("_entries")
+SOURCE = "migrations"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    fn: Callable[[str, object], str]
+    prepare: Callable[[list[str]], dict] | None = None
+
+
+MIGRATIONS: list[Migration] = []
+
+
+def migration(version: int, name: str, prepare=None):
+    def register(fn):
+        expected = MIGRATIONS[-1].version + 1 if MIGRATIONS else 1
+        if version != expected:
+            raise ValueError(f"migration {name!r} has version {version}, expected {expected}")
+        MIGRATIONS.append(Migration(version, name, fn, prepare))
+        return fn
+
+    return register
+
+
+def raw_value(txt: str, key: str) -> str | None:
+    """A front-matter value exactly as written (quotes and escapes kept)."""
+    fm_block = txt.split("---", 2)[1] if txt.startswith("---") else ""
+    m = re.search(rf"^{re.escape(key)}:[ \t]*(.*)$", fm_block, flags=re.M)
+    return m.group(1).strip() if m else None
+
+
+def set_key(txt: str, key: str, value_yaml: str, after: str | None = None) -> str:
+    """Replace `key`, or insert it after the `after` key (default: at the end of the front matter)."""
+    if re.search(rf"^{re.escape(key)}:.*$", txt, flags=re.M):
+        return re.sub(rf"^{re.escape(key)}:.*$", lambda _m: f"{key}: {value_yaml}", txt, count=1, flags=re.M)
+    if not txt.startswith("---"):
+        return txt
+    parts = txt.split("---", 2)
+    if len(parts) < 3:
+        return txt
+    lines = parts[1].strip("\n").split("\n")
+    at = len(lines)
+    if after:
+        for i, line in enumerate(lines):
+            if line.startswith(after + ":"):
+                at = i + 1
+                break
+    lines.insert(at, f"{key}: {value_yaml}")
+    return "---\n" + "\n".join(lines) + "\n---" + parts[2]
+
+
+def schema_version(fm: dict) -> int:
+    try:
+        return int(fm.get("schema_version") or 0)
+    except ValueError:
+        return 0
+
+
+# --- migrations -------------------------------------------------------------
+
+
+@migration(1, "paragraph fields")
+def paragraph_fields(txt: str, _arg=None) -> str:
+    """Entries from before full paragraphs were stored: paragraph fields mirror the sentence fields."""
+    if raw_value(txt, "lead_paragraph") is not None:
+        return txt
+    for src, dst in (("lead_sentence", "lead_paragraph"), ("sentence_hash", "paragraph_hash"),
+                     ("sentence_length", "paragraph_length")):
+        value = raw_value(txt, src)
+        if value is not None:
+            txt = set_key(txt, dst, value, after=src)
+    return txt
+
+
+def _wikidata_args(names: list[str]) -> dict:
+    from tag_entries import wikidata_tags
+
+    wd = wikidata_tags(offline=True)
+    return {n: wd.get(n) for n in names}
+
+
+@migration(2, "tags", prepare=_wikidata_args)
+def tags(txt: str, wikidata=None) -> str:
+    """entity_type / domain / tags at the current tag_entries.TAGS_VERSION."""
+    from tag_entries import TAGS_VERSION, tag_text
+
+    if parse_front(txt).get("tags_version") == TAGS_VERSION:
+        return txt
+    return tag_text(txt, wikidata)
+
+
+@migration(3, "original image size")
+def original_image_size(txt: str, _arg=None) -> str:
+    """original_image_width/height keys (null where the size was never fetched)."""
+    for key, after in (("original_image_width", "original_image_url"), ("original_image_height", "original_image_width")):
+        if raw_value(txt, key) is None:
+            txt = set_key(txt, key, "null", after=after)
+    return txt
+
+
+if MIGRATIONS[-1].version != SCHEMA_VERSION:
+    raise RuntimeError(f"schema.SCHEMA_VERSION is {SCHEMA_VERSION} but the last migration is {MIGRATIONS[-1].version}")
+
+
+# --- runner -----------------------------------------------------------------
+
+
+def migrate_text(txt: str, args: dict | None = None) -> str:
+    """Apply every migration above the entry's schema_version, then stamp SCHEMA_VERSION."""
+    current = schema_version(parse_front(txt))
+    if current >= SCHEMA_VERSION:
+        return txt
+    for m in MIGRATIONS:
+        if m.version > current:
+            txt = m.fn(txt, (args or {}).get(m.version))
+    return set_key(txt, "schema_version", str(SCHEMA_VERSION))
+
+
+def stale_entries() -> dict[str, int]:
+    """Entry name -> schema_version, for entries below SCHEMA_VERSION."""
+    out = {}
+    for name, fm in iter_fronts(ENTRIES_DIR, ARCHIVE_DIR):
+        v = schema_version(fm)
+        if v < SCHEMA_VERSION:
+            out[name] = v
+    return out
+
+
+def plan(stale: dict[str, int]) -> dict[str, dict]:
+    """Per-entry migration args ({version: arg}), running each prepare hook once for the entries that need it."""
+    per_entry: dict[str, dict] = {name: {} for name in stale}
+    for m in MIGRATIONS:
+        if m.prepare is None:
+            continue
+        names = [n for n, v in stale.items() if v < m.version]
+        if not names:
+            continue
+        for name, arg in m.prepare(names).items():
+            per_entry[name][m.version] = arg
+    return per_entry
+
+
+def run(stale: dict[str, int]) -> tuple[int, int]:
+    """Migrate `stale` entries. Returns (live files changed, archived records changed)."""
+    per_entry = plan(stale)
+    jobs = [(ENTRIES_DIR / n, a) for n, a in per_entry.items() if (ENTRIES_DIR / n).exists()]
+    archived_args = {n: a for n, a in per_entry.items() if not (ENTRIES_DIR / n).exists()}
+    changed_paths, archived = [], []
+    live = run_bulk(migrate_text, jobs, label="migrations", changed_paths=changed_paths)
+    packed = transform_archives(migrate_text, archived_args, ARCHIVE_DIR, changed_records=archived) if archived_args else 0
+    changelog.append(
+        [changelog.event("entry_patched", p.name, p.read_bytes(), SOURCE) for p in changed_paths]
+        + [changelog.event("entry_patched", name, text, SOURCE) for name, text in archived]
+    )
+    return live, packed
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    t0 = time.monotonic()
+    stale = stale_entries()
+    if argv[:1] == ["status"] or "--dry-run" in argv:
+        for m in MIGRATIONS:
+            n = sum(1 for v in stale.values() if v < m.version)
+            print(f"{m.version:3d}  {m.name:<24} pending={n}")
+        print(f"OK schema_version={SCHEMA_VERSION} stale={len(stale)}")
+        return 0
+    if not stale:
+        print(f"OK schema_version={SCHEMA_VERSION} up to date ({time.monotonic() - t0:.2f}s)")
+        return 0
+    live, packed = run(stale)
+    from archive_pages import render_changes
+    from build_api import build_changes
+
+    render_changes()
+    build_changes()
+    print(f"OK migrated to schema_version={SCHEMA_VERSION} stale={len(stale)} live={live} archived={packed} "
+          f"({time.monotonic() - t0:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
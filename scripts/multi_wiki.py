@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""Run the daily pipeline for several wikis at once.
+
+Wikis come from _data/wikis.json (also readable by the site as
+site.data.wikis):
+
+  {"rate_limit_per_host": 25, "connections_per_host": 4,
+   "stages": ["daily_run", "generate_daily_brief"],
+   "wikis": [{"lang": "en", "project": "wikipedia", "access": "all-access"},
+             {"lang": "de", "project": "wikipedia"}]}
+
+Each (lang, project, access) runs its stages in order in its own process with
+WIKI_LANG / WIKI_PROJECT / WIKI_ACCESS set, so it writes into its own
+partition (see wiki_config.py); all wikis run concurrently. Their HTTP goes
+through one in-process fetch gateway that owns the per-host keep-alive pools,
+a per-host token-bucket rate limit shared by every wiki, and a response cache
+shared by every stage (the brief re-reads the top list and summaries
+daily_run already fetched). Wall time is therefore roughly that of the
+slowest wiki, not the sum.
+
+Non-default wikis write to their own collections (_entries_de, ...), which
+Jekyll only renders when _config.yml declares them.
+`python scripts/multi_wiki.py collections` writes the collections and
+defaults for every wiki in _data/wikis.json into _config.yml (between
+generated-block markers, replacing the previous block); `run` refuses to
+start while any are missing, since their pages would never be published.
+
+Usage:
+  python scripts/multi_wiki.py [run] [--upstream http://127.0.0.1:8765]
+  python scripts/multi_wiki.py collections [--print]
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from http_transport import PooledSession
+from wiki_config import DEFAULT_ACCESS, DEFAULT_PROJECT, partition
+
+CONFIG_PATH = Path("_data/wikis.json")
+SCRIPTS = Path(__file__).resolve().parent
+USER_AGENT = "WikiLedgerBot/1.0"
+DEFAULT_STAGES = ["daily_run", "generate_daily_brief"]
+COLLECTIONS = [("entries", "entry"), ("topics", "topic"), ("topic_history", "topic_history"), ("reports", "report"),
+               ("briefs", "brief")]
+CONFIG_YML = Path("_config.yml")
+GENERATED_BEGIN = "  # begin: generated by scripts/multi_wiki.py collections from _data/wikis.json"
+GENERATED_END = "  # end: generated"
+CACHE_STATUSES = (200, 404)
+
+
+def load_config(path: Path = CONFIG_PATH) -> dict:
+    cfg = json.loads(path.read_text(encoding="utf-8")) if path.exists() else {}
+    cfg.setdefault("wikis", [{"lang": "en"}])
+    for w in cfg["wikis"]:
+        w.setdefault("project", DEFAULT_PROJECT)
+        w.setdefault("access", DEFAULT_ACCESS)
+    return cfg
+
+
+class FetchGateway(ThreadingHTTPServer):
+    """Loopback proxy: GET /<host>/<path> -> https://<host>/<path> via the shared session."""
+
+    daemon_threads = True
+
+    def __init__(self, session: PooledSession, upstream: str | None = None):
+        super().__init__(("127.0.0.1", 0), _GatewayHandler)
+        self.session = session
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.cache: dict[str, tuple[int, dict, bytes]] = {}  # "<host><path>" -> response
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def fetch(self, host: str, path: str) -> tuple[int, dict, bytes]:
+        url = f"{self.upstream}{path}" if self.upstream else f"https://{host}{path}"
+        key = f"{host}{path}"
+        with self.lock:
+            hit = self.cache.get(key)
+            if hit is not None:
+                self.hits += 1
+                return hit
+            self.misses += 1
+        r = self.session.get(url, timeout=30)
+        headers = {k: r.headers.get(k) for k in ("content-type", "retry-after", "x-request-id") if r.headers.get(k)}
+        res = (r.status_code, headers, r.content)
+        if r.status_code in CACHE_STATUSES:
+            with self.lock:
+                self.cache[key] = res
+        return res
+
+
+class _GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        host, _, rest = self.path.lstrip("/").partition("/")
+        try:
+            status, headers, body = self.server.fetch(host, "/" + rest)
+        except Exception as e:  # upstream unreachable: let the client's retry loop handle it
+            status, headers, body = 502, {}, json.dumps({"error": str(e)}).encode("utf-8")
+        self.send_response(status)
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def run_wiki(wiki: dict, gateway_url: str, stages: list[str]) -> dict:
+    lang, project, access = wiki["lang"], wiki["project"], wiki["access"]
+    env = dict(
+        os.environ,
+        WIKI_LANG=lang,
+        WIKI_PROJECT=project,
+        WIKI_ACCESS=access,
+        FETCH_GATEWAY=gateway_url,
+        WIKIMEDIA_METRICS_API=f"{gateway_url}/wikimedia.org/api/rest_v1",
+        WIKIPEDIA_REST_API=f"{gateway_url}/{lang}.{project}.org/api/rest_v1",
+        WIKIDATA_API=f"{gateway_url}/www.wikidata.org/w/api.php",
+    )
+    res = {"wiki": partition(lang, project, access)["key"], "ok": True, "stages": []}
+    t0 = time.monotonic()
+    for stage in stages:
+        t = time.monotonic()
+        proc = subprocess.run([sys.executable, str(SCRIPTS / f"{stage}.py")], env=env, capture_output=True, text=True)
+        out = (proc.stdout.strip().splitlines() or [""])[-1]
+        if proc.returncode != 0:
+            res["ok"] = False
+            out = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+        res["stages"].append((stage, proc.returncode, time.monotonic() - t, out))
+        if proc.returncode != 0:
+            break
+    res["wall"] = time.monotonic() - t0
+    return res
+
+
+def missing_collections(cfg: dict, config_yml: Path = CONFIG_YML) -> list[str]:
+    text = config_yml.read_text(encoding="utf-8") if config_yml.exists() else ""
+    missing = []
+    for w in cfg["wikis"]:
+        suffix = partition(w["lang"], w["project"], w["access"])["suffix"]
+        for name, _ in COLLECTIONS:
+            if suffix and f"\n  {name}{suffix}:" not in text:
+                missing.append(name + suffix)
+    return missing
+
+
+def _blocks(cfg: dict) -> tuple[list[str], list[str]]:
+    """(collections lines, defaults lines) for the non-default wikis in `cfg`."""
+    colls, defaults = [], []
+    for w in cfg["wikis"]:
+        p = partition(w["lang"], w["project"], w["access"])
+        if not p["suffix"]:
+            continue
+        for name, layout in COLLECTIONS:
+            url = "topics" if name == "topic_history" else name
+            colls += [f"  {name}{p['suffix']}:", "    output: true", f"    permalink: {p['wiki_path']}/{url}/:name/"]
+            defaults += ["  - scope:", '      path: ""', f"      type: {name}{p['suffix']}", "    values:", f"      layout: {layout}"]
+    return colls, defaults
+
+
+def collections_yaml(cfg: dict) -> str:
+    colls, defaults = _blocks(cfg)
+    return "\n".join(["collections:"] + colls + ["", "defaults:"] + defaults) + "\n"
+
+
+def _insert_block(lines: list[str], key: str, block: list[str]) -> list[str]:
+    """Append `block` (wrapped in the generated markers) to the end of top-level mapping `key`."""
+    if key not in lines:
+        lines = lines + ["", key]
+    end = i = lines.index(key) + 1
+    while i < len(lines) and (not lines[i] or lines[i].startswith((" ", "#"))):
+        if lines[i].startswith(" "):
+            end = i + 1
+        i += 1
+    return lines[:end] + [GENERATED_BEGIN] + block + [GENERATED_END] + lines[end:]
+
+
+def sync_config(cfg: dict, config_yml: Path = CONFIG_YML) -> bool:
+    """Replace the generated collections/defaults in _config.yml. Returns True when the file changed."""
+    text = config_yml.read_text(encoding="utf-8") if config_yml.exists() else ""
+    lines, skipping = [], False
+    for line in text.split("\n"):
+        if line == GENERATED_BEGIN:
+            skipping = True
+        elif line == GENERATED_END:
+            skipping = False
+        elif not skipping:
+            lines.append(line)
+    colls, defaults = _blocks(cfg)
+    if colls:
+        lines = _insert_block(lines, "collections:", colls)
+        lines = _insert_block(lines, "defaults:", defaults)
+    new = "\n".join(lines)
+    if new == text:
+        return False
+    tmp = config_yml.with_name(config_yml.name + ".tmp")
+    tmp.write_text(new, encoding="utf-8")
+    tmp.replace(config_yml)
+    return True
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    cfg = load_config()
+    if argv[:1] == ["collections"]:
+        if argv[1:] == ["--print"]:
+            sys.stdout.write(collections_yaml(cfg))
+            return 0
+        changed = sync_config(cfg)
+        print(f"OK {CONFIG_YML} {'updated' if changed else 'unchanged'} wikis={len(cfg['wikis'])}")
+        return 0
+    if argv[:1] == ["run"]:
+        argv = argv[1:]
+    upstream = None
+    if len(argv) == 2 and argv[0] == "--upstream":
+        upstream = argv[1]
+    elif argv:
+        print("usage: multi_wiki.py [run] [--upstream URL] | collections [--print]", file=sys.stderr)
+        return 2
+
+    missing = missing_collections(cfg)
+    if missing:
+        print("ERROR: _config.yml lacks collections " + ", ".join(missing) + "; run `multi_wiki.py collections`",
+              file=sys.stderr)
+        return 2
+
+    session = PooledSession(per_host=cfg.get("connections_per_host", 4), rate_per_host=cfg.get("rate_limit_per_host", 25))
+    session.headers["User-Agent"] = USER_AGENT
+    gw = FetchGateway(session, upstream)
+    threading.Thread(target=gw.serve_forever, daemon=True).start()
+    stages = cfg.get("stages") or DEFAULT_STAGES
+    t0 = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=cfg.get("max_parallel") or len(cfg["wikis"])) as ex:
+            results = list(ex.map(lambda w: run_wiki(w, gw.url, stages), cfg["wikis"]))
+    finally:
+        gw.shutdown()
+        session.close()
+    wall = time.monotonic() - t0
+
+    for res in results:
+        print(f"{'OK' if res['ok'] else 'FAIL'} {res['wiki']} {res['wall']:.2f}s")
+        for stage, rc, secs, out in res["stages"]:
+            print(f"  {stage}: rc={rc} {secs:.2f}s {out}")
+    waited = sum(l.waited for l in session.limiters.values())
+    print(f"wikis={len(results)} wall={wall:.2f}s cache hits={gw.hits} misses={gw.misses} rate-limit wait={waited:.2f}s")
+    return 0 if all(r["ok"] for r in results) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
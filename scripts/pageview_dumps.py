@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Top lists computed from the hourly pageview dumps instead of the API.
+
+The `pageviews/top` endpoint lags by days and only serves the daily
+top-1000. The hourly dump files (https://dumps.wikimedia.org/other/pageviews/,
+`pageviews-YYYYMMDD-HH0000.gz`) carry every title:
+
+  en Main_Page 242332 0
+  en.m Dune:_Part_Two 18830 0
+  de.m.d Haus 12 0          <lang>[.m][.<project code>] <title> <views> <bytes>
+
+This module streams those files through gzip in fixed-size blocks, keeps
+only the lines of the configured wiki (WIKI_LANG / WIKI_PROJECT /
+WIKI_ACCESS), sums views per title in a dict keyed by the undecoded title
+bytes, and selects the top-k with a bounded heap. Files are counted in parallel, one process per file
+(DUMP_WORKERS, default the CPU count). Daily lists can be stored through
+toplist_store, so period aggregates, the co-occurrence graph and the
+recorded stand-in can use days the API never served us.
+
+The dumps only carry desktop and mobile-web views, so "all-access" here
+means desktop + mobile-web, without the app views the API's all-access
+lists include. Stored lists share the store with API lists, so dump-based
+counts run somewhat lower for app-heavy titles.
+
+The store is first-write-wins, so --store refuses a day that does not have
+all 24 hourly files (a partial list would block both the API list and a
+later complete run) unless --allow-partial is given.
+
+Usage:
+  python scripts/pageview_dumps.py FILE_OR_DIR... [--k 1000] [--store [--allow-partial]] [--hourly]
+  python scripts/pageview_dumps.py synth DIR YYYY-MM-DD [--hours 24] [--titles 200000]
+
+`synth` writes synthetic dump files in the same format for load testing.
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import gzip
+import heapq
+import os
+import random
+import re
+import sys
+import time
+from itertools import repeat
+from operator import itemgetter
+from pathlib import Path
+
+from wiki_config import ACCESS, LANG, PROJECT
+
+DEFAULT_K = 1000
+CHUNK = 1 << 24  # decompressed bytes scanned per block
+WORKERS = int(os.environ.get("DUMP_WORKERS") or os.cpu_count() or 1)
+
+# Project suffixes used in dump domain codes (wikipedia has none).
+PROJECT_CODES = {
+    "wikipedia": "",
+    "wikibooks": "b",
+    "wiktionary": "d",
+    "wikimedia": "m",
+    "wikinews": "n",
+    "wikiquote": "q",
+    "wikisource": "s",
+    "wikiversity": "v",
+    "wikivoyage": "voy",
+    "mediawiki": "w",
+    "wikidata": "wd",
+}
+_NAME = re.compile(r"pageviews-(\d{8})-(\d{2})\d{4}\.gz$")
+
+
+def domain_codes(lang: str = LANG, project: str = PROJECT, access: str = ACCESS) -> tuple[bytes, ...]:
+    """Dump domain codes for a wiki: desktop `en`, mobile-web `en.m` (and `.d`, `.m.d`, ... for sister projects)."""
+    if project not in PROJECT_CODES:
+        raise ValueError(f"no dump domain code for project {project!r}")
+    suffix = "." + PROJECT_CODES[project] if PROJECT_CODES[project] else ""
+    codes = []
+    if access in ("all-access", "desktop"):
+        codes.append(f"{lang}{suffix}")
+    if access in ("all-access", "mobile-web"):
+        codes.append(f"{lang}.m{suffix}")
+    if not codes:
+        # mobile-app views are not in the hourly pageview dumps
+        raise ValueError(f"access {access!r} is not available in the pageview dumps")
+    return tuple(c.encode("ascii") for c in codes)
+
+
+def file_hour(path: Path) -> tuple[_dt.date, int] | None:
+    m = _NAME.search(path.name)
+    if not m:
+        return None
+    return _dt.datetime.strptime(m.group(1), "%Y%m%d").date(), int(m.group(2))
+
+
+def count_file(path, codes: tuple[bytes, ...], chunk: int = CHUNK) -> dict[bytes, int]:
+    """Views per title for one dump file, only for lines whose domain code is in `codes`.
+
+    The file is decompressed in `chunk`-sized blocks cut at line ends and
+    scanned with one anchored pattern, so lines of other wikis are skipped in C.
+    """
+    pattern = re.compile(rb"^(?:" + b"|".join(re.escape(c) for c in codes) + rb") (\S+) (\d+) \S*$", re.M)
+    counts: dict[bytes, int] = {}
+    get = counts.get
+    tail = b""
+    with gzip.open(path, "rb") as fh:
+        while True:
+            buf = fh.read(chunk)
+            data = tail + buf
+            cut = data.rfind(b"\n") + 1 if buf else len(data)
+            data, tail = data[:cut], data[cut:]
+            for title, views in pattern.findall(data):
+                counts[title] = get(title, 0) + int(views)
+            if not buf:
+                return counts
+
+
+def top_k(counts: dict[bytes, int], k: int = DEFAULT_K) -> list[dict]:
+    """Top-k as top-list articles ({article, views, rank}); ties broken by title."""
+    best = heapq.nlargest(k, counts.items(), key=itemgetter(1))
+    best.sort(key=lambda kv: (-kv[1], kv[0]))
+    return [{"article": t.decode("utf-8", "replace"), "views": v, "rank": i} for i, (t, v) in enumerate(best, 1)]
+
+
+def _hour_top(path, codes, k):
+    return top_k(count_file(path, codes), k)
+
+
+def merge(into: dict[bytes, int], counts: dict[bytes, int]) -> dict[bytes, int]:
+    if len(counts) > len(into):
+        into, counts = counts, into
+    get = into.get
+    for t, v in counts.items():
+        into[t] = get(t, 0) + v
+    return into
+
+
+def _pool(workers: int, n: int):
+    from concurrent.futures import ProcessPoolExecutor
+
+    return ProcessPoolExecutor(max_workers=max(1, min(workers, n)))
+
+
+def daily_top(paths: list[Path], k: int = DEFAULT_K, codes: tuple[bytes, ...] | None = None,
+              workers: int = WORKERS) -> list[dict]:
+    """Top-k over all `paths` (normally the 24 hourly files of one day)."""
+    codes = codes or domain_codes()
+    total: dict[bytes, int] = {}
+    if workers <= 1 or len(paths) == 1:
+        for p in paths:
+            total = merge(total, count_file(p, codes))
+    else:
+        with _pool(workers, len(paths)) as ex:
+            for counts in ex.map(count_file, paths, repeat(codes)):
+                total = merge(total, counts)
+    return top_k(total, k)
+
+
+def hourly_tops(paths: list[Path], k: int = DEFAULT_K, codes: tuple[bytes, ...] | None = None,
+                workers: int = WORKERS) -> list[list[dict]]:
+    """Top-k per file; only the k rows per hour cross process boundaries."""
+    codes = codes or domain_codes()
+    if workers <= 1 or len(paths) == 1:
+        return [_hour_top(p, codes, k) for p in paths]
+    with _pool(workers, len(paths)) as ex:
+        return list(ex.map(_hour_top, paths, repeat(codes), repeat(k)))
+
+
+def dump_files(args: list[str]) -> dict[_dt.date, list[Path]]:
+    """Dump files named on the command line (or found in directories), grouped by day."""
+    by_day: dict[_dt.date, list[Path]] = {}
+    for a in args:
+        p = Path(a)
+        for f in (sorted(p.glob("pageviews-*.gz")) if p.is_dir() else [p]):
+            dh = file_hour(f)
+            if dh is None:
+                print(f"WARN skipping {f}: not a pageviews-YYYYMMDD-HH0000.gz file", file=sys.stderr)
+                continue
+            by_day.setdefault(dh[0], []).append(f)
+    return {d: sorted(fs) for d, fs in sorted(by_day.items())}
+
+
+def write_synthetic(out_dir: Path, day: _dt.date, hours: int = 24, titles: int = 200_000, seed: int = 1) -> list[Path]:
+    """Zipf-ish synthetic dump files for `day`, with other wikis mixed in so the filter has work to do."""
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    codes = [c.decode("ascii") for c in domain_codes()]
+    noise = ["de", "de.m", "fr", "fr.m", "commons.m", f"{LANG}.d", f"{LANG}.m.d"]
+    paths = []
+    for h in range(hours):
+        path = out_dir / f"pageviews-{day.strftime('%Y%m%d')}-{h:02d}0000.gz"
+        lines = []
+        for i in range(titles):
+            base = max(1, int(500_000 / (i + 1) ** 1.1))
+            lines.append(f"{codes[i % len(codes)]} Title_{i} {max(1, int(base * rng.uniform(0.5, 1.5)))} 0\n")
+            if i % 3 == 0:
+                lines.append(f"{noise[i % len(noise)]} Title_{i} {rng.randint(1, 50_000)} 0\n")
+        rng.shuffle(lines)
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=5) as fh:
+            fh.writelines(lines)
+        paths.append(path)
+    return paths
+
+
+def _opt(argv: list[str], name: str, default):
+    if name in argv:
+        i = argv.index(name)
+        value = argv[i + 1]
+        del argv[i:i + 2]
+        return type(default)(value)
+    return default
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if argv[:1] == ["synth"]:
+        hours = _opt(argv, "--hours", 24)
+        titles = _opt(argv, "--titles", 200_000)
+        if len(argv) != 3:
+            print("usage: pageview_dumps.py synth DIR YYYY-MM-DD [--hours 24] [--titles 200000]", file=sys.stderr)
+            return 2
+        t0 = time.monotonic()
+        paths = write_synthetic(Path(argv[1]), _dt.date.fromisoformat(argv[2]), hours, titles)
+        print(f"OK synthetic dumps files={len(paths)} ({time.monotonic() - t0:.2f}s)")
+        return 0
+
+    k = _opt(argv, "--k", DEFAULT_K)
+    workers = _opt(argv, "--workers", WORKERS)
+    store = "--store" in argv
+    allow_partial = "--allow-partial" in argv
+    hourly = "--hourly" in argv
+    args = [a for a in argv if a not in ("--store", "--allow-partial", "--hourly")]
+    if not args:
+        print("usage: pageview_dumps.py FILE_OR_DIR... [--k 1000] [--workers N] [--store [--allow-partial]] [--hourly]",
+              file=sys.stderr)
+        return 2
+    by_day = dump_files(args)
+    codes = domain_codes()
+    failed = 0
+    for day, paths in by_day.items():
+        partial = len(paths) != 24
+        if partial:
+            print(f"WARN {day.isoformat()}: {len(paths)} of 24 hourly files", file=sys.stderr)
+        if store and partial and not hourly and not allow_partial:
+            print(f"ERROR {day.isoformat()}: not storing a partial day (pass --allow-partial to store it anyway)",
+                  file=sys.stderr)
+            failed += 1
+            continue
+        t0 = time.monotonic()
+        size = sum(p.stat().st_size for p in paths)
+        if hourly:
+            for p, arts in zip(paths, hourly_tops(paths, k, codes, workers)):
+                head = ", ".join(f"{a['article']} ({a['views']:,})" for a in arts[:3])
+                print(f"{p.name}: {head}")
+            print(f"OK hourly {day.isoformat()} files={len(paths)} ({time.monotonic() - t0:.2f}s)")
+            continue
+        arts = daily_top(paths, k, codes, workers)
+        note = ""
+        if store:
+            from toplist_store import save_top, toplist_path
+
+            existed = toplist_path(day).exists()
+            save_top(day, arts)
+            note = " kept-existing" if existed else " stored"
+        el = time.monotonic() - t0
+        print(f"OK daily {day.isoformat()} files={len(paths)} articles={len(arts)} "
+              f"({size / 1e6 / (el or 1e-9):.1f} MB/s gz, {el:.2f}s){note}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
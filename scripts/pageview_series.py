@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Daily pageview series per article, fetched incrementally into a local cache.
+
+Entries only know a topic's views on the days it was picked. This module
+pulls full daily series from the per-article endpoint
+
+  {METRICS_API}/metrics/pageviews/per-article/<project>/<access>/user/<article>/daily/<start>/<end>
+
+and keeps one cache file per article under _state/pageviews/ holding the
+date ranges already fetched and the views per day. A request is only made for
+the gaps between the wanted window and the covered ranges, so keeping an
+active topic current costs one small request per day. Days inside the API's
+publication lag are not marked covered until they have data.
+
+Usage:
+  python scripts/pageview_series.py [--days 90] [--all]   # refresh ledger topics
+  python scripts/pageview_series.py show <Article_Title> [--days 30]
+
+Ledger topics seen in the last ACTIVE_DAYS days are refreshed (all topics with
+--all), SERIES_WORKERS (default 8) at a time.
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import hashlib
+import json
+import os
+import sys
+import time
+import urllib.parse
+from pathlib import Path
+
+from wiki_config import ACCESS, LANG, PROJECT, STATE_DIR
+
+USER_AGENT = "WikiLedgerBot/1.0"
+METRICS_API = os.environ.get("WIKIMEDIA_METRICS_API", "https://wikimedia.org/api/rest_v1")
+SERIES_DIR = STATE_DIR / "pageviews"
+WORKERS = int(os.environ.get("SERIES_WORKERS") or 8)
+DEFAULT_DAYS = 90
+ACTIVE_DAYS = 30
+# Days this close to today may still be missing from the API; never mark them covered without data.
+LAG_DAYS = 3
+SPARKS = "▁▂▃▄▅▆▇█"
+
+_ONE = _dt.timedelta(days=1)
+
+
+def get_json(session, url: str, *, tries: int = 6, timeout=None):
+    from http_transport import fetch
+
+    doc, r = fetch(session, url, tries=tries, timeout=timeout)
+    return doc, r.status_code
+
+
+def cache_path(article: str, root: Path = SERIES_DIR) -> Path:
+    h = hashlib.sha1(article.encode("utf-8")).hexdigest()
+    return root / h[:2] / f"{h}.json"
+
+
+def load_cache(article: str, root: Path = SERIES_DIR) -> dict:
+    path = cache_path(article, root)
+    if path.exists():
+        return json.loads(path.read_text(encoding="utf-8"))
+    return {"article": article, "ranges": [], "views": {}}
+
+
+def save_cache(data: dict, root: Path = SERIES_DIR) -> None:
+    path = cache_path(data["article"], root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+def merge_ranges(ranges: list[tuple[_dt.date, _dt.date]]) -> list[tuple[_dt.date, _dt.date]]:
+    out: list[tuple[_dt.date, _dt.date]] = []
+    for a, b in sorted(ranges):
+        if out and a <= out[-1][1] + _ONE:
+            out[-1] = (out[-1][0], max(out[-1][1], b))
+        else:
+            out.append((a, b))
+    return out
+
+
+def gaps(ranges: list[tuple[_dt.date, _dt.date]], start: _dt.date, end: _dt.date) -> list[tuple[_dt.date, _dt.date]]:
+    """Sub-ranges of [start, end] not covered by `ranges` (which must be merged)."""
+    out = []
+    cur = start
+    for a, b in ranges:
+        if b < cur:
+            continue
+        if a > end:
+            break
+        if a > cur:
+            out.append((cur, a - _ONE))
+        cur = max(cur, b + _ONE)
+    if cur <= end:
+        out.append((cur, end))
+    return out
+
+
+def _ranges(data: dict) -> list[tuple[_dt.date, _dt.date]]:
+    return [(_dt.date.fromisoformat(a), _dt.date.fromisoformat(b)) for a, b in data["ranges"]]
+
+
+def series_url(article: str, start: _dt.date, end: _dt.date) -> str:
+    art = urllib.parse.quote(article, safe="")
+    return (f"{METRICS_API}/metrics/pageviews/per-article/{LANG}.{PROJECT}/{ACCESS}/user/{art}/daily/"
+            f"{start.strftime('%Y%m%d')}00/{end.strftime('%Y%m%d')}00")
+
+
+def fetch_gap(session, article: str, start: _dt.date, end: _dt.date, today: _dt.date):
+    """Return ({iso_day: views}, covered (start, end) or None)."""
+    doc, code = get_json(session, series_url(article, start, end))
+    views = {}
+    for item in (doc or {}).get("items", []):
+        ts = item.get("timestamp", "")
+        views[f"{ts[:4]}-{ts[4:6]}-{ts[6:8]}"] = int(item.get("views", 0))
+    settled = today - _dt.timedelta(days=LAG_DAYS)
+    if end <= settled:
+        return views, (start, end)
+    # The tail of the window may not be published yet: cover only up to the last day with data.
+    ends = [_dt.date.fromisoformat(d) for d in views]
+    if start <= settled:
+        ends.append(settled)
+    return views, ((start, max(ends)) if ends else None)
+
+
+def ensure_series(session, article: str, start: _dt.date, end: _dt.date, *, today: _dt.date | None = None,
+                  root: Path = SERIES_DIR) -> tuple[dict, int]:
+    """Fetch whatever part of [start, end] the cache lacks. Returns (cache data, requests made)."""
+    today = today or _dt.date.today()
+    end = min(end, today - _ONE)
+    data = load_cache(article, root)
+    covered = merge_ranges(_ranges(data))
+    missing = gaps(covered, start, end)
+    for a, b in missing:
+        views, cov = fetch_gap(session, article, a, b, today)
+        data["views"].update(views)
+        if cov:
+            covered = merge_ranges(covered + [cov])
+    if missing:
+        data["ranges"] = [[a.isoformat(), b.isoformat()] for a, b in covered]
+        save_cache(data, root)
+    return data, len(missing)
+
+
+def series(article: str, start: _dt.date, end: _dt.date, root: Path = SERIES_DIR) -> list[tuple[_dt.date, int | None]]:
+    """Cached daily views for [start, end]; None for days not covered."""
+    data = load_cache(article, root)
+    covered = merge_ranges(_ranges(data))
+    out = []
+    day = start
+    while day <= end:
+        iso = day.isoformat()
+        if iso in data["views"]:
+            out.append((day, data["views"][iso]))
+        else:
+            known = any(a <= day <= b for a, b in covered)
+            out.append((day, 0 if known else None))
+        day += _ONE
+    return out
+
+
+def sparkline(values: list[int | None]) -> str:
+    nums = [v for v in values if v is not None]
+    if not nums:
+        return ""
+    lo, hi = min(nums), max(nums)
+    span = (hi - lo) or 1
+    return "".join(" " if v is None else SPARKS[int((v - lo) / span * (len(SPARKS) - 1))] for v in values)
+
+
+def ledger_topics() -> dict[str, _dt.date]:
+    """Article title -> last date the ledger picked it."""
+    from entry_archive import iter_fronts
+    from wiki_config import collection_dir
+
+    last: dict[str, _dt.date] = {}
+    for _name, fm in iter_fronts(collection_dir("_entries")):
+        url = fm.get("topic_url") or ""
+        if "/wiki/" in url:
+            article = urllib.parse.unquote(url.rsplit("/wiki/", 1)[1])
+        else:
+            article = (fm.get("topic_title") or "").replace(" ", "_")
+        if not article or not fm.get("date"):
+            continue
+        d = _dt.date.fromisoformat(fm["date"])
+        if article not in last or d > last[article]:
+            last[article] = d
+    return last
+
+
+def refresh(articles: list[str], start: _dt.date, end: _dt.date, workers: int = WORKERS) -> tuple[int, int]:
+    """Bring every article's cache up to [start, end]. Returns (requests, failures)."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from http_transport import PooledSession
+
+    session = PooledSession(per_host=workers)
+    session.headers["User-Agent"] = USER_AGENT
+
+    def one(article):
+        try:
+            return ensure_series(session, article, start, end)[1]
+        except RuntimeError as e:
+            print(f"WARN {article}: {e}", file=sys.stderr)
+            return -1
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            results = list(ex.map(one, articles))
+    finally:
+        session.close()
+    failures = sum(1 for n in results if n < 0)
+    return sum(n for n in results if n > 0), failures
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    days = DEFAULT_DAYS
+    if "--days" in argv:
+        i = argv.index("--days")
+        days = int(argv[i + 1])
+        del argv[i:i + 2]
+    end = _dt.date.today() - _ONE
+    start = end - _dt.timedelta(days=days - 1)
+
+    if argv[:1] == ["show"] and len(argv) == 2:
+        pts = series(argv[1], start, end)
+        print(sparkline([v for _, v in pts]))
+        for d, v in pts:
+            print(f"{d.isoformat()}  {'' if v is None else v}")
+        return 0
+
+    topics = ledger_topics()
+    if "--all" in argv:
+        articles = sorted(topics)
+    else:
+        cutoff = end - _dt.timedelta(days=ACTIVE_DAYS)
+        articles = sorted(a for a, d in topics.items() if d >= cutoff)
+    t0 = time.monotonic()
+    requests_made, failures = refresh(articles, start, end)
+    print(f"OK pageview series topics={len(articles)} requests={requests_made} failed={failures} "
+          f"window={start.isoformat()}..{end.isoformat()} ({time.monotonic() - t0:.2f}s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Period (weekly / monthly) top lists aggregated from stored daily top lists.
+
+Each daily top list in toplist_store is folded into one accumulator per
+period, article -> [summed views, days present, best rank]. The period's
+top-k is then a bounded heap selection over that accumulator, so a report
+costs one merge instead of re-downloading N days.
+
+The accumulator is cached at _state/toplists/<wiki>/periods/<kind>-<start>.json.gz
+together with the days already folded into it. Daily top lists are
+write-once, so extending a period only folds the days added since the last
+call (normally one).
+
+Usage:
+  python scripts/period_toplists.py weekly|monthly YYYY-MM-DD [K]
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import calendar
+import datetime as _dt
+import gzip
+import heapq
+import json
+import sys
+from pathlib import Path
+
+from toplist_store import DEFAULT_WIKI, TOPLISTS_DIR, load_top, stored_days
+
+KINDS = ("weekly", "monthly")
+_VIEWS, _DAYS, _BEST = range(3)
+
+
+def is_normal(title: str) -> bool:
+    if title == "Main_Page":
+        return False
+    if title.startswith(("Special:", "File:", "Talk:", "User:", "Wikipedia:")):
+        return False
+    return True
+
+
+def period_bounds(kind: str, day: _dt.date) -> tuple[_dt.date, _dt.date]:
+    """(first, last) day of the ISO week or calendar month containing `day`."""
+    if kind == "weekly":
+        start = day - _dt.timedelta(days=day.weekday())
+        return start, start + _dt.timedelta(days=6)
+    if kind == "monthly":
+        return day.replace(day=1), day.replace(day=calendar.monthrange(day.year, day.month)[1])
+    raise ValueError(f"unknown period kind {kind!r}")
+
+
+def cache_path(kind: str, start: _dt.date, wiki: str = DEFAULT_WIKI, root: Path = TOPLISTS_DIR) -> Path:
+    return root / wiki / "periods" / f"{kind}-{start.isoformat()}.json.gz"
+
+
+def _load_cache(path: Path) -> dict:
+    if not path.exists():
+        return {"days": [], "acc": {}}
+    return json.loads(gzip.decompress(path.read_bytes()))
+
+
+def _save_cache(path: Path, data: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(gzip.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), mtime=0))
+    tmp.replace(path)
+
+
+def fold(acc: dict[str, list[int]], articles: list[dict]) -> None:
+    """Add one day's top list into the accumulator."""
+    for a in articles:
+        title = a["article"]
+        if not is_normal(title):
+            continue
+        row = acc.get(title)
+        if row is None:
+            acc[title] = [a["views"], 1, a["rank"]]
+        else:
+            row[_VIEWS] += a["views"]
+            row[_DAYS] += 1
+            if a["rank"] < row[_BEST]:
+                row[_BEST] = a["rank"]
+
+
+def top_k(acc: dict[str, list[int]], k: int) -> list[dict]:
+    best = heapq.nlargest(k, acc.items(), key=lambda kv: (kv[1][_VIEWS], kv[1][_DAYS], -kv[1][_BEST]))
+    return [{"article": t, "views": r[_VIEWS], "days": r[_DAYS], "best_rank": r[_BEST]} for t, r in best]
+
+
+def aggregate(kind: str, day: _dt.date, k: int = 50, wiki: str = DEFAULT_WIKI, root: Path = TOPLISTS_DIR) -> dict:
+    """Top-k for the period containing `day`, extending the cached accumulator with any new days.
+
+    Returns {kind, start, end, days: [iso...], articles: [{article, views, days, best_rank}]}.
+    """
+    start, end = period_bounds(kind, day)
+    path = cache_path(kind, start, wiki, root)
+    data = _load_cache(path)
+    folded = set(data["days"])
+    new_days = [d for d in stored_days(wiki, root) if start <= d <= end and d.isoformat() not in folded]
+    for d in new_days:
+        fold(data["acc"], load_top(d, wiki, root) or [])
+        data["days"].append(d.isoformat())
+    if new_days:
+        data["days"].sort()
+        _save_cache(path, data)
+    return {
+        "kind": kind,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": data["days"],
+        "articles": top_k(data["acc"], k),
+    }
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if len(argv) not in (2, 3) or argv[0] not in KINDS:
+        print("usage: period_toplists.py weekly|monthly YYYY-MM-DD [K]", file=sys.stderr)
+        return 2
+    agg = aggregate(argv[0], _dt.date.fromisoformat(argv[1]), int(argv[2]) if len(argv) == 3 else 20)
+    for i, a in enumerate(agg["articles"], 1):
+        print(f"{i:3d}  {a['views']:>11,}  {a['days']}d  best #{a['best_rank']:<4d} {a['article']}")
+    print(f"OK {agg['kind']} {agg['start']}..{agg['end']} days={len(agg['days'])} articles={len(agg['articles'])}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,14 +5,23 @@ Why: Backfill/regeneration passes can leave entry metadata inconsistent (e.g.
 `sentence_changed: true` while the topic history shows unchanged).
 
 This script:
-1) Scans all _entries/*.md chronologically.
-2) Recomputes these fields per entry (based on prior appearances of the same normalized_title):
+1) Scans all entries (live _entries/*.md and _archive/ years) chronologically.
+2) Recomputes these fields per entry (based on prior appearances of the same topic,
+   resolved through the topic identity index by page id / Wikidata item / title):
    - times_seen_total
    - first_seen
    - days_since_last_seen
    - sentence_changed
    - change_type (first_seen|unchanged|modified)
-3) Rewrites _topics/*.md from scratch (append-only guarantee intentionally waived for this repair).
+   - topic_key / topic_slug
+3) Rewrites _topics/*.md summary pages and _topic_history/ segments from scratch
+   (append-only guarantee intentionally waived for this repair).
+4) Appends entry_patched / topic_changed events for what actually changed to
+   the changelog (changelog.py) and re-renders the affected archive months.
+5) Rebuilds the JSON API in full (build_api.py): removed topics leave no event.
+
+Set REBUILD_MODE=streaming to run the bounded-memory variant (external sort by
+topic, one topic page in memory at a time) on large ledgers / small runners.
 
 No external dependencies.
 """
@@ -20,11 +29,28 @@ No external dependencies.
 from __future__ import annotations
 
 import datetime as _dt
+import heapq
+import itertools
+import json
+import os
 import re
 from pathlib import Path
 
-ENTRIES_DIR = Path("_entries")
-TOPICS_DIR = Path("_topics")
+import changelog
+from archive_pages import render_changes
+from build_api import build
+from bulk_runner import atomic_write_text, run_bulk
+from entry_archive import is_archived, iter_fronts, parse_front, read_entry, rewrite_year, transform_archives
+from topic_index import TopicIndex
+from topic_pages import clear_history, write_segments, write_summary
+from wiki_config import collection_dir
+
+ENTRIES_DIR = collection_dir("_entries")
+TOPICS_DIR = collection_dir("_topics")
+SOURCE = "rebuild"
+
+# Records per sorted run in streaming mode (bounds memory, not correctness).
+SORT_CHUNK = 20000
 
 
 def yq(s):
@@ -84,12 +110,9 @@ def set_key(txt: str, key: str, value_yaml: str) -> str:
     return head + tail
 
 
-def main():
-    TOPICS_DIR.mkdir(exist_ok=True)
-
-    entries = []
-    for ep in ENTRIES_DIR.glob("*.md"):
-        fm = read_front(ep)
+def iter_entries():
+    """Yield (date, entry name, front matter) for live and archived entries, in name order."""
+    for name, fm in iter_fronts(ENTRIES_DIR):
         if not fm.get("date"):
             continue
         try:
@@ -99,136 +122,325 @@ def main():
         norm = fm.get("normalized_title") or fm.get("topic_title")
         if not norm:
             continue
-        entries.append((d, ep, fm))
+        yield d, name, fm
+
+
+def register_topic(topic_index: TopicIndex, fm: dict) -> tuple[str, str]:
+    return topic_index.register(
+        language=fm.get("language"),
+        page_id=fm.get("topic_page_id"),
+        wikibase_item=fm.get("wikibase_item"),
+        titles=[fm.get("normalized_title"), fm.get("canonical_title"), fm.get("topic_title")],
+    )
+
+
+def change_hash(fm: dict) -> str:
+    # Prefer paragraph_hash for change detection when available
+    return fm.get("paragraph_hash") or fm.get("sentence_hash") or ""
+
+
+def advance(st: dict | None, d: _dt.date, sh: str) -> dict:
+    """Fold one appearance into a topic's running state (appearances in date order)."""
+    if st is None:
+        return {
+            "first_seen": d,
+            "times": 1,
+            "days_since": None,
+            "sentence_changed": True,
+            "change_type": "first_seen",
+            "changed_count": 1,
+            "last_hash": sh,
+            "last_date": d,
+        }
+    if sh and sh == st["last_hash"]:
+        sentence_changed = False
+        change_type = "unchanged"
+        changed_count = st["changed_count"]
+    else:
+        sentence_changed = True
+        change_type = "modified"
+        changed_count = st["changed_count"] + 1
+    return {
+        "first_seen": st["first_seen"],
+        "times": st["times"] + 1,
+        "days_since": (d - st["last_date"]).days,
+        "sentence_changed": sentence_changed,
+        "change_type": change_type,
+        "changed_count": changed_count,
+        "last_hash": sh or st["last_hash"],
+        "last_date": d,
+    }
+
+
+def patch_text(txt: str, arg: tuple[dict, str, str]) -> str:
+    st, key, slug = arg
+    txt2 = txt
+    txt2 = set_key(txt2, "times_seen_total", str(st["times"]))
+    txt2 = set_key(txt2, "first_seen", yq(st["first_seen"].isoformat()))
+    txt2 = set_key(txt2, "days_since_last_seen", "null" if st["days_since"] is None else str(st["days_since"]))
+    txt2 = set_key(txt2, "sentence_changed", "true" if st["sentence_changed"] else "false")
+    txt2 = set_key(txt2, "change_type", yq(st["change_type"]))
+    txt2 = set_key(txt2, "topic_key", yq(key))
+    txt2 = set_key(txt2, "topic_slug", yq(slug))
+    return txt2
+
+
+def patch_entry(ep: Path, st: dict, key: str, slug: str) -> bool:
+    txt = ep.read_text(encoding="utf-8")
+    txt2 = patch_text(txt, (st, key, slug))
+    if txt2 != txt:
+        atomic_write_text(ep, txt2)
+        return True
+    return False
+
+
+def history_item(d: _dt.date, fm: dict, sh: str, change_type: str) -> dict:
+    return {
+        "date": d.isoformat(),
+        "rank": int(fm.get("rank", "0") or 0),
+        "pageviews": int(fm.get("pageviews", "0") or 0),
+        "lead_sentence": fm.get("lead_sentence") or "",
+        "lead_paragraph": fm.get("lead_paragraph") or fm.get("lead_sentence") or "",
+        "sentence_hash": fm.get("sentence_hash") or "",
+        "paragraph_hash": sh,
+        "change_type": change_type,
+        "source_revision_id": int(fm.get("source_revision_id", "0") or 0),
+        # carry a few useful bits
+        "topic_title": fm.get("topic_title") or fm.get("canonical_title") or "",
+        "topic_page_id": fm.get("topic_page_id"),
+        "wikibase_item": fm.get("wikibase_item"),
+        "topic_url": fm.get("topic_url"),
+        "language": fm.get("language"),
+        "namespace_id": int(fm.get("namespace_id", "0") or 0),
+        "article_type": fm.get("article_type"),
+        "description": fm.get("description"),
+        "description_source": fm.get("description_source"),
+        "canonical_title": fm.get("canonical_title"),
+        "normalized_title": fm.get("normalized_title") or fm.get("topic_title"),
+    }
+
+
+def write_topic(path: Path, key: str, st: dict, hist: list[dict]) -> None:
+    # Use last item as metadata source
+    last = hist[-1]
+
+    meta = [
+        yaml_kv("layout", "topic"),
+        yaml_kv("title", last.get("canonical_title") or last.get("topic_title")),
+        yaml_kv("topic_title", last.get("topic_title")),
+        yaml_kv("topic_page_id", last.get("topic_page_id")),
+        yaml_kv("wikibase_item", last.get("wikibase_item")),
+        yaml_kv("topic_url", last.get("topic_url")),
+        yaml_kv("language", last.get("language")),
+        yaml_kv("namespace_id", last.get("namespace_id")),
+        yaml_kv("article_type", last.get("article_type")),
+        yaml_kv("description", last.get("description")),
+        yaml_kv("description_source", last.get("description_source")),
+        yaml_kv("canonical_title", last.get("canonical_title")),
+        yaml_kv("normalized_title", last.get("normalized_title")),
+        yaml_kv("topic_key", key),
+        yaml_kv("times_seen_total", st["times"]),
+        yaml_kv("sentence_changed_count", st["changed_count"]),
+    ]
+    items = [
+        {
+            "date": item["date"],
+            "rank": item["rank"],
+            "pageviews": item["pageviews"],
+            "lead_sentence": item["lead_sentence"],
+            "lead_paragraph": item.get("lead_paragraph") or item["lead_sentence"],
+            "sentence_hash": item["sentence_hash"],
+            "paragraph_hash": item["sentence_hash"],
+            "change_type": item["change_type"],
+            "source_revision_id": item["source_revision_id"],
+        }
+        for item in hist
+    ]
+    slug = path.stem
+    write_segments(slug, {"topic_title": last.get("topic_title")}, items)
+    write_summary(path, meta, slug=slug, first_seen=st["first_seen"].isoformat(), hist_tail=items, total=len(items))
 
-    entries.sort(key=lambda t: (t[0], t[1].name))
 
-    # Recompute per-topic state
-    state = {}
-    topic_hist = {}  # key -> list of history items
+def topic_hashes() -> dict[str, str]:
+    return {tp.stem: changelog.content_hash(tp.read_bytes()) for tp in TOPICS_DIR.glob("*.md")}
+
+
+def topic_events(before: dict[str, str]) -> list[dict]:
+    """topic_changed events for pages whose content differs from the pre-rebuild snapshot."""
+    out = []
+    for tp in sorted(TOPICS_DIR.glob("*.md")):
+        data = tp.read_bytes()
+        if before.get(tp.stem) != changelog.content_hash(data):
+            out.append(changelog.event("topic_changed", tp.stem, data, SOURCE))
+    return out
+
+
+def clear_topics():
+    for tp in TOPICS_DIR.glob("*.md"):
+        tp.unlink()
+    clear_history()
+
+
+def _spill(chunk: list[str], tmpdir: Path, runs: list[Path]) -> None:
+    chunk.sort()
+    run = tmpdir / f"run-{len(runs):05d}.tsv"
+    with run.open("w", encoding="utf-8") as fh:
+        fh.writelines(chunk)
+    runs.append(run)
+
+
+def external_sort(lines, tmpdir: Path, chunk_size: int = SORT_CHUNK):
+    """Sort newline-terminated records on disk: sorted runs of chunk_size lines, then a k-way merge."""
+    runs: list[Path] = []
+    chunk: list[str] = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_size:
+            _spill(chunk, tmpdir, runs)
+            chunk = []
+    if chunk:
+        _spill(chunk, tmpdir, runs)
+
+    handles = [run.open(encoding="utf-8") for run in runs]
+    try:
+        yield from heapq.merge(*handles)
+    finally:
+        for fh in handles:
+            fh.close()
+
+
+def main_streaming(topic_index: TopicIndex) -> int:
+    """Bounded-memory rebuild.
+
+    Pass 1 emits one compact `topic_key, date, entry, change_hash` record per
+    entry; an external sort groups them by topic in date order; pass 2 re-reads
+    each topic's entries, patches them and writes that topic page before moving
+    on. Only the current topic's history and the identity index are held in
+    memory.
+    """
+    import tempfile  # only the streaming mode needs it
 
     patched = 0
+    topics = 0
+    spills = {}
+    events = []
+
+    with tempfile.TemporaryDirectory(prefix="rebuild-") as tmp:
+
+        def records():
+            # Sorted file names (= dates) keep slug assignment for new topics deterministic.
+            for d, name, fm in iter_entries():
+                key, _ = register_topic(topic_index, fm)
+                yield f"{key}\t{d.isoformat()}\t{name}\t{change_hash(fm)}\n"
+
+        grouped = external_sort(records(), Path(tmp), SORT_CHUNK)
+        first = next(grouped, None)
+        before = topic_hashes()
+        clear_topics()
+        if first is None:
+            topic_index.save()
+            print("OK patched_entries=0 topics=0")
+            return 0
+
+        cur_key = None
+        st = None
+        hist: list[dict] = []
+        for line in itertools.chain([first], grouped):
+            key, date_s, name, sh = line.rstrip("\n").split("\t")
+            if key != cur_key:
+                if cur_key is not None:
+                    write_topic(TOPICS_DIR / f"{topic_index.slug_for(cur_key)}.md", cur_key, st, hist)
+                    topics += 1
+                cur_key, st, hist = key, None, []
+            d = _dt.date.fromisoformat(date_s)
+            text = read_entry(name, ENTRIES_DIR)
+            fm = parse_front(text)
+            st = advance(st, d, sh)
+            if is_archived(name, ENTRIES_DIR):
+                # Archived records are repacked once per year at the end.
+                new = patch_text(text, (st, key, topic_index.slug_for(key)))
+                if new != text:
+                    spill = spills.get(name[:4])
+                    if spill is None:
+                        spill = spills[name[:4]] = (Path(tmp) / f"patch-{name[:4]}.jsonl").open("w", encoding="utf-8")
+                    spill.write(json.dumps({"name": name, "text": new}) + "\n")
+                    patched += 1
+            elif patch_entry(ENTRIES_DIR / name, st, key, topic_index.slug_for(key)):
+                patched += 1
+                events.append(changelog.event("entry_patched", name, (ENTRIES_DIR / name).read_bytes(), SOURCE))
+            hist.append(history_item(d, fm, sh, st["change_type"]))
+        write_topic(TOPICS_DIR / f"{topic_index.slug_for(cur_key)}.md", cur_key, st, hist)
+        topics += 1
+
+        for year, spill in spills.items():
+            spill.close()
+            with open(spill.name, encoding="utf-8") as fh:
+                repl = {rec["name"]: rec["text"] for rec in map(json.loads, fh)}
+            archived = []
+            rewrite_year(int(year), lambda name, text: repl.get(name, text), changed_records=archived)
+            events += [changelog.event("entry_patched", name, text, SOURCE) for name, text in archived]
+
+    topic_index.save()
+    changelog.append(events + topic_events(before))
+
+    print(f"OK patched_entries={patched} topics={topics}")
+    return 0
 
-    for d, ep, fm in entries:
-        key = (fm.get("normalized_title") or fm.get("topic_title") or "").lower()
-        # Prefer paragraph_hash for change detection when available
-        sh = fm.get("paragraph_hash") or fm.get("sentence_hash") or ""
-        st = state.get(key)
-        if st is None:
-            first_seen = d
-            times = 1
-            days_since = None
-            sentence_changed = True
-            change_type = "first_seen"
-            changed_count = 1
-            last_hash = sh
-            last_date = d
-        else:
-            first_seen = st["first_seen"]
-            times = st["times"] + 1
-            days_since = (d - st["last_date"]).days
-            if sh and sh == st["last_hash"]:
-                sentence_changed = False
-                change_type = "unchanged"
-                changed_count = st["changed_count"]
-            else:
-                sentence_changed = True
-                change_type = "modified"
-                changed_count = st["changed_count"] + 1
-            last_hash = sh or st["last_hash"]
-            last_date = d
-
-        state[key] = {
-            "first_seen": first_seen,
-            "times": times,
-            "last_date": last_date,
-            "last_hash": last_hash,
-            "changed_count": changed_count,
-        }
 
-        # Patch entry file
-        txt = ep.read_text(encoding="utf-8")
-        txt2 = txt
-        txt2 = set_key(txt2, "times_seen_total", str(times))
-        txt2 = set_key(txt2, "first_seen", yq(first_seen.isoformat()))
-        txt2 = set_key(txt2, "days_since_last_seen", "null" if days_since is None else str(days_since))
-        txt2 = set_key(txt2, "sentence_changed", "true" if sentence_changed else "false")
-        txt2 = set_key(txt2, "change_type", yq(change_type))
+def main():
+    TOPICS_DIR.mkdir(exist_ok=True)
+
+    # Load (or bootstrap from the current _topics/) before the pages are deleted,
+    # so existing slugs survive the rebuild.
+    topic_index = TopicIndex.load(topics_dir=TOPICS_DIR)
+
+    # REBUILD_MODE=streaming keeps peak memory flat regardless of ledger size.
+    if os.environ.get("REBUILD_MODE") == "streaming":
+        rc = main_streaming(topic_index)
+        render_changes()
+        build()
+        return rc
+
+    entries = list(iter_entries())
+    entries.sort(key=lambda t: (t[0], t[1]))
 
-        if txt2 != txt:
-            ep.write_text(txt2, encoding="utf-8")
-            patched += 1
+    # Recompute per-topic state
+    state = {}
+    topic_hist = {}  # key -> list of history items
+    jobs = []
+    archived_jobs = {}
+
+    for d, name, fm in entries:
+        key, slug = register_topic(topic_index, fm)
+        sh = change_hash(fm)
+        st = advance(state.get(key), d, sh)
+        state[key] = st
+        if is_archived(name, ENTRIES_DIR):
+            archived_jobs[name] = (st, key, slug)
+        else:
+            jobs.append((ENTRIES_DIR / name, (st, key, slug)))
 
         # Save history item for topic page
-        hist = topic_hist.setdefault(key, [])
-        hist.append(
-            {
-                "date": d.isoformat(),
-                "rank": int(fm.get("rank", "0") or 0),
-                "pageviews": int(fm.get("pageviews", "0") or 0),
-                "lead_sentence": fm.get("lead_sentence") or "",
-                "lead_paragraph": fm.get("lead_paragraph") or fm.get("lead_sentence") or "",
-                "sentence_hash": fm.get("sentence_hash") or "",
-                "paragraph_hash": sh,
-                "change_type": change_type,
-                "source_revision_id": int(fm.get("source_revision_id", "0") or 0),
-                # carry a few useful bits
-                "topic_title": fm.get("topic_title") or fm.get("canonical_title") or "",
-                "topic_page_id": fm.get("topic_page_id"),
-                "wikibase_item": fm.get("wikibase_item"),
-                "topic_url": fm.get("topic_url"),
-                "language": fm.get("language"),
-                "namespace_id": int(fm.get("namespace_id", "0") or 0),
-                "article_type": fm.get("article_type"),
-                "description": fm.get("description"),
-                "description_source": fm.get("description_source"),
-                "canonical_title": fm.get("canonical_title"),
-                "normalized_title": fm.get("normalized_title") or fm.get("topic_title"),
-            }
-        )
+        topic_hist.setdefault(key, []).append(history_item(d, fm, sh, st["change_type"]))
+
+    # Patch entry files (parallel, atomic per file)
+    changed_paths, archived = [], []
+    patched = run_bulk(patch_text, jobs, label="rebuild patch", changed_paths=changed_paths)
+    patched += transform_archives(patch_text, archived_jobs, changed_records=archived)
+    events = [changelog.event("entry_patched", p.name, p.read_bytes(), SOURCE) for p in changed_paths]
+    events += [changelog.event("entry_patched", name, text, SOURCE) for name, text in archived]
 
     # Rebuild topics directory
-    for tp in TOPICS_DIR.glob("*.md"):
-        tp.unlink()
+    before = topic_hashes()
+    clear_topics()
 
     for key, hist in topic_hist.items():
-        # Use last item as metadata source
-        last = hist[-1]
-        slug = slugify(last.get("normalized_title") or last.get("topic_title"))
-        st = state[key]
-
-        out = [
-            "---",
-            yaml_kv("layout", "topic"),
-            yaml_kv("title", last.get("canonical_title") or last.get("topic_title")),
-            yaml_kv("topic_title", last.get("topic_title")),
-            yaml_kv("topic_page_id", last.get("topic_page_id")),
-            yaml_kv("wikibase_item", last.get("wikibase_item")),
-            yaml_kv("topic_url", last.get("topic_url")),
-            yaml_kv("language", last.get("language")),
-            yaml_kv("namespace_id", last.get("namespace_id")),
-            yaml_kv("article_type", last.get("article_type")),
-            yaml_kv("description", last.get("description")),
-            yaml_kv("description_source", last.get("description_source")),
-            yaml_kv("canonical_title", last.get("canonical_title")),
-            yaml_kv("normalized_title", last.get("normalized_title")),
-            yaml_kv("times_seen_total", st["times"]),
-            yaml_kv("sentence_changed_count", st["changed_count"]),
-            "sentence_history:",
-        ]
-        for item in hist:
-            out.append(f"  - date: {yq(item['date'])}")
-            out.append(f"    rank: {int(item['rank'])}")
-            out.append(f"    pageviews: {int(item['pageviews'])}")
-            out.append(f"    lead_sentence: {yq(item['lead_sentence'])}")
-            out.append(f"    lead_paragraph: {yq(item.get('lead_paragraph') or item['lead_sentence'])}")
-            out.append(f"    sentence_hash: {yq(item['sentence_hash'])}")
-            out.append(f"    paragraph_hash: {yq(item['sentence_hash'])}")
-            out.append(f"    change_type: {yq(item['change_type'])}")
-            out.append(f"    source_revision_id: {int(item['source_revision_id'])}")
-        out += ["---", ""]
-
-        (TOPICS_DIR / f"{slug}.md").write_text("\n".join(out), encoding="utf-8")
+        write_topic(TOPICS_DIR / f"{topic_index.slug_for(key)}.md", key, state[key], hist)
+
+    topic_index.save()
+    changelog.append(events + topic_events(before))
+    render_changes()
+    build()
 
     print(f"OK patched_entries={patched} topics={len(topic_hist)}")
 
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Weighted sampling without replacement, shared by daily_run.py and
+generate_daily_brief.py.
+
+Methods for weighted_sample_without_replacement():
+
+- "compat"   the original loop: one rng.random() per pick, a linear scan
+             over the remaining weights. O(k·n); reproduces every seeded
+             pick made so far, so it stays the default for the brief.
+- "fenwick"  same draw sequence and distribution, but prefix sums live in a
+             Fenwick (binary indexed) tree: O(n) build, O(log n) per pick
+             and removal. Picks match "compat" except when a draw lands
+             within float rounding of a boundary.
+- "es"       Efraimidis–Spirakis: key = log(u) / w per item, keep the k
+             largest. One pass, O(n log k), one rng.random() per item.
+
+Items of weight 0 are never picked, so every method returns
+min(k, number of positive weights) distinct items.
+
+stratified_sample() splits k across strata (e.g. domain) in proportion to
+their total weight (largest remainder, capped by stratum size) and samples
+each stratum with the chosen method.
+
+Usage:
+  python scripts/sampling.py [N] [K]   # time the methods on a synthetic 1/rank pool
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import random
+import sys
+import time
+
+METHODS = ("compat", "fenwick", "es")
+
+
+class FenwickTree:
+    """Prefix sums over non-negative weights with point updates and weighted search."""
+
+    def __init__(self, weights):
+        self.n = len(weights)
+        self.tree = [0.0] + [float(w) for w in weights]
+        for i in range(1, self.n + 1):
+            j = i + (i & -i)
+            if j <= self.n:
+                self.tree[j] += self.tree[i]
+        self.total = math.fsum(weights)
+
+    def add(self, i: int, delta: float) -> None:
+        self.total += delta
+        i += 1
+        while i <= self.n:
+            self.tree[i] += delta
+            i += i & -i
+
+    def find(self, r: float) -> int:
+        """Smallest index whose prefix sum is >= r (the index a linear scan would stop at)."""
+        pos = 0
+        step = 1 << self.n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.n and self.tree[nxt] < r:
+                pos = nxt
+                r -= self.tree[nxt]
+            step >>= 1
+        return min(pos, self.n - 1)
+
+
+def _compat(pop, weights, k, rng):
+    chosen = []
+    pool = list(pop)
+    w = list(weights)
+    for _ in range(min(k, sum(1 for wi in w if wi > 0))):
+        total = sum(w)
+        r = rng.random() * total
+        acc = 0.0
+        idx = 0
+        for i, wi in enumerate(w):
+            acc += wi
+            if acc >= r and wi > 0:
+                idx = i
+                break
+        chosen.append(pool.pop(idx))
+        w.pop(idx)
+    return chosen
+
+
+def _fenwick(pop, weights, k, rng):
+    pool = list(pop)
+    w = [float(x) for x in weights]
+    tree = FenwickTree(w)
+    chosen = []
+    for _ in range(min(k, sum(1 for x in w if x > 0))):
+        idx = tree.find(rng.random() * tree.total)
+        # Rounding (or r == 0) can land on a zero or removed slot; step to the nearest live one.
+        while w[idx] == 0.0 and idx + 1 < len(w):
+            idx += 1
+        while w[idx] == 0.0 and idx > 0:
+            idx -= 1
+        chosen.append(pool[idx])
+        tree.add(idx, -w[idx])
+        w[idx] = 0.0
+    return chosen
+
+
+def _es(pop, weights, k, rng):
+    keyed = []
+    for item, w in zip(pop, weights):
+        if w > 0:
+            keyed.append((math.log(1.0 - rng.random()) / w, len(keyed), item))
+    return [item for _key, _i, item in heapq.nlargest(k, keyed)]
+
+
+_IMPL = {"compat": _compat, "fenwick": _fenwick, "es": _es}
+
+
+def weighted_sample_without_replacement(pop, weights, k, rng: random.Random, method: str = "compat"):
+    if method not in _IMPL:
+        raise ValueError(f"unknown sampling method {method!r}")
+    return _IMPL[method](pop, weights, k, rng)
+
+
+def allocate(totals: dict, sizes: dict, k: int) -> dict:
+    """Split k draws across strata in proportion to `totals`, never more than a stratum's size.
+
+    Largest-remainder rounding; draws a full stratum cannot take are shared
+    out again among the rest.
+    """
+    quota = {s: 0 for s in totals}
+    left = min(k, sum(sizes[s] for s in totals if totals[s] > 0))
+    while left:
+        open_ = [s for s in totals if totals[s] > 0 and quota[s] < sizes[s]]
+        mass = math.fsum(totals[s] for s in open_)
+        shares = {s: left * totals[s] / mass for s in open_}
+        for s in open_:
+            n = min(int(shares[s]), sizes[s] - quota[s])
+            quota[s] += n
+            left -= n
+        for s in sorted(open_, key=lambda s: (shares[s] - int(shares[s]), totals[s]), reverse=True):
+            if not left:
+                break
+            if quota[s] < sizes[s]:
+                quota[s] += 1
+                left -= 1
+    return quota
+
+
+def stratified_sample(pop, weights, strata, k, rng: random.Random, method: str = "es"):
+    """Sample k items so each stratum gets a share proportional to its weight.
+
+    `strata` gives each item's stratum label (e.g. its domain). Results are
+    grouped by stratum, heaviest first.
+    """
+    groups: dict = {}
+    for item, w, s in zip(pop, weights, strata):
+        g = groups.setdefault(s, ([], []))
+        g[0].append(item)
+        g[1].append(w)
+    totals = {s: math.fsum(g[1]) for s, g in groups.items()}
+    quota = allocate(totals, {s: sum(1 for w in g[1] if w > 0) for s, g in groups.items()}, k)
+    out = []
+    for s in sorted(groups, key=lambda s: totals[s], reverse=True):
+        if quota[s]:
+            out.extend(weighted_sample_without_replacement(groups[s][0], groups[s][1], quota[s], rng, method))
+    return out
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    n = int(argv[0]) if argv else 1000
+    k = int(argv[1]) if len(argv) > 1 else 100
+    pop = list(range(n))
+    weights = [1.0 / (i + 1) for i in pop]
+    picks = {}
+    for method in METHODS:
+        t0 = time.perf_counter()
+        picks[method] = weighted_sample_without_replacement(pop, weights, k, random.Random(20260301), method)
+        print(f"{method:<8} {(time.perf_counter() - t0) * 1000:9.2f} ms")
+    same = picks["compat"] == picks["fenwick"]
+    print(f"OK sampling n={n} k={k} fenwick_matches_compat={str(same).lower()}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
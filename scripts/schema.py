@@ -0,0 +1,11 @@
+#!/usr/bin/env python3
+"""Entry schema version written into new entries' front matter.
+
+migrations.py registers one migration per version and checks that its last
+one matches SCHEMA_VERSION; this module only holds the number so writers
+(daily_run.py) can stamp entries without importing the migration runner.
+
+No external dependencies.
+"""
+
+SCHEMA_VERSION = 3
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Lead-paragraph and first-sentence extraction shared by daily_run.py and
+generate_daily_brief.py.
+
+first_declarative() makes one left-to-right pass over the paragraph with a
+single precompiled pattern that matches brackets and candidate terminators
+(`.`, `!`, `?` plus closing quotes, followed by whitespace or the end). A
+terminator ends the sentence only when all of these hold:
+
+- it is outside parentheses/brackets: "Vidaamuyarchi (transl. Perseverance) is ..."
+- the token before it is not a known abbreviation ("Jr.", "Inc.", "vs.", "c.")
+  or a single-letter initial ("Neal H. Moritz")
+- the token is not a dotted acronym ("U.S.", "e.g.")
+- the next word does not start with a lowercase letter
+- the sentence is at least MIN_LENGTH characters and contains a letter
+
+Decimals ("3.5") never match because a terminator must be followed by
+whitespace, and the end of the text always ends a sentence. If brackets
+never close (a truncated extract), the first terminator that only the
+bracket rule rejected is used.
+
+Usage:
+  python scripts/sentences.py        # re-segment stored lead paragraphs, report differences
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import re
+
+MIN_LENGTH = 20
+
+ABBREVIATIONS = frozenset(
+    """
+    jr sr mr mrs ms dr st mt ft fr rev gen col lt sgt capt gov sen rep pres prof hon
+    inc ltd co corp bros assn dept univ
+    vs v no nos vol vols pp ch fig ed eds op
+    c ca fl b d r m approx est lit transl trans abbr var pl sing
+    jan feb mar apr jun jul aug sep sept oct nov dec
+    """.split()
+)
+
+# Brackets, or a terminator (with trailing quotes/brackets) followed by whitespace or end.
+_SCAN = re.compile(r"[(\[]|[)\]]|[.!?][\"'”’)\]]*(?=\s|$)")
+_WS = re.compile(r"\s+")
+_TOKEN_BEFORE = re.compile(r"(\S+)$")
+_PARA_SPLIT = re.compile(r"\n\s*\n")
+_HAS_LETTER = re.compile(r"[^\W\d_]")
+
+
+def first_paragraph(extract: str) -> str:
+    raw = (extract or "").strip()
+    if not raw:
+        return ""
+    para = _PARA_SPLIT.split(raw, 1)[0]
+    para = para.split("\n", 1)[0]
+    return _WS.sub(" ", para).strip()
+
+
+def _blocks_boundary(text: str, start: int, end: int) -> bool:
+    """True when the terminator at text[start:end] belongs to an abbreviation, initial or acronym."""
+    if text[start] != "." or end == len(text):
+        return False
+    m = _TOKEN_BEFORE.search(text, 0, start)
+    token = m.group(1).lstrip("(\"'“‘[") if m else ""
+    if not token:
+        return False
+    if token.lower() in ABBREVIATIONS:
+        return True
+    if len(token) == 1 and token.isupper():
+        return True
+    # U.S. / e.g. / Ph.D.
+    return "." in token
+
+
+def _next_is_lower(text: str, end: int) -> bool:
+    nxt = text[end:end + 2].lstrip()[:1]
+    return nxt.islower()
+
+
+def first_declarative(paragraph: str) -> str | None:
+    """First sentence of at least MIN_LENGTH characters (shorter leading fragments are kept as a prefix)."""
+    text = _WS.sub(" ", (paragraph or "").strip())
+    depth = 0
+    fallback = None
+    for m in _SCAN.finditer(text):
+        ch = m.group()
+        if ch in "([":
+            depth += 1
+            continue
+        if ch in ")]":
+            depth = max(0, depth - 1)
+            continue
+        # A terminator may swallow a closing bracket ("...end.)").
+        depth = max(0, depth - ch.count(")") - ch.count("]"))
+        if _blocks_boundary(text, m.start(), m.end()) or _next_is_lower(text, m.end()):
+            continue
+        sent = text[: m.end()]
+        if len(sent) < MIN_LENGTH or not _HAS_LETTER.search(sent):
+            continue
+        if depth == 0:
+            return sent
+        if fallback is None:
+            fallback = sent
+    return fallback
+
+
+def main(argv=None):
+    from entry_archive import iter_fronts
+    from wiki_config import collection_dir
+
+    n = changed = 0
+    for name, fm in iter_fronts(collection_dir("_entries")):
+        para, old = fm.get("lead_paragraph") or "", fm.get("lead_sentence") or ""
+        if not para:
+            continue
+        n += 1
+        new = first_declarative(para)
+        if new != old:
+            changed += 1
+            print(f"{name}: {old!r} -> {new!r}")
+    print(f"OK sentences checked={n} differ={changed}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
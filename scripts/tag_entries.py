@@ -7,15 +7,37 @@ Adds/updates front matter keys:
 - tags (1–4 tags)
 - tags_version
 
+Files are processed in parallel via bulk_runner (BULK_WORKERS=<n> to override);
+archived years are rewritten in place through entry_archive. Each retagged
+entry is recorded as a tags_changed event in the changelog.
+
+entity_type / domain come from Wikidata P31/P106 facts where the entry's
+wikibase_item maps to a known class (wikidata_enrich.py; only QIDs missing
+from its cache are fetched, --offline uses the cache alone) and from the
+regex heuristics otherwise.
+
+Entries missing tags at TAGS_VERSION are also brought up to date by
+migrations.py (migration "tags"); this script re-tags every entry, e.g.
+after the Wikidata cache or the heuristics changed.
+
 No external dependencies.
 """
 
 from __future__ import annotations
 
 import re
+import sys
 from pathlib import Path
 
-ENTRIES_DIR = Path("_entries")
+import changelog
+import wikidata_enrich
+from archive_pages import render_changes
+from build_api import build_changes
+from bulk_runner import run_bulk
+from entry_archive import iter_fronts, transform_archives
+from wiki_config import collection_dir
+
+ENTRIES_DIR = collection_dir("_entries")
 TAGS_VERSION = "v1"
 
 
@@ -41,7 +63,8 @@ def read_front(path: Path) -> tuple[dict, list[str]]:
     return fm, rest
 
 
-def classify(title: str, desc: str, lead: str):
+def classify(title: str, desc: str, lead: str, wikidata: tuple | None = None):
+    """Regex heuristics; (entity_type, domain) from Wikidata facts override them where known."""
     title = title or ""
     desc = desc or ""
     lead = lead or ""
@@ -83,6 +106,10 @@ def classify(title: str, desc: str, lead: str):
     else:
         domain = "news"
 
+    if wikidata:
+        entity = wikidata[0] or entity
+        domain = wikidata[1] or domain
+
     # Secondary tags (0–2), keep total <= 4
     extra = []
     if re.search(r"\b(court|trial|judge|lawsuit|indictment|doj|fbi)\b", text):
@@ -121,41 +148,65 @@ def upsert_front_matter(path: Path, key: str, value: str, raw_text: str) -> str:
     return head + tail
 
 
-def main():
-    changed = 0
-    for p in ENTRIES_DIR.glob("*.md"):
-        txt = p.read_text(encoding="utf-8")
-        fm = {}
-        if txt.startswith("---"):
-            for line in txt.split("---", 2)[1].splitlines():
-                if ": " in line:
-                    k, v = line.split(": ", 1)
-                    fm[k.strip()] = v.strip().strip('"')
-        title = fm.get("topic_title", "")
-        desc = fm.get("description", "")
-        lead = fm.get("lead_sentence", "")
-
-        entity, domain, tags = classify(title, desc, lead)
-
-        new = txt
-        new = upsert_front_matter(p, "entity_type", entity, new)
-        new = upsert_front_matter(p, "domain", domain, new)
-        # YAML list for tags (1–4 values)
-        if re.search(r"^tags:\s*$", new, flags=re.M):
-            pass
-        elif re.search(r"^tags:\s*\[.*\]\s*$", new, flags=re.M):
-            new = re.sub(r"^tags:\s*\[.*\]\s*$", "tags: [" + ", ".join('"'+t+'"' for t in tags) + "]", new, flags=re.M)
-        else:
-            # insert as inline list
-            new = upsert_front_matter(p, "tags", "[" + ", ".join(tags) + "]", new)
-            # upsert_front_matter quotes the whole value; fix to raw YAML list
-            new = re.sub(r"^tags: \"\[(.*)\]\"$", r"tags: [\1]", new, flags=re.M)
-
-        new = upsert_front_matter(p, "tags_version", TAGS_VERSION, new)
-
-        if new != txt:
-            p.write_text(new, encoding="utf-8")
-            changed += 1
+def tag_text(txt: str, wikidata=None) -> str:
+    fm = {}
+    if txt.startswith("---"):
+        for line in txt.split("---", 2)[1].splitlines():
+            if ": " in line:
+                k, v = line.split(": ", 1)
+                fm[k.strip()] = v.strip().strip('"')
+    title = fm.get("topic_title", "")
+    desc = fm.get("description", "")
+    lead = fm.get("lead_sentence", "")
+
+    entity, domain, tags = classify(title, desc, lead, wikidata)
+
+    new = txt
+    new = upsert_front_matter(None, "entity_type", entity, new)
+    new = upsert_front_matter(None, "domain", domain, new)
+    # YAML list for tags (1–4 values)
+    if re.search(r"^tags:\s*$", new, flags=re.M):
+        pass
+    elif re.search(r"^tags:\s*\[.*\]\s*$", new, flags=re.M):
+        new = re.sub(r"^tags:\s*\[.*\]\s*$", "tags: [" + ", ".join('"'+t+'"' for t in tags) + "]", new, flags=re.M)
+    else:
+        # insert as inline list
+        new = upsert_front_matter(None, "tags", "[" + ", ".join(tags) + "]", new)
+        # upsert_front_matter quotes the whole value; fix to raw YAML list
+        new = re.sub(r"^tags: \"\[(.*)\]\"$", r"tags: [\1]", new, flags=re.M)
+
+    new = upsert_front_matter(None, "tags_version", TAGS_VERSION, new)
+    return new
+
+
+def wikidata_tags(offline: bool = False) -> dict[str, tuple]:
+    """Entry name -> (entity_type, domain) from the Wikidata cache, resolving new QIDs first unless offline."""
+    qid_by_name = {name: fm.get("wikibase_item") for name, fm in iter_fronts(ENTRIES_DIR)}
+    cache = wikidata_enrich.load_cache()
+    if not offline:
+        from http_transport import make_session
+
+        try:
+            cache, n = wikidata_enrich.ensure(make_session(wikidata_enrich.USER_AGENT), qid_by_name.values())
+            print(f"wikidata: requests={n}", file=sys.stderr)
+        except RuntimeError as e:
+            print(f"WARN wikidata unavailable, using cache only: {e}", file=sys.stderr)
+    return {name: wikidata_enrich.tags_for(cache.get(q)) for name, q in qid_by_name.items()}
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    wd = wikidata_tags(offline="--offline" in argv)
+    jobs = [(p, wd.get(p.name)) for p in ENTRIES_DIR.glob("*.md")]
+    changed_paths, archived = [], []
+    changed = run_bulk(tag_text, jobs, label="tag_entries", changed_paths=changed_paths)
+    changed += transform_archives(tag_text, wd, changed_records=archived)
+    changelog.append(
+        [changelog.event("tags_changed", p.name, p.read_bytes(), "tag_entries") for p in changed_paths]
+        + [changelog.event("tags_changed", name, text, "tag_entries") for name, text in archived]
+    )
+    render_changes()
+    build_changes()
 
     print("tagged", changed)
 
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""Persistent topic identity index.
+
+Topics used to be identified by `normalized_title.lower()` (rebuild) or by
+`slugify(normalized_title)` (daily ingestion). A page rename split one topic's
+history in two, and two titles that slugify the same way were merged into one
+file. This index gives every topic a stable key and a stable file slug:
+
+- key: `<language>:<page_id>` (falls back to the Wikidata item, then the title)
+- by_page_id / by_wikibase_item: O(1) lookups to the key
+- aliases: lowercased titles and redirect titles seen for the topic
+- slugs: slug -> key ownership; collisions get a suffixed slug and are recorded
+  under `collisions`
+
+The index lives in _state/topic_index.json. If it is missing it is bootstrapped
+from the existing _topics/*.md pages so current file names are kept.
+
+Usage: python scripts/topic_index.py   (rebuild the index from _topics/)
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from pathlib import Path
+
+from wiki_config import STATE_DIR, collection_dir
+
+TOPICS_DIR = collection_dir("_topics")
+INDEX_PATH = STATE_DIR / "topic_index.json"
+INDEX_VERSION = 1
+
+
+def slugify(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (s or "").lower()).strip("-") or "topic"
+
+
+def read_front(path: Path) -> dict:
+    lines = path.read_text(encoding="utf-8").splitlines()
+    fm = {}
+    if not lines or lines[0].strip() != "---":
+        return fm
+    for line in lines[1:]:
+        if line.strip() == "---":
+            break
+        if line.startswith(" "):
+            continue
+        if ": " in line:
+            k, v = line.split(": ", 1)
+            v = v.strip()
+            if v.startswith('"') and v.endswith('"'):
+                v = v[1:-1].replace('\\"', '"').replace('\\\\', "\\")
+            fm[k.strip()] = v
+    return fm
+
+
+def _clean(v) -> str:
+    v = "" if v is None else str(v).strip()
+    return "" if v in ("null", "None") else v
+
+
+def title_alias(title: str) -> str:
+    return re.sub(r"[\s_]+", " ", title or "").strip().lower()
+
+
+def topic_key(language: str, page_id=None, wikibase_item=None, title: str = "") -> str:
+    language = _clean(language) or "en"
+    pid = _clean(page_id)
+    if pid.isdigit():
+        return f"{language}:{int(pid)}"
+    qid = _clean(wikibase_item)
+    if qid:
+        return f"{language}:{qid}"
+    return f"{language}:title:{title_alias(title)}"
+
+
+class TopicIndex:
+    def __init__(self, data: dict | None = None):
+        data = data or {}
+        self.topics: dict[str, dict] = data.get("topics", {})
+        self.by_page_id: dict[str, str] = data.get("by_page_id", {})
+        self.by_wikibase_item: dict[str, str] = data.get("by_wikibase_item", {})
+        self.aliases: dict[str, str] = data.get("aliases", {})
+        self.slugs: dict[str, str] = data.get("slugs", {})
+        self.collisions: dict[str, list[str]] = data.get("collisions", {})
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path = INDEX_PATH, topics_dir: Path = TOPICS_DIR) -> "TopicIndex":
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == INDEX_VERSION:
+                return cls(data)
+        return cls.from_topics(topics_dir)
+
+    @classmethod
+    def from_topics(cls, topics_dir: Path = TOPICS_DIR) -> "TopicIndex":
+        idx = cls()
+        for tp in sorted(topics_dir.glob("*.md")):
+            fm = read_front(tp)
+            titles = [fm.get("normalized_title"), fm.get("canonical_title"), fm.get("topic_title")]
+            idx.register(
+                language=fm.get("language"),
+                page_id=fm.get("topic_page_id"),
+                wikibase_item=fm.get("wikibase_item"),
+                titles=titles,
+                slug=tp.stem,
+            )
+        return idx
+
+    def save(self, path: Path = INDEX_PATH) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "version": INDEX_VERSION,
+            "topics": self.topics,
+            "by_page_id": self.by_page_id,
+            "by_wikibase_item": self.by_wikibase_item,
+            "aliases": self.aliases,
+            "slugs": self.slugs,
+            "collisions": self.collisions,
+        }
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, indent=1, sort_keys=True, ensure_ascii=False) + "\n", encoding="utf-8")
+        tmp.replace(path)
+        self.dirty = False
+
+    def resolve(self, language=None, page_id=None, wikibase_item=None, titles=()) -> str | None:
+        """Return the existing key for a topic, or None. Each probe is a dict lookup."""
+        language = _clean(language) or "en"
+        pid = _clean(page_id)
+        if pid:
+            key = self.by_page_id.get(f"{language}:{pid}")
+            if key:
+                return key
+        qid = _clean(wikibase_item)
+        if qid:
+            key = self.by_wikibase_item.get(f"{language}:{qid}")
+            if key:
+                return key
+        for t in titles:
+            alias = title_alias(_clean(t))
+            if not alias:
+                continue
+            key = self.aliases.get(f"{language}:{alias}")
+            if key is None:
+                continue
+            # A title that now belongs to a different page (e.g. after a page move)
+            # must not pull this topic into the old page's history.
+            known = self.topics.get(key, {}).get("page_id")
+            if pid and known and str(known) != pid:
+                continue
+            return key
+        return None
+
+    def register(self, *, language=None, page_id=None, wikibase_item=None, titles=(), slug: str | None = None) -> tuple[str, str]:
+        """Resolve or create the topic and record every identifier we saw. Returns (key, slug)."""
+        language = _clean(language) or "en"
+        pid = _clean(page_id)
+        qid = _clean(wikibase_item)
+        titles = [_clean(t) for t in titles if _clean(t)]
+
+        key = self.resolve(language, pid, qid, titles)
+        if key is None:
+            key = topic_key(language, pid, qid, titles[0] if titles else "")
+        rec = self.topics.get(key)
+        if rec is None:
+            rec = {"slug": None, "page_id": None, "wikibase_item": None, "title": titles[0] if titles else ""}
+            self.topics[key] = rec
+            self.dirty = True
+
+        if pid and rec.get("page_id") != pid:
+            rec["page_id"] = pid
+            self.dirty = True
+        if qid and rec.get("wikibase_item") != qid:
+            rec["wikibase_item"] = qid
+            self.dirty = True
+        if titles and rec.get("title") != titles[0]:
+            rec["title"] = titles[0]
+            self.dirty = True
+
+        if pid:
+            self._set(self.by_page_id, f"{language}:{pid}", key)
+        if qid:
+            self._set(self.by_wikibase_item, f"{language}:{qid}", key)
+        for t in titles:
+            self._set(self.aliases, f"{language}:{title_alias(t)}", key)
+
+        if not rec.get("slug"):
+            rec["slug"] = self._claim_slug(key, slug or slugify(titles[0] if titles else ""), pid or qid)
+            self.dirty = True
+        return key, rec["slug"]
+
+    def slug_for(self, key: str) -> str | None:
+        rec = self.topics.get(key)
+        return rec.get("slug") if rec else None
+
+    def _set(self, table: dict, k: str, v: str) -> None:
+        if table.get(k) != v:
+            table[k] = v
+            self.dirty = True
+
+    def _claim_slug(self, key: str, base: str, suffix: str) -> str:
+        owner = self.slugs.get(base)
+        if owner is None or owner == key:
+            self.slugs[base] = key
+            return base
+        clashes = self.collisions.setdefault(base, [owner])
+        if key not in clashes:
+            clashes.append(key)
+        cand = f"{base}-{slugify(suffix)}" if suffix else f"{base}-{len(clashes)}"
+        n = 2
+        while cand in self.slugs and self.slugs[cand] != key:
+            cand = f"{base}-{len(clashes)}-{n}"
+            n += 1
+        self.slugs[cand] = key
+        return cand
+
+
+def main():
+    idx = TopicIndex.from_topics(TOPICS_DIR)
+    idx.save(INDEX_PATH)
+    print(f"OK topics={len(idx.topics)} collisions={len(idx.collisions)}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Segmented topic pages.
+
+A topic is written as:
+
+- _topics/<slug>.md: a small summary page (identity, counters, first_seen, and
+  the most recent RECENT_ITEMS history items under `sentence_history`)
+- _topic_history/<slug>--p<n>.md: the full history in fixed-size segments of
+  SEGMENT_SIZE items, oldest first
+
+The summary page lists its segments (`history_pages`), so page weight, Jekyll
+front-matter parsing and diff.js work stay bounded per request. Appending a
+day only rewrites the summary page and the last segment.
+
+Shared by daily_run.py (append) and rebuild_topics_and_entry_flags.py (full
+write). No external dependencies.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+from wiki_config import WIKI_PATH, collection_dir
+
+TOPICS_DIR = collection_dir("_topics")
+HISTORY_DIR = collection_dir("_topic_history")
+SEGMENT_SIZE = 50
+RECENT_ITEMS = 10
+
+ITEM_FIELDS = (
+    "date",
+    "rank",
+    "pageviews",
+    "lead_sentence",
+    "lead_paragraph",
+    "sentence_hash",
+    "paragraph_hash",
+    "change_type",
+    "source_revision_id",
+)
+INT_ITEM_FIELDS = {"rank", "pageviews", "source_revision_id"}
+
+
+def yq(s):
+    if s is None:
+        return "null"
+    s = str(s).replace("\\", "\\\\").replace('"', "\\\"")
+    return '"' + s + '"'
+
+
+def yaml_kv(k, v):
+    if isinstance(v, bool):
+        return f"{k}: {'true' if v else 'false'}"
+    if isinstance(v, (int, float)):
+        return f"{k}: {v}"
+    if v is None:
+        return f"{k}: null"
+    return f"{k}: {yq(v)}"
+
+
+def _unquote(v: str) -> str:
+    v = v.strip()
+    if v.startswith('"') and v.endswith('"') and len(v) >= 2:
+        v = v[1:-1].replace('\\"', '"').replace('\\\\', "\\")
+    return v
+
+
+def history_lines(items: list[dict]) -> list[str]:
+    out = ["sentence_history:"]
+    for item in items:
+        prefix = "  - "
+        for k in ITEM_FIELDS:
+            if k not in item:
+                continue
+            v = int(item[k] or 0) if k in INT_ITEM_FIELDS else yq(item[k])
+            out.append(f"{prefix}{k}: {v}")
+            prefix = "    "
+    return out
+
+
+def parse_history(path: Path) -> list[dict]:
+    """Read `sentence_history` items from a topic summary page or segment."""
+    hist = []
+    in_hist = False
+    current = None
+    for line in path.read_text(encoding="utf-8").splitlines():
+        if line.strip() == "sentence_history:":
+            in_hist = True
+            continue
+        if not in_hist:
+            continue
+        if line.strip() == "---" or not line.startswith("  "):
+            break
+        if line.startswith("  - "):
+            current = {}
+            hist.append(current)
+            line = line[4:]
+        if current is not None and ": " in line:
+            k, v = line.strip().split(": ", 1)
+            current[k] = _unquote(v)
+    return hist
+
+
+def segment_name(slug: str, n: int) -> str:
+    return f"{slug}--p{n}"
+
+
+def segment_count(total: int) -> int:
+    return (total + SEGMENT_SIZE - 1) // SEGMENT_SIZE
+
+
+def _write_segment(slug: str, n: int, meta: dict, items: list[dict], history_dir: Path) -> None:
+    out = [
+        "---",
+        yaml_kv("layout", "topic_history"),
+        yaml_kv("title", f"{meta.get('topic_title') or meta.get('title')} — history {n}"),
+        yaml_kv("topic_title", meta.get("topic_title")),
+        yaml_kv("topic_slug", slug),
+        yaml_kv("page_number", n),
+        yaml_kv("segment_start", items[0]["date"]),
+        yaml_kv("segment_end", items[-1]["date"]),
+    ]
+    if WIKI_PATH:
+        out.append(yaml_kv("wiki_path", WIKI_PATH))
+    out += history_lines(items)
+    out += ["---", ""]
+    history_dir.mkdir(exist_ok=True)
+    (history_dir / f"{segment_name(slug, n)}.md").write_text("\n".join(out), encoding="utf-8")
+
+
+def write_summary(path: Path, meta_lines: list[str], *, slug: str, first_seen: str, hist_tail: list[dict], total: int) -> None:
+    """meta_lines: the topic's identity/counter front-matter lines (after `---`, before history)."""
+    pages = segment_count(total)
+    out = ["---"] + meta_lines + [
+        yaml_kv("topic_slug", slug),
+        yaml_kv("first_seen", first_seen),
+        yaml_kv("history_pages", pages),
+        "history_segments: [" + ", ".join(yq(segment_name(slug, n)) for n in range(1, pages + 1)) + "]",
+    ]
+    if WIKI_PATH:
+        out.append(yaml_kv("wiki_path", WIKI_PATH))
+    out += history_lines(hist_tail[-RECENT_ITEMS:])
+    out += ["---", ""]
+    path.write_text("\n".join(out), encoding="utf-8")
+
+
+def write_segments(slug: str, meta: dict, hist: list[dict], history_dir: Path = HISTORY_DIR) -> None:
+    """Write every segment of a topic from its full history and drop stale ones."""
+    pages = segment_count(len(hist))
+    for n in range(1, pages + 1):
+        _write_segment(slug, n, meta, hist[(n - 1) * SEGMENT_SIZE:n * SEGMENT_SIZE], history_dir)
+    n = pages + 1
+    while (history_dir / f"{segment_name(slug, n)}.md").exists():
+        (history_dir / f"{segment_name(slug, n)}.md").unlink()
+        n += 1
+
+
+def append_segment(slug: str, meta: dict, item: dict, total_before: int, history_dir: Path = HISTORY_DIR) -> None:
+    """Append one item; only the last (or a new) segment is read and rewritten."""
+    n = total_before // SEGMENT_SIZE + 1
+    path = history_dir / f"{segment_name(slug, n)}.md"
+    items = parse_history(path) if path.exists() else []
+    items.append(item)
+    _write_segment(slug, n, meta, items, history_dir)
+
+
+def clear_history(history_dir: Path = HISTORY_DIR) -> None:
+    for p in history_dir.glob("*.md"):
+        p.unlink()
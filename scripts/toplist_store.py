@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Compact on-disk store of daily Wikimedia top lists.
+
+Each fetched top list is kept as _state/toplists/<wiki>/<YYYY-MM-DD>.json.gz
+(<wiki> is wiki_config.WIKI_KEY, e.g. en.wikipedia), so derived stages
+(co-occurrence graph, period aggregates) can replay past days without
+re-downloading. Older files hold compact `[article, rank, views]` rows;
+save_raw() stores the API response body as received, and load_top() reads
+both.
+
+The fetchers only need the first ~100 normal articles of a ~1000-article
+list, so iter_articles() decodes the `articles` array one object at a time
+and top_candidates() stops as soon as the quota is met; that is the only
+decode of the body. The body itself is still transferred in full, since it
+is archived as-is once per day.
+
+Completeness is checked structurally, never by parsing: the transport
+rejects bodies shorter than their Content-Length or with a cut gzip stream
+(and retries them), iter_articles() raises unless the array reaches its
+closing `]`, and check_raw(), run by save_raw() only, requires the articles
+array and the closing `]}]}` of the document before anything is archived.
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import gzip
+import itertools
+import json
+import re
+from pathlib import Path
+
+from wiki_config import WIKI_KEY
+
+TOPLISTS_DIR = Path("_state/toplists")
+DEFAULT_WIKI = WIKI_KEY
+
+_ARTICLES = re.compile(r'"articles"\s*:\s*\[')
+_ARTICLES_B = re.compile(rb'"articles"\s*:\s*\[')
+_END = re.compile(rb"\]\s*\}\s*\]\s*\}\s*$")
+_SEP = re.compile(r"[\s,]*")
+_DECODER = json.JSONDecoder()
+
+
+def toplist_path(day: _dt.date, wiki: str = DEFAULT_WIKI, root: Path = TOPLISTS_DIR) -> Path:
+    return root / wiki / f"{day.isoformat()}.json.gz"
+
+
+def save_top(day: _dt.date, articles: list[dict], wiki: str = DEFAULT_WIKI, root: Path = TOPLISTS_DIR) -> Path:
+    path = toplist_path(day, wiki, root)
+    if path.exists():
+        return path
+    rows = [[a.get("article", ""), int(a.get("rank", 0)), int(a.get("views", 0))] for a in articles]
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(gzip.compress(json.dumps(rows, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), mtime=0))
+    tmp.replace(path)
+    return path
+
+
+def check_raw(raw: bytes) -> None:
+    """Raise ValueError unless `raw` looks like a complete top-list response.
+
+    Structural and O(1): the articles array must open near the start and the
+    document must end by closing it (`]}]}`), so a body cut short anywhere is
+    refused. Nothing is decoded.
+    """
+    if _ARTICLES_B.search(raw, 0, 4096) is None:
+        raise ValueError("top-list payload has no articles array")
+    if _END.search(raw[-64:]) is None:
+        raise ValueError("top-list payload does not end with the articles array")
+
+
+def save_raw(day: _dt.date, raw: bytes, wiki: str = DEFAULT_WIKI, root: Path = TOPLISTS_DIR) -> Path:
+    """Archive a top-list response body as-is (first write wins, like save_top).
+
+    Raises ValueError for a body check_raw() rejects; nothing is written.
+    """
+    path = toplist_path(day, wiki, root)
+    if path.exists():
+        return path
+    check_raw(raw)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(gzip.compress(raw, mtime=0))
+    tmp.replace(path)
+    return path
+
+
+def iter_articles(raw: bytes | str):
+    """Yield the article objects of a top-list response, decoding each only when it is asked for."""
+    text = raw.decode("utf-8") if isinstance(raw, bytes) else raw
+    m = _ARTICLES.search(text)
+    if m is None:
+        raise ValueError("top-list payload has no articles array")
+    pos = m.end()
+    while True:
+        pos = _SEP.match(text, pos).end()
+        if pos >= len(text):
+            raise ValueError("top-list payload ends inside the articles array")
+        if text[pos] == "]":
+            return
+        obj, pos = _DECODER.raw_decode(text, pos)
+        yield obj
+
+
+def top_candidates(raw: bytes | str, keep, quota: int = 100) -> list[dict]:
+    """The first `quota` articles whose title passes `keep`; the rest of the payload is never decoded."""
+    return list(itertools.islice((a for a in iter_articles(raw) if keep(a.get("article", ""))), quota))
+
+
+def load_top(day: _dt.date, wiki: str = DEFAULT_WIKI, root: Path = TOPLISTS_DIR) -> list[dict] | None:
+    path = toplist_path(day, wiki, root)
+    if not path.exists():
+        return None
+    rows = json.loads(gzip.decompress(path.read_bytes()))
+    if isinstance(rows, dict):
+        return [{"article": a.get("article", ""), "rank": int(a.get("rank", 0)), "views": int(a.get("views", 0))}
+                for a in rows["items"][0]["articles"]]
+    return [{"article": a, "rank": r, "views": v} for a, r, v in rows]
+
+
+def stored_days(wiki: str = DEFAULT_WIKI, root: Path = TOPLISTS_DIR) -> list[_dt.date]:
+    days = []
+    for p in (root / wiki).glob("*.json.gz"):
+        try:
+            days.append(_dt.date.fromisoformat(p.name[:10]))
+        except ValueError:
+            continue
+    return sorted(days)
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""Which wiki a process ingests, and where that wiki's data lives.
+
+WIKI_LANG / WIKI_PROJECT / WIKI_ACCESS select the wiki (default en /
+wikipedia / all-access). The default wiki keeps the original top-level
+collections. Any other wiki is partitioned:
+
+- collections get a suffix: _entries_de, _topics_de, _briefs_fr_wiktionary, ...
+  (plus the access when it is not all-access)
+- state lives under _state/<lang>.<project>[.<access>]/
+- pages are served under /de/, /fr-wiktionary/, ... (front matter `wiki_path`)
+
+scripts/multi_wiki.py runs one pipeline per configured wiki with these
+variables set. No external dependencies.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+DEFAULT_LANG = "en"
+DEFAULT_PROJECT = "wikipedia"
+DEFAULT_ACCESS = "all-access"
+
+
+def partition(lang: str, project: str = DEFAULT_PROJECT, access: str = DEFAULT_ACCESS) -> dict:
+    """Naming for one (lang, project, access) partition."""
+    wiki = f"{lang}.{project}"
+    if (lang, project, access) == (DEFAULT_LANG, DEFAULT_PROJECT, DEFAULT_ACCESS):
+        return {"wiki": wiki, "key": wiki, "suffix": "", "state": "_state", "wiki_path": None}
+    parts = [lang] + ([project] if project != DEFAULT_PROJECT else []) + ([access] if access != DEFAULT_ACCESS else [])
+    key = ".".join([wiki] + ([access] if access != DEFAULT_ACCESS else []))
+    return {
+        "wiki": wiki,
+        "key": key,
+        "suffix": "_" + "_".join(p.replace("-", "_") for p in parts),
+        "state": f"_state/{key}",
+        "wiki_path": "/" + "-".join(parts),
+    }
+
+
+LANG = os.environ.get("WIKI_LANG") or DEFAULT_LANG
+PROJECT = os.environ.get("WIKI_PROJECT") or DEFAULT_PROJECT
+ACCESS = os.environ.get("WIKI_ACCESS") or DEFAULT_ACCESS
+
+_P = partition(LANG, PROJECT, ACCESS)
+WIKI = _P["wiki"]
+WIKI_KEY = _P["key"]  # wiki plus access, when that is not all-access
+WIKI_PATH = _P["wiki_path"]
+SUFFIX = _P["suffix"]
+STATE_DIR = Path(_P["state"])
+
+
+def collection_dir(base: str) -> Path:
+    """`collection_dir("_entries")` -> this wiki's partition of that collection."""
+    return Path(base + SUFFIX)
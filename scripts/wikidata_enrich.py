@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""Entity/domain tags from Wikidata facts, with a persistent entity cache.
+
+Every entry already stores its `wikibase_item`. This module resolves the
+instance-of (P31) and occupation (P106) claims of those items through
+batched `wbgetentities` calls (BATCH_SIZE ids per request) and keeps the
+class ids in _state/wikidata_entities.json:
+
+  {"Q42": {"p31": ["Q5"], "p106": ["Q36180", ...], "fetched": "2026-03-02"}, ...}
+
+Entries older than TTL_DAYS are refetched; everything else is served from
+the cache, so re-tagging the ledger only costs requests for the QIDs added
+since the last run. tags_for() maps the facts onto our entity_type / domain
+vocabulary; callers keep their regex heuristics as the fallback for items
+whose classes are not in the tables below.
+
+Usage:
+  python scripts/wikidata_enrich.py [--refresh]   # resolve every ledger QID
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import datetime as _dt
+import json
+import os
+import sys
+import time
+import urllib.parse
+from pathlib import Path
+
+USER_AGENT = "WikiLedgerBot/1.0"
+WIKIDATA_API = os.environ.get("WIKIDATA_API", "https://www.wikidata.org/w/api.php")
+# Wikidata is shared by every wiki partition, so the cache is too.
+CACHE_PATH = Path("_state/wikidata_entities.json")
+BATCH_SIZE = 50
+TTL_DAYS = 30
+
+# P31 class -> (entity_type, domain or None)
+CLASS_TAGS = {
+    "Q5": ("person", None),
+    # works
+    "Q11424": ("work", "entertainment"),     # film
+    "Q202866": ("work", "entertainment"),    # animated film
+    "Q5398426": ("work", "entertainment"),   # television series
+    "Q3464665": ("work", "entertainment"),   # television series season
+    "Q482994": ("work", "entertainment"),    # album
+    "Q7366": ("work", "entertainment"),      # song
+    "Q134556": ("work", "entertainment"),    # single
+    "Q7725634": ("work", "entertainment"),   # literary work
+    "Q8261": ("work", "entertainment"),      # novel
+    "Q7889": ("work", "entertainment"),      # video game
+    # places
+    "Q6256": ("place", None),                # country
+    "Q3624078": ("place", None),             # sovereign state
+    "Q515": ("place", None),                 # city
+    "Q1637706": ("place", None),             # big city
+    "Q5119": ("place", None),                # capital
+    "Q486972": ("place", None),              # human settlement
+    "Q35657": ("place", None),               # U.S. state
+    "Q23442": ("place", None),               # island
+    "Q4022": ("place", None),                # river
+    "Q8502": ("place", None),                # mountain
+    # events
+    "Q40231": ("event", "politics"),         # public election
+    "Q858439": ("event", "politics"),        # presidential election
+    "Q1076105": ("event", "politics"),       # general election
+    "Q175331": ("event", "politics"),        # demonstration
+    "Q273120": ("event", "politics"),        # protest
+    "Q500834": ("event", "sports"),          # tournament
+    "Q27020041": ("event", "sports"),        # sports season
+    "Q16510064": ("event", "sports"),        # sporting event
+    "Q198": ("event", "history"),            # war
+    "Q178561": ("event", "history"),         # battle
+    "Q2223653": ("event", "crime"),          # terrorist attack
+    "Q21480300": ("event", "crime"),         # mass shooting
+    "Q3882219": ("event", "crime"),          # assassination
+    "Q132821": ("event", "crime"),           # murder
+    "Q7944": ("event", "science"),           # earthquake
+    "Q8092": ("event", "science"),           # tropical cyclone
+    # organisations
+    "Q7278": ("org", "politics"),            # political party
+    "Q327333": ("org", "politics"),          # government agency
+    "Q476028": ("org", "sports"),            # association football club
+    "Q847017": ("org", "sports"),            # sports club
+    "Q13393265": ("org", "sports"),          # basketball team
+    "Q4830453": ("org", None),               # business
+    "Q783794": ("org", None),                # company
+    "Q891723": ("org", None),                # public company
+    "Q3918": ("org", None),                  # university
+    "Q43229": ("org", None),                 # organization
+    # tech
+    "Q7397": ("other", "tech"),              # software
+    "Q35127": ("other", "tech"),             # website
+    "Q1668024": ("other", "tech"),           # service on internet
+}
+
+# P106 occupation -> domain (people only)
+OCCUPATION_DOMAINS = {
+    "Q937857": "sports",         # association football player
+    "Q3665646": "sports",        # basketball player
+    "Q19204627": "sports",       # American football player
+    "Q10871364": "sports",       # baseball player
+    "Q12299841": "sports",       # cricketer
+    "Q10833314": "sports",       # tennis player
+    "Q11338576": "sports",       # boxer
+    "Q2066131": "sports",        # athlete
+    "Q628099": "sports",         # association football manager
+    "Q33999": "entertainment",   # actor
+    "Q10800557": "entertainment",  # film actor
+    "Q10798782": "entertainment",  # television actor
+    "Q177220": "entertainment",  # singer
+    "Q488205": "entertainment",  # singer-songwriter
+    "Q2252262": "entertainment",  # rapper
+    "Q639669": "entertainment",  # musician
+    "Q245068": "entertainment",  # comedian
+    "Q2526255": "entertainment",  # film director
+    "Q17125263": "entertainment",  # YouTuber
+    "Q82955": "politics",        # politician
+    "Q193391": "politics",       # diplomat
+    "Q40348": "crime",           # lawyer
+    "Q901": "science",           # scientist
+    "Q169470": "science",        # physicist
+    "Q593644": "science",        # chemist
+    "Q11631": "science",         # astronaut
+    "Q82594": "tech",            # computer scientist
+    "Q5482740": "tech",          # programmer
+}
+
+
+def get_json(session, url: str, *, tries: int = 6, timeout=None):
+    import http_transport
+
+    doc, _r = http_transport.fetch(session, url, tries=tries, timeout=timeout)
+    return doc or {}
+
+
+def load_cache(path: Path = CACHE_PATH) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_cache(cache: dict, path: Path = CACHE_PATH) -> None:
+    """Merge `cache` into the file under a lock; the newer `fetched` wins per QID.
+
+    Concurrent wikis (multi_wiki.py) all save here, so nobody's lookups are lost.
+    """
+    from bulk_runner import atomic_write_text, file_lock
+
+    with file_lock(path):
+        merged = load_cache(path)
+        for qid, rec in cache.items():
+            if qid not in merged or rec.get("fetched", "") >= merged[qid].get("fetched", ""):
+                merged[qid] = rec
+        atomic_write_text(path, json.dumps(merged, ensure_ascii=False, sort_keys=True, separators=(",", ":")))
+
+
+def _claim_ids(entity: dict, prop: str) -> list[str]:
+    out = []
+    for claim in (entity.get("claims") or {}).get(prop, []):
+        value = ((claim.get("mainsnak") or {}).get("datavalue") or {}).get("value") or {}
+        if isinstance(value, dict) and value.get("id"):
+            out.append(value["id"])
+    return out
+
+
+def is_qid(value: str | None) -> bool:
+    return bool(value) and value[0] == "Q" and value[1:].isdigit()
+
+
+def stale(cache: dict, qids, today: _dt.date | None = None, ttl_days: int = TTL_DAYS) -> list[str]:
+    today = today or _dt.date.today()
+    cutoff = (today - _dt.timedelta(days=ttl_days)).isoformat()
+    return sorted({q for q in qids if is_qid(q) and (q not in cache or cache[q].get("fetched", "") < cutoff)})
+
+
+def fetch(session, qids: list[str], cache: dict, today: _dt.date | None = None) -> int:
+    """Resolve `qids` in batches of BATCH_SIZE into `cache`. Returns the number of requests made."""
+    fetched = (today or _dt.date.today()).isoformat()
+    requests_made = 0
+    for i in range(0, len(qids), BATCH_SIZE):
+        batch = qids[i:i + BATCH_SIZE]
+        query = urllib.parse.urlencode(
+            {"action": "wbgetentities", "ids": "|".join(batch), "props": "claims", "format": "json"}, safe="|"
+        )
+        doc = get_json(session, f"{WIKIDATA_API}?{query}")
+        requests_made += 1
+        entities, err = doc.get("entities"), doc.get("error")
+        if err or not isinstance(entities, dict):
+            # An API error body (ratelimited, internal_api_error, ...) or a 404: cache nothing, so the
+            # batch is asked for again next run instead of pinning empty facts for TTL_DAYS.
+            code = err.get("code") if isinstance(err, dict) else err
+            print(f"WARN wikidata batch of {len(batch)} not resolved: {code or 'no entities'}", file=sys.stderr)
+            continue
+        for qid in batch:
+            ent = entities.get(qid)
+            if ent is None:
+                continue
+            # Redirected ids come back under the requested id with the target's claims;
+            # deleted ones carry "missing" and no claims, which is a real (empty) answer.
+            cache[qid] = {"p31": _claim_ids(ent, "P31"), "p106": _claim_ids(ent, "P106"), "fetched": fetched}
+    return requests_made
+
+
+def ensure(session, qids, *, cache_path: Path = CACHE_PATH, today: _dt.date | None = None) -> tuple[dict, int]:
+    """Cache with every QID in `qids` resolved and fresh. Returns (cache, requests made)."""
+    cache = load_cache(cache_path)
+    todo = stale(cache, qids, today)
+    if not todo:
+        return cache, 0
+    n = fetch(session, todo, cache, today)
+    save_cache(cache, cache_path)
+    return cache, n
+
+
+def tags_for(facts: dict | None) -> tuple[str | None, str | None]:
+    """(entity_type, domain) from cached facts; None where Wikidata says nothing we map."""
+    if not facts:
+        return None, None
+    entity = domain = None
+    for cls in facts.get("p31", []):
+        if cls in CLASS_TAGS:
+            entity, domain = CLASS_TAGS[cls]
+            break
+    if entity == "person":
+        for occ in facts.get("p106", []):
+            if occ in OCCUPATION_DOMAINS:
+                domain = OCCUPATION_DOMAINS[occ]
+                break
+    return entity, domain
+
+
+def ledger_qids() -> set[str]:
+    from entry_archive import iter_fronts
+    from wiki_config import collection_dir
+
+    return {fm["wikibase_item"] for _name, fm in iter_fronts(collection_dir("_entries")) if is_qid(fm.get("wikibase_item"))}
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    from http_transport import make_session
+
+    qids = ledger_qids()
+    if "--refresh" in argv:
+        CACHE_PATH.unlink(missing_ok=True)
+    t0 = time.monotonic()
+    cache, n = ensure(make_session(USER_AGENT), qids)
+    mapped = sum(1 for q in qids if tags_for(cache.get(q))[0])
+    print(f"OK wikidata qids={len(qids)} requests={n} mapped={mapped} ({time.monotonic() - t0:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
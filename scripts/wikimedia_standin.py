@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""Local stand-in for the two Wikimedia REST endpoints the ledger fetches.
+
+Serves
+
+- /api/rest_v1/metrics/pageviews/top/<project>/<access>/<yyyy>/<mm>/<dd>
+- /api/rest_v1/metrics/pageviews/per-article/<project>/<access>/<agent>/<title>/daily/<start>/<end>
+- /api/rest_v1/page/summary/<title>
+- /w/api.php?action=wbgetentities&ids=Q1|Q2|... (P31/P106 claims only)
+
+from synthetic data (seeded, so a date always yields the same list) or from
+recorded data: top lists stored by toplist_store.py and summaries rebuilt from
+the ledger's own entries. Latency, 5xx rates, 429 storms with Retry-After and
+API lag can be configured, so fetch behaviour can be tested without touching
+production. Point the scripts at it with
+
+  WIKIMEDIA_METRICS_API=http://127.0.0.1:8765/api/rest_v1
+  WIKIPEDIA_REST_API=http://127.0.0.1:8765/api/rest_v1
+  WIKIDATA_API=http://127.0.0.1:8765/w/api.php
+
+Every request is logged (start, end, path, status, hedge), where hedge marks a
+hedged duplicate (`X-Hedge: 1`, see http_transport.py); GET /__stats returns a
+summary. scripts/load_test.py drives the fetch scripts against it.
+
+Usage:
+  python scripts/wikimedia_standin.py [--port 8765] [--latency lognormal:40,0.6]
+      [--error-rate 0.02] [--throttle-rate 0.05] [--storm-every 30 --storm-length 3]
+      [--retry-after 1] [--stall-rate 0.02 --stall-seconds 30] [--lag-days 1] [--missing-days 2026-01-03,...] [--recorded]
+
+No external dependencies.
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime as _dt
+import gzip
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOP_RE = re.compile(r"/api/rest_v1/metrics/pageviews/top/([^/]+)/([^/]+)/(\d{4})/(\d{2})/(\d{2})$")
+SERIES_RE = re.compile(r"/api/rest_v1/metrics/pageviews/per-article/([^/]+)/([^/]+)/([^/]+)/(.+)/daily/(\d{8})\d*/(\d{8})\d*$")
+SUMMARY_RE = re.compile(r"/api/rest_v1/page/summary/(.+)$")
+
+# Synthetic kind -> (P31, P106) claims served by wbgetentities.
+_KIND_CLAIMS = {
+    "film": ("Q11424", None), "album": ("Q482994", None), "novel": ("Q8261", None),
+    "television series": ("Q5398426", None), "video game": ("Q7889", None), "city": ("Q515", None),
+    "company": ("Q783794", None), "election": ("Q40231", None), "tournament": ("Q500834", None),
+    "band": ("Q215380", None), "footballer": ("Q5", "Q937857"), "politician": ("Q5", "Q82955"),
+    "singer": ("Q5", "Q177220"), "scientist": ("Q5", "Q901"), "actor": ("Q5", "Q33999"),
+}
+
+POOL_SIZE = 5000
+LIST_SIZE = 1000
+
+_KINDS = ["film", "album", "novel", "television series", "video game", "footballer", "politician", "singer",
+          "city", "company", "election", "tournament", "scientist", "actor", "band"]
+_WORDS = ["River", "Crown", "Harbor", "Signal", "Orbit", "Lantern", "Summit", "Echo", "Atlas", "Meridian",
+          "Falcon", "Copper", "Willow", "Nova", "Granite", "Vesper", "Quartz", "Delta", "Ember", "Juniper"]
+
+
+def parse_latency(spec: str):
+    """'fixed:MS', 'uniform:LO,HI' or 'lognormal:MEDIAN_MS,SIGMA' -> sampler(rng) in seconds."""
+    kind, _, args = spec.partition(":")
+    vals = [float(x) for x in args.split(",") if x]
+    if kind == "fixed":
+        return lambda rng: vals[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(vals[0], vals[1]) / 1000
+    if kind == "lognormal":
+        mu = math.log(max(vals[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, vals[1]) / 1000
+    raise ValueError(f"bad latency spec {spec!r}")
+
+
+class SyntheticData:
+    """Seeded article pool; a day's list mixes a persistent head with day-specific churn."""
+
+    def __init__(self, seed: int = 1):
+        rng = random.Random(seed)
+        self.seed = seed
+        self.pool = []
+        seen = set()
+        while len(self.pool) < POOL_SIZE:
+            title = f"{rng.choice(_WORDS)}_{rng.choice(_WORDS)}_{rng.randint(1, 999)}"
+            if title not in seen:
+                seen.add(title)
+                self.pool.append((title, rng.choice(_KINDS)))
+        self.kind = dict(self.pool)
+        self.by_qid = {self._qid(t): k for t, k in self.pool}
+
+    def top(self, day: _dt.date) -> list[dict]:
+        rng = random.Random(self.seed * 100_000_000 + int(day.strftime("%Y%m%d")))
+        head = [t for t, _ in self.pool[:300]]
+        tail = rng.sample([t for t, _ in self.pool[300:]], LIST_SIZE)
+        titles = ["Main_Page", "Special:Search"] + rng.sample(head, 150) + tail
+        seen = set()
+        arts = []
+        for title in titles:
+            if title in seen:
+                continue
+            seen.add(title)
+            rank = len(arts) + 1
+            arts.append({"article": title, "views": int(8_000_000 / rank ** 1.1) + rng.randint(0, 500), "rank": rank})
+            if len(arts) == LIST_SIZE:
+                break
+        return arts
+
+    def daily_views(self, title: str, day: _dt.date) -> int:
+        base = zlib.crc32(title.encode("utf-8")) % 20_000 + 200
+        rng = random.Random(zlib.crc32(f"{title}|{day.isoformat()}".encode("utf-8")))
+        spike = 20 if rng.random() < 0.03 else 1
+        return int(base * spike * rng.uniform(0.7, 1.3))
+
+    def _qid(self, title: str) -> str:
+        return f"Q{(zlib.crc32(title.encode('utf-8')) % 90_000_000 + 1000) % 9_000_000 + 1}"
+
+    def entity(self, qid: str) -> dict | None:
+        kind = self.by_qid.get(qid)
+        if kind is None:
+            return None
+        p31, p106 = _KIND_CLAIMS[kind]
+
+        def claim(prop, value):
+            return {"mainsnak": {"property": prop, "datavalue": {"value": {"entity-type": "item", "id": value}}}}
+
+        claims = {"P31": [claim("P31", p31)]}
+        if p106:
+            claims["P106"] = [claim("P106", p106)]
+        return {"type": "item", "id": qid, "claims": claims}
+
+    def summary(self, title: str) -> dict | None:
+        kind = self.kind.get(title)
+        if kind is None:
+            return None
+        name = title.replace("_", " ")
+        pageid = zlib.crc32(title.encode("utf-8")) % 90_000_000 + 1000
+        extract = (f"{name} is a {kind} frequently discussed in synthetic coverage. "
+                   f"It is generated by the local stand-in server for testing.\n"
+                   f"A second paragraph exists so first-paragraph extraction has work to do.")
+        doc = {
+            "type": "standard",
+            "title": name,
+            "titles": {"canonical": title, "normalized": name, "display": name},
+            "pageid": pageid,
+            "ns": 0,
+            "revision": str(pageid * 7 % 1_300_000_000),
+            "wikibase_item": self._qid(title),
+            "description": f"Synthetic {kind}",
+            "extract": extract,
+            "content_urls": {"desktop": {"page": f"https://en.wikipedia.org/wiki/{urllib.parse.quote(title)}"}},
+        }
+        if pageid % 4:
+            # Most articles have a lead image; sizes vary so both thumb and original-only cases occur.
+            ow, oh = 200 + pageid % 3000, 150 + pageid % 2000
+            h = hashlib.md5(f"{title}.jpg".encode("utf-8")).hexdigest()
+            orig = f"https://upload.wikimedia.org/wikipedia/commons/{h[0]}/{h[:2]}/{urllib.parse.quote(title)}.jpg"
+            tw = min(ow, 330)
+            thumb = orig if tw == ow else orig.replace("/commons/", "/commons/thumb/") + f"/{tw}px-{urllib.parse.quote(title)}.jpg"
+            doc["thumbnail"] = {"source": thumb, "width": tw, "height": round(oh * tw / ow)}
+            doc["originalimage"] = {"source": orig, "width": ow, "height": oh}
+        return doc
+
+
+class RecordedData(SyntheticData):
+    """Stored top lists and ledger entries where we have them, synthetic data otherwise."""
+
+    def __init__(self, seed: int = 1):
+        super().__init__(seed)
+        from entry_archive import iter_fronts
+
+        self.summaries = {}
+        for _name, fm in iter_fronts():
+            title = fm.get("topic_title") or fm.get("title")
+            if not title:
+                continue
+            pid = fm.get("topic_page_id")
+            self.summaries[title.replace(" ", "_")] = {
+                "type": fm.get("article_type") or "standard",
+                "title": title,
+                "titles": {"canonical": title.replace(" ", "_"), "normalized": fm.get("normalized_title") or title},
+                "pageid": int(pid) if pid and pid.isdigit() else None,
+                "ns": 0,
+                "revision": fm.get("source_revision_id"),
+                "wikibase_item": fm.get("wikibase_item"),
+                "description": fm.get("description"),
+                "extract": fm.get("lead_paragraph") or fm.get("lead_sentence") or "",
+                "content_urls": {"desktop": {"page": fm.get("topic_url")}},
+            }
+
+    def top(self, day: _dt.date) -> list[dict]:
+        from toplist_store import load_top
+
+        return load_top(day) or super().top(day)
+
+    def summary(self, title: str) -> dict | None:
+        return self.summaries.get(title) or super().summary(title)
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr, *, data, latency="fixed:0", error_rate=0.0, throttle_rate=0.0, retry_after=1,
+                 storm_every=0.0, storm_length=0.0, lag_days=0, missing_days=(), today=None, seed=1,
+                 stall_rate=0.0, stall_seconds=30.0):
+        super().__init__(addr, _Handler)
+        self.data = data
+        self.latency = parse_latency(latency)
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.storm_every = storm_every
+        self.storm_length = storm_length
+        self.stall_rate = stall_rate
+        self.stall_seconds = stall_seconds
+        self.lag_days = lag_days
+        self.missing_days = set(missing_days)
+        self.today = today or _dt.date.today()
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.log: list[tuple[float, float, str, int, bool]] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/api/rest_v1"
+
+    def draw(self):
+        """Return (latency seconds, forced status or None) for one request."""
+        with self.lock:
+            delay = self.latency(self.rng)
+            if self.stall_rate and self.rng.random() < self.stall_rate:
+                delay += self.stall_seconds
+            if self.storm_every and (time.monotonic() - self.started) % self.storm_every < self.storm_length:
+                return delay, 429
+            r = self.rng.random()
+        if r < self.throttle_rate:
+            return delay, 429
+        if r < self.throttle_rate + self.error_rate:
+            return delay, self.rng.choice((500, 502, 503, 504))
+        return delay, None
+
+    def record(self, t0: float, t1: float, path: str, status: int, hedge: bool = False) -> None:
+        with self.lock:
+            self.log.append((t0, t1, path, status, hedge))
+
+    def stats(self) -> dict:
+        with self.lock:
+            log = list(self.log)
+        lat = sorted(t1 - t0 for t0, t1, *_ in log)
+        codes: dict[str, int] = {}
+        for _, _, _, status, _ in log:
+            codes[str(status)] = codes.get(str(status), 0) + 1
+        return {"requests": len(log), "hedged": sum(rec[4] for rec in log), "status": codes,
+                "latency_ms": percentiles(lat)}
+
+
+def percentiles(values: list[float], ps=(50, 95, 99)) -> dict:
+    if not values:
+        return {f"p{p}": None for p in ps} | {"max": None}
+    out = {f"p{p}": round(values[min(len(values) - 1, int(len(values) * p / 100))] * 1000, 2) for p in ps}
+    out["max"] = round(values[-1] * 1000, 2)
+    return out
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status: int, doc, extra: dict | None = None):
+        body = json.dumps(doc).encode("utf-8")
+        gz = "gzip" in (self.headers.get("Accept-Encoding") or "")
+        if gz:
+            body = gzip.compress(body, compresslevel=5)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("x-request-id", f"standin-{len(self.server.log)}")
+        if gz:
+            self.send_header("Content-Encoding", "gzip")
+        for k, v in (extra or {}).items():
+            self.send_header(k, str(v))
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def do_GET(self):
+        srv: StandinServer = self.server
+        t0 = time.monotonic()
+        parts = urllib.parse.urlsplit(self.path)
+        path = parts.path
+        if path == "/__stats":
+            self._send(200, srv.stats())
+            return
+        hedge = self.headers.get("X-Hedge") == "1"
+        delay, forced = srv.draw()
+        time.sleep(delay)
+        if forced == 429:
+            status = self._send(429, {"type": "rate-limited"}, {"Retry-After": srv.retry_after})
+        elif forced:
+            status = self._send(forced, {"type": "server-error"})
+        else:
+            status = self._route(path, parts.query)
+        srv.record(t0, time.monotonic(), path, status, hedge)
+
+    def _route(self, path: str, query: str = "") -> int:
+        srv: StandinServer = self.server
+        if path == "/w/api.php":
+            q = urllib.parse.parse_qs(query)
+            if q.get("action") != ["wbgetentities"]:
+                return self._send(400, {"error": {"code": "badvalue"}})
+            ids = (q.get("ids") or [""])[0].split("|")
+            if len(ids) > 50:
+                return self._send(200, {"error": {"code": "too-many-ids"}})
+            entities = {qid: srv.data.entity(qid) or {"id": qid, "missing": ""} for qid in ids if qid}
+            return self._send(200, {"entities": entities, "success": 1})
+        m = TOP_RE.search(path)
+        if m:
+            day = _dt.date(int(m.group(3)), int(m.group(4)), int(m.group(5)))
+            if day > srv.today - _dt.timedelta(days=srv.lag_days) or day.isoformat() in srv.missing_days:
+                return self._send(404, {"type": "not_found", "detail": "The date(s) you used are valid, but we either do not have data for those date(s), or the project you asked for is not loaded yet."})
+            items = [{"project": m.group(1), "access": m.group(2), "year": m.group(3), "month": m.group(4),
+                      "day": m.group(5), "articles": srv.data.top(day)}]
+            return self._send(200, {"items": items})
+        m = SERIES_RE.search(path)
+        if m:
+            first = _dt.datetime.strptime(m.group(5), "%Y%m%d").date()
+            last = min(_dt.datetime.strptime(m.group(6), "%Y%m%d").date(), srv.today - _dt.timedelta(days=srv.lag_days))
+            title = urllib.parse.unquote(m.group(4))
+            items = []
+            day = first
+            while day <= last:
+                items.append({"project": m.group(1), "article": title, "granularity": "daily",
+                              "timestamp": day.strftime("%Y%m%d") + "00", "access": m.group(2), "agent": m.group(3),
+                              "views": srv.data.daily_views(title, day)})
+                day += _dt.timedelta(days=1)
+            if not items:
+                return self._send(404, {"type": "not_found"})
+            return self._send(200, {"items": items})
+        m = SUMMARY_RE.search(path)
+        if m:
+            doc = srv.data.summary(urllib.parse.unquote(m.group(1)))
+            if doc is None:
+                return self._send(404, {"type": "not_found"})
+            return self._send(200, doc)
+        return self._send(404, {"type": "not_found"})
+
+
+def add_server_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--latency", default="fixed:0", help="fixed:MS | uniform:LO,HI | lognormal:MEDIAN_MS,SIGMA")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="share of 5xx responses")
+    ap.add_argument("--throttle-rate", type=float, default=0.0, help="share of random 429 responses")
+    ap.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429")
+    ap.add_argument("--storm-every", type=float, default=0.0, help="start a 429 storm every S seconds")
+    ap.add_argument("--storm-length", type=float, default=0.0, help="storm duration in seconds")
+    ap.add_argument("--stall-rate", type=float, default=0.0, help="share of requests that hang before answering")
+    ap.add_argument("--stall-seconds", type=float, default=30.0, help="how long a stalled request hangs")
+    ap.add_argument("--lag-days", type=int, default=0, help="top lists newer than today-N return 404")
+    ap.add_argument("--missing-days", default="", help="comma-separated dates whose top list returns 404")
+    ap.add_argument("--today", type=_dt.date.fromisoformat, default=None)
+    ap.add_argument("--recorded", action="store_true", help="serve stored top lists and ledger summaries")
+    ap.add_argument("--seed", type=int, default=1)
+
+
+def server_from_args(args, port: int = 0) -> StandinServer:
+    data = RecordedData(args.seed) if args.recorded else SyntheticData(args.seed)
+    return StandinServer(
+        ("127.0.0.1", port),
+        data=data,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        storm_every=args.storm_every,
+        storm_length=args.storm_length,
+        lag_days=args.lag_days,
+        missing_days=[d for d in args.missing_days.split(",") if d],
+        today=args.today,
+        seed=args.seed,
+        stall_rate=args.stall_rate,
+        stall_seconds=args.stall_seconds,
+    )
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local Wikimedia REST stand-in")
+    ap.add_argument("--port", type=int, default=8765)
+    add_server_args(ap)
+    args = ap.parse_args(argv)
+    srv = server_from_args(args, args.port)
+    print(f"serving {srv.base_url}")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(srv.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())